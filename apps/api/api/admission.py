@@ -0,0 +1,109 @@
+"""
+Upload admission middleware.
+
+Runs the admission controller on every upload request before FastAPI reads
+and parses the multipart body, so a shed upload costs no disk, memory or
+parsing. Rejected requests get the same JSON error shape as the upload
+endpoint's own HTTPExceptions, with a Retry-After header. Everything else
+(/health, the carousel, /images) passes straight through.
+"""
+import asyncio
+import logging
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from api.upload import MAX_FILE_SIZE
+from core.admission import AdmissionController, admission
+from core.executors import run_io
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+UPLOAD_PATH_PREFIX = "/api/upload"
+UPLOAD_METHODS = ("POST", "PATCH")
+
+REJECTION_MESSAGES = {
+    "inflight": "Server busy, please retry shortly",
+    "backlog": "Server busy, please retry shortly",
+    "disk": "Server storage nearly full, please retry later",
+    "rate": "Too many uploads, please slow down",
+}
+
+
+def request_size(headers: Headers) -> int:
+    """
+    Expected body size of a request.
+
+    Args:
+        headers: Request headers
+
+    Returns:
+        Content-Length, or MAX_FILE_SIZE when it is missing or invalid
+        (chunked uploads are budgeted as one maximum-size photo)
+    """
+    try:
+        size = int(headers.get("content-length", ""))
+    except ValueError:
+        return MAX_FILE_SIZE
+    return size if size >= 0 else MAX_FILE_SIZE
+
+
+def starts_upload(method: str, path: str) -> bool:
+    """
+    Whether a request begins a new upload (and so counts against the rate).
+
+    Resumable session chunks (PATCH) and completions only continue an
+    upload whose session was already rate limited when it was created.
+    """
+    return method == "POST" and not path.endswith("/complete")
+
+
+class UploadAdmissionMiddleware:
+    """ASGI middleware that admits or sheds upload requests."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController = admission):
+        self.app = app
+        self.controller = controller
+        self._sample_lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in UPLOAD_METHODS
+            or not scope["path"].startswith(UPLOAD_PATH_PREFIX)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        if controller.needs_sample():
+            async with self._sample_lock:
+                if controller.needs_sample():
+                    await run_io(controller.sample)
+
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        ticket, rejection = controller.admit(
+            client,
+            request_size(Headers(scope=scope)),
+            rate_limited=starts_upload(scope["method"], scope["path"]),
+        )
+
+        if rejection is not None:
+            logger.warning(
+                f"Upload shed ({rejection.reason}) from {client}: "
+                f"{rejection.status_code}, retry after {rejection.retry_after}s"
+            )
+            response = JSONResponse(
+                status_code=rejection.status_code,
+                content={"detail": {"error": REJECTION_MESSAGES[rejection.reason]}},
+                headers={"Retry-After": str(rejection.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.release(ticket)
@@ -0,0 +1,117 @@
+"""
+Carousel UI serving with content-hash versioned asset URLs.
+
+The /display page is index.html with every ``/carousel-ui/...`` reference
+rewritten to carry ``?v=<hash of the file>``. A request for the current
+version of an asset is cached as immutable, so kiosk browsers load the
+bundle once and keep it across reloads and restarts; when a file changes
+its URL changes with it. The page itself, and asset requests without the
+current version, are revalidated with ETag / Last-Modified.
+"""
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs
+
+from fastapi.responses import HTMLResponse, Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from core.executors import run_io
+from core.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    etag_matches,
+    make_etag,
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+UI_URL_PREFIX = "/carousel-ui/"
+
+# src="/carousel-ui/..." and href="/carousel-ui/..." attributes
+_ASSET_REFERENCE = re.compile(r'((?:src|href)=")/carousel-ui/([^"?#]+)(")')
+
+
+@lru_cache(maxsize=128)
+def _content_version(path: Path, mtime_ns: int, size: int) -> str:
+    return hashlib.blake2b(path.read_bytes(), digest_size=5).hexdigest()
+
+
+def asset_version(path: Path) -> Optional[str]:
+    """
+    Content hash of a UI file, recomputed only when the file changes.
+
+    Args:
+        path: File under the carousel-ui directory
+
+    Returns:
+        Short hex version string, or None if the file does not exist
+    """
+    try:
+        stat_result = path.stat()
+    except OSError:
+        return None
+    return _content_version(path, stat_result.st_mtime_ns, stat_result.st_size)
+
+
+def render_versioned_page(html_path: Path, ui_dir: Path) -> bytes:
+    """
+    Read an HTML page and add ``?v=`` versions to its carousel-ui references.
+
+    Args:
+        html_path: Page to render
+        ui_dir: Directory served under /carousel-ui
+
+    Returns:
+        Rendered page
+    """
+    def add_version(match: re.Match) -> str:
+        version = asset_version(ui_dir / match.group(2))
+        url = f"{UI_URL_PREFIX}{match.group(2)}"
+        if version is not None:
+            url = f"{url}?v={version}"
+        return f"{match.group(1)}{url}{match.group(3)}"
+
+    return _ASSET_REFERENCE.sub(add_version, html_path.read_text()).encode()
+
+
+async def versioned_page_response(html_path: Path, ui_dir: Path, if_none_match: Optional[str]) -> Response:
+    """
+    Serve a versioned page with an ETag, answering 304 when it is unchanged.
+
+    Args:
+        html_path: Page to render
+        ui_dir: Directory served under /carousel-ui
+        if_none_match: Request's If-None-Match header
+
+    Returns:
+        HTMLResponse, or 304 Not Modified
+    """
+    body = await run_io(render_versioned_page, html_path, ui_dir)
+    etag = make_etag(body)
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(body, headers=headers)
+
+
+class VersionedStaticFiles(StaticFiles):
+    """StaticFiles that marks requests for the current ``?v=`` version immutable."""
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+
+        requested = parse_qs(scope.get("query_string", b"").decode()).get("v", [None])[0]
+        current = None
+        if requested is not None:
+            current = await run_io(asset_version, Path(self.directory) / path)
+
+        response.headers["cache-control"] = (
+            IMMUTABLE_CACHE_CONTROL if requested is not None and requested == current else REVALIDATE_CACHE_CONTROL
+        )
+        return response
@@ -0,0 +1,108 @@
+"""
+Photo event stream API endpoint.
+
+Pushes ``photo_added`` and ``photo_removed`` server-sent events to carousel
+displays as soon as the photo index changes, so displays no longer have to
+poll /api/photos to notice new photos. Every event carries the delta-feed
+cursor after the change; a ``resync`` event (index rebuilt, or the client
+fell too far behind) tells the client to catch up through
+``/api/photos?since=<cursor>``.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from api.photos import build_photo
+from core.config import SSE_HEARTBEAT_SECONDS
+from core.events import RESYNC_EVENT, EventBroadcaster, broadcaster
+from core.photo_index import PhotoRecord, photo_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Router instance
+router = APIRouter()
+
+# Browser reconnection delay after a dropped stream
+RETRY_MILLISECONDS = 3000
+
+HEARTBEAT_FRAME = b": keep-alive\n\n"
+
+
+def publish_index_change(change: str, record: Optional[PhotoRecord]) -> None:
+    """
+    Photo index listener that broadcasts each change as an event.
+
+    Args:
+        change: "added", "removed" or "reset"
+        record: The affected photo (None on reset)
+    """
+    cursor = f"{photo_index.epoch}.{photo_index.sequence}"
+    if change == "added":
+        broadcaster.publish(
+            "photo_added",
+            {"photo": build_photo(record).model_dump(), "cursor": cursor},
+            event_id=cursor,
+        )
+    elif change == "removed":
+        broadcaster.publish(
+            "photo_removed",
+            {"id": record.photo_id, "cursor": cursor},
+            event_id=cursor,
+        )
+    else:
+        broadcaster.publish(RESYNC_EVENT, {"reason": "reset", "cursor": cursor}, event_id=cursor)
+
+
+photo_index.add_listener(publish_index_change)
+
+
+async def sse_frames(
+    source: EventBroadcaster = broadcaster,
+    heartbeat: float = SSE_HEARTBEAT_SECONDS,
+) -> AsyncIterator[bytes]:
+    """
+    Subscribe to source and yield its events, with keep-alive comments
+    while idle. The subscription ends when the client disconnects.
+
+    Args:
+        source: Broadcaster to subscribe to
+        heartbeat: Seconds of silence before a keep-alive comment
+
+    Yields:
+        Encoded SSE frames
+    """
+    subscription = source.subscribe()
+    logger.info(f"Event subscriber connected ({source.subscriber_count} total)")
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n".encode()
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT_FRAME
+    finally:
+        source.unsubscribe(subscription)
+
+
+@router.get("/api/events", tags=["Photos"])
+async def stream_events() -> StreamingResponse:
+    """
+    Stream photo events to a display.
+
+    Returns:
+        StreamingResponse: text/event-stream of photo_added, photo_removed
+        and resync events
+    """
+    return StreamingResponse(
+        sse_frames(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-store",
+            # Disable proxy buffering (nginx) so events are delivered immediately
+            "X-Accel-Buffering": "no",
+        },
+    )
@@ -0,0 +1,173 @@
+"""
+Display image serving.
+
+``/images`` is a StaticFiles mount whose small files (screen renditions,
+thumbnails, typical display images) are answered from the shared in-memory
+LRU cache. StaticFiles still resolves the path, rejects traversal, stats
+the file and handles conditional requests, so ETag and Last-Modified are
+identical whether a file comes from memory or from disk. Large originals,
+HEAD and Range requests are streamed from disk by SendfileResponse.
+
+SendfileResponse answers Range requests (206, multipart ranges and
+If-Range) so an interrupted download of a 25 MB original resumes where it
+stopped. When the ASGI server advertises the ``http.response.zerocopysend``
+extension the file descriptor is handed to the server, which transmits it
+with sendfile() and no bytes pass through Python. Otherwise the file is
+read in FILE_CHUNK_BYTES chunks, far fewer thread hops than Starlette's
+64 KB default.
+
+UUID-named files never change once the processor has written them, so they
+are marked immutable and browsers keep them across reloads and restarts
+without revalidating. Any other file must be revalidated.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+from core.config import FILE_CHUNK_BYTES, RENDITIONS_DIRNAME
+from core.executors import run_io
+from core.http_cache import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, is_uuid_asset
+from core.image_cache import ImageCache, image_cache
+from core.photo_index import PhotoRecord, photo_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class SendfileResponse(FileResponse):
+    """FileResponse that uses zero-copy sendfile when the server supports it."""
+
+    chunk_size = FILE_CHUNK_BYTES
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self._zerocopy = ZEROCOPY_EXTENSION in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send: Send, send_header_only: bool, send_pathsend: bool) -> None:
+        if send_header_only or not self._zerocopy:
+            return await super()._handle_simple(send, send_header_only, send_pathsend)
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._sendfile(send, 0, self.stat_result.st_size)
+
+    async def _handle_single_range(
+        self, send: Send, start: int, end: int, file_size: int, send_header_only: bool
+    ) -> None:
+        if send_header_only or not self._zerocopy:
+            return await super()._handle_single_range(send, start, end, file_size, send_header_only)
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        await self._sendfile(send, start, end - start)
+
+    async def _handle_multiple_ranges(
+        self, send: Send, ranges: list[tuple[int, int]], file_size: int, send_header_only: bool
+    ) -> None:
+        # Starlette announces the multipart boundary in Content-Range; the
+        # boundary belongs in Content-Type, where download clients look for it.
+        async def send_multipart(message: dict) -> None:
+            if message["type"] == "http.response.start":
+                headers = [
+                    (name, value)
+                    for name, value in message["headers"]
+                    if name not in (b"content-range", b"content-type")
+                ]
+                headers.append((b"content-type", self.headers["content-range"].encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await super()._handle_multiple_ranges(send_multipart, ranges, file_size, send_header_only)
+
+    async def _sendfile(self, send: Send, offset: int, count: int) -> None:
+        """
+        Hand the open file to the server for zero-copy transmission.
+
+        Args:
+            send: ASGI send callable
+            offset: First byte to send
+            count: Number of bytes to send
+        """
+        file = await run_io(open, self.path, "rb")
+        try:
+            await send({
+                "type": ZEROCOPY_EXTENSION,
+                "file": file,
+                "offset": offset,
+                "count": count,
+                "more_body": False,
+            })
+        finally:
+            file.close()
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that serves small files from an ImageCache, with caching headers."""
+
+    def __init__(self, *args, cache: ImageCache = image_cache, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await self._get_cached_response(path, scope)
+        response.headers["cache-control"] = (
+            IMMUTABLE_CACHE_CONTROL if is_uuid_asset(path) else REVALIDATE_CACHE_CONTROL
+        )
+        return response
+
+    def file_response(
+        self,
+        full_path: os.PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        response = SendfileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    async def _get_cached_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+
+        if (
+            not isinstance(response, FileResponse)
+            or response.status_code != 200
+            or scope["method"] != "GET"
+            or "range" in Headers(scope=scope)
+            or not self.cache.cacheable(response.stat_result)
+        ):
+            return response
+
+        body = await self.cache.get_or_load(path, Path(response.path), response.stat_result)
+        headers = {
+            name: value
+            for name, value in response.headers.items()
+            if name not in ("content-length", "content-type")
+        }
+        return Response(body, headers=headers, media_type=response.media_type)
+
+
+def invalidate_photo(change: str, record: Optional[PhotoRecord]) -> None:
+    """
+    Photo index listener that evicts deleted photos from the image cache.
+
+    Args:
+        change: "added", "removed" or "reset"
+        record: The affected photo (None on reset)
+    """
+    if change == "reset":
+        image_cache.clear()
+    elif change == "removed":
+        image_cache.invalidate(record.filename)
+        image_cache.invalidate_prefix(f"{RENDITIONS_DIRNAME}/{record.photo_id}/")
+
+
+photo_index.add_listener(invalidate_photo)
@@ -0,0 +1,48 @@
+"""
+Runtime metrics API endpoint.
+
+Exposes counters from background components (processing pipeline, event
+broadcaster, upload fsync policy, image cache, upload admission, display
+encoding, processing journal) so the operator can see backlog, worker load,
+connected displays, cache effectiveness, shed uploads, bytes saved by
+re-encoding and uploads awaiting commit on the Raspberry Pi.
+"""
+import logging
+
+from fastapi import APIRouter
+
+from core.admission import admission
+from core.durability import fsync_batcher
+from core.encoding import encoding_stats
+from core.events import broadcaster
+from core.image_cache import image_cache
+from core.journal import processing_journal
+from core.processor import pipeline
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Router instance
+router = APIRouter()
+
+
+@router.get("/api/metrics", tags=["Metrics"])
+async def get_metrics() -> dict:
+    """
+    Get runtime metrics.
+
+    Returns:
+        dict: Processing pipeline queue depth and per-worker utilisation,
+        event subscriber counts, upload fsync state, image cache hit ratio,
+        upload admission counters, upload versus display bytes and the
+        processing journal backlog
+    """
+    return {
+        "processor": pipeline.stats(),
+        "events": broadcaster.stats(),
+        "durability": fsync_batcher.stats(),
+        "imageCache": image_cache.stats(),
+        "admission": admission.stats(),
+        "encoding": encoding_stats.stats(),
+        "journal": processing_journal.stats(),
+    }
@@ -0,0 +1,161 @@
+"""
+Incremental multipart/form-data reader.
+
+FastAPI's ``File()`` parameters are only filled in once Starlette has
+spooled the whole request body. For batch uploads that means a 30-photo
+request is received completely, then copied a second time into
+raw_images. MultipartReader instead hands out one part at a time while the
+body is still arriving: the caller gets each part's headers as soon as they
+are parsed and reads its data chunk by chunk, so every photo is streamed
+straight to its destination and at most one chunk per request is held in
+memory.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+
+class MultipartError(Exception):
+    """Raised when a request body is not valid multipart/form-data."""
+
+
+@dataclass
+class PartHeaders:
+    """Headers of one multipart part."""
+    name: str
+    filename: Optional[str]
+    content_type: Optional[str]
+
+
+def _decode(value: bytes) -> str:
+    return value.decode("utf-8", errors="replace")
+
+
+class MultipartReader:
+    """Reads a multipart/form-data body part by part as it is received."""
+
+    def __init__(self, content_type: str, stream: AsyncIterator[bytes]):
+        """
+        Args:
+            content_type: Request Content-Type header (carries the boundary)
+            stream: Request body chunks
+
+        Raises:
+            MultipartError: If the content type is not multipart/form-data
+                            with a boundary
+        """
+        media_type, params = parse_options_header(content_type)
+        if media_type != b"multipart/form-data" or b"boundary" not in params:
+            raise MultipartError(f"Expected multipart/form-data, got {content_type!r}")
+
+        self._stream = stream.__aiter__()
+        self._events: deque[tuple[str, object]] = deque()
+        self._finished = False
+        self._in_part = False
+        self._headers: dict[bytes, bytes] = {}
+        self._header_field = b""
+        self._header_value = b""
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    async def next_part(self) -> Optional[PartHeaders]:
+        """
+        Advance to the next part, skipping any unread data of the current one.
+
+        Returns:
+            Headers of the next part, or None at the end of the body
+
+        Raises:
+            MultipartError: If the body is malformed
+        """
+        while (event := await self._next_event()) is not None:
+            kind, value = event
+            if kind == "part":
+                self._in_part = True
+                return value
+        self._in_part = False
+        return None
+
+    async def read(self, size: int = -1) -> bytes:
+        """
+        Read data of the current part.
+
+        Args:
+            size: Maximum number of bytes to return (-1 for the whole part)
+
+        Returns:
+            Up to size bytes; b"" once the part is exhausted
+
+        Raises:
+            MultipartError: If the body is malformed or ends inside the part
+        """
+        buffer = bytearray()
+        while self._in_part and (size < 0 or len(buffer) < size):
+            event = await self._next_event()
+            if event is None:
+                raise MultipartError("Request body ended inside a part")
+            kind, value = event
+            if kind == "data":
+                buffer += value
+            elif kind == "end":
+                self._in_part = False
+
+        if 0 <= size < len(buffer):
+            self._events.appendleft(("data", bytes(buffer[size:])))
+            del buffer[size:]
+        return bytes(buffer)
+
+    async def _next_event(self) -> Optional[tuple[str, object]]:
+        while not self._events:
+            if self._finished:
+                return None
+            try:
+                chunk = await anext(self._stream)
+            except StopAsyncIteration:
+                self._finished = True
+                self._parser.finalize()
+                continue
+            try:
+                self._parser.write(chunk)
+            except MultipartParseError as e:
+                raise MultipartError(str(e)) from e
+        return self._events.popleft()
+
+    def _on_part_begin(self) -> None:
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        content_type = self._headers.get(b"content-type")
+        self._events.append(("part", PartHeaders(
+            name=_decode(options.get(b"name", b"")),
+            filename=_decode(options[b"filename"]) if b"filename" in options else None,
+            content_type=_decode(content_type) if content_type is not None else None,
+        )))
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self._events.append(("data", bytes(data[start:end])))
+
+    def _on_part_end(self) -> None:
+        self._events.append(("end", None))
@@ -1,18 +1,34 @@
 """
 Photo display API endpoint.
 
-Handles fetching photos from the display_images directory.
+Serves the photo list from the in-memory photo index; the JSON body is
+rebuilt only when the index changes. Photo IDs are the processor's UUID
+filenames, so they are stable across polls and restarts, and the list
+carries an ETag so unchanged polls can be answered with 304 Not Modified.
+
+With ``?since=<cursor>`` the endpoint returns a delta feed instead: only the
+photos added and removed since the cursor, plus the next cursor.
+
+Each photo carries a ``clusterId`` shared by near-duplicates (burst shots),
+so displays can rotate through one representative per cluster.
+
+``/api/photos/next`` returns the server-defined rotation order: the photos
+that follow the one on screen, with the URL and byte size of the image to
+display, so the carousel can download and decode them ahead of time.
 """
 import logging
-import uuid
 from datetime import datetime, timezone
-from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Union
 
-from fastapi import APIRouter
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, TypeAdapter
 
-from core.config import DISPLAY_IMAGES_DIR
+from core.config import DISPLAY_IMAGES_DIR, PREFETCH_WINDOW, RENDITIONS_DIRNAME
+from core.http_cache import REVALIDATE_CACHE_CONTROL, etag_matches, make_etag
+from core.photo_index import PhotoRecord, photo_index
+from core.processor import DISPLAY_RENDITION
+from core.rotation import rotation
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -20,61 +36,291 @@ logger = logging.getLogger(__name__)
 # Router instance
 router = APIRouter()
 
+# Delta feed page sizes
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Upper bound on the prefetch window
+MAX_PREFETCH_WINDOW = 10
+
+
+class Rendition(BaseModel):
+    """Downscaled rendition of a photo."""
+    url: str
+    width: int
+    height: int
+
 
 class Photo(BaseModel):
     """Photo object structure for API response."""
     id: str
     url: str
     createdAt: str
+    renditions: Dict[str, Rendition] = Field(default_factory=dict)
+    clusterId: str
+
 
+class PhotoDelta(BaseModel):
+    """Changes to the photo set since a cursor."""
+    photos: List[Photo]
+    removed: List[str]
+    cursor: str
+    hasMore: bool
+    reset: bool
 
-@router.get("/api/photos", tags=["Photos"])
-async def get_photos() -> List[Photo]:
+
+class PrefetchImage(BaseModel):
+    """Image a display should download and decode before showing it."""
+    id: str
+    url: str
+    bytes: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+class UpcomingPhotos(BaseModel):
+    """The next photos in rotation order after the one on screen."""
+    photos: List[PrefetchImage]
+    rotationLength: int
+
+
+PhotoList = TypeAdapter(List[Photo])
+
+EMPTY_BODY = b"[]"
+
+# (index version, serialized photo list, ETag) of the last response
+_cached_body: tuple[Optional[int], bytes, str] = (None, EMPTY_BODY, make_etag(EMPTY_BODY))
+
+
+def build_photo(record: PhotoRecord) -> Photo:
+    """
+    Build the API representation of an indexed photo.
+
+    Args:
+        record: Photo index record
+
+    Returns:
+        Photo with URLs for the original and its renditions, and its
+        near-duplicate cluster
+    """
+    photo_id = record.photo_id
+    return Photo(
+        id=photo_id,
+        url=f"/images/{record.filename}",
+        createdAt=datetime.fromtimestamp(record.mtime, tz=timezone.utc).isoformat(),
+        renditions={
+            name: Rendition(
+                url=f"/images/{RENDITIONS_DIRNAME}/{photo_id}/{info['file']}",
+                width=info["width"],
+                height=info["height"],
+            )
+            for name, info in record.renditions.items()
+        },
+        clusterId=record.cluster_id or photo_id,
+    )
+
+
+def build_prefetch_image(record: PhotoRecord) -> PrefetchImage:
+    """
+    Describe the image a display shows for a photo.
+
+    Args:
+        record: Photo index record
+
+    Returns:
+        PrefetchImage for the display (largest) rendition, or for the
+        original when the photo has none; bytes is 0 if the file has
+        disappeared
+    """
+    photo_id = record.photo_id
+    info = record.renditions.get(DISPLAY_RENDITION)
+    if info is not None:
+        path = DISPLAY_IMAGES_DIR / RENDITIONS_DIRNAME / photo_id / info["file"]
+        url = f"/images/{RENDITIONS_DIRNAME}/{photo_id}/{info['file']}"
+        size = info.get("bytes")
+    else:
+        path = DISPLAY_IMAGES_DIR / record.filename
+        url = f"/images/{record.filename}"
+        size = None
+
+    if size is None:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = 0
+
+    return PrefetchImage(
+        id=photo_id,
+        url=url,
+        bytes=size,
+        width=info["width"] if info else None,
+        height=info["height"] if info else None,
+    )
+
+
+def photos_body() -> tuple[bytes, str]:
+    """
+    Serialized photo list and its ETag, rebuilt only when the index changed.
+
+    The ETag is a hash of the body, so it only changes when the photo set
+    (or its renditions) actually changes, including across restarts.
+    """
+    global _cached_body
+
+    version, body, etag = _cached_body
+    if version != photo_index.version:
+        photos = [build_photo(record) for record in photo_index.records()]
+        body = PhotoList.dump_json(photos)
+        etag = make_etag(body)
+        _cached_body = (photo_index.version, body, etag)
+        logger.info(f"Rebuilt photo list: {len(photos)} photos")
+
+    return body, etag
+
+
+def json_response(body: bytes, etag: str, if_none_match: Optional[str]) -> Response:
+    """
+    Build a revalidatable JSON response, or 304 if the client copy is current.
+
+    Args:
+        body: Serialized JSON body
+        etag: ETag of body
+        if_none_match: Client's If-None-Match header
+
+    Returns:
+        200 response with body, or 304 with no body
+    """
+    # no-cache: browsers may store the list but must revalidate every poll
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def parse_cursor(cursor: str) -> Optional[int]:
+    """
+    Parse a delta cursor issued by this index.
+
+    Cursors have the form ``<epoch>.<sequence>``. The epoch changes whenever
+    the index is rebuilt (e.g. after a restart), which invalidates old
+    cursors.
+
+    Args:
+        cursor: Cursor from a previous delta response ("" for a first load)
+
+    Returns:
+        Sequence number, or None if the cursor is empty, malformed, from
+        another epoch or too old to compute removals for
+    """
+    epoch, _, sequence = cursor.partition(".")
+    if epoch != photo_index.epoch or not sequence.isdigit():
+        return None
+
+    since = int(sequence)
+    return since if photo_index.is_cursor_valid(since) else None
+
+
+def photo_delta(cursor: str, limit: int) -> PhotoDelta:
+    """
+    Build the delta feed response for a cursor.
+
+    An unknown or expired cursor (including "") resets the client: the
+    feed restarts from the first photo and ``reset`` tells the client to
+    drop what it has. An idle poll returns empty lists, so its size does
+    not depend on the number of photos.
+
+    Args:
+        cursor: Cursor from a previous delta response
+        limit: Maximum number of photos to return
+
+    Returns:
+        PhotoDelta with added photos, removed IDs and the next cursor
+    """
+    since = parse_cursor(cursor)
+    reset = since is None
+
+    added, removed, next_sequence, has_more = photo_index.changes_since(since or 0, limit)
+
+    return PhotoDelta(
+        photos=[build_photo(record) for record in added],
+        removed=[] if reset else removed,
+        cursor=f"{photo_index.epoch}.{next_sequence}",
+        hasMore=has_more,
+        reset=reset,
+    )
+
+
+@router.get("/api/photos/next", tags=["Photos"], response_model=UpcomingPhotos)
+async def get_next_photos(
+    after: Optional[str] = Query(default=None, description="ID of the photo on screen"),
+    count: int = Query(default=PREFETCH_WINDOW, ge=1, le=MAX_PREFETCH_WINDOW),
+) -> Response:
+    """
+    Get the next photos to show, in the server's rotation order.
+
+    The rotation is one photo per near-duplicate cluster, oldest first,
+    wrapping around. Without ``after`` (or with a photo that has since been
+    deleted) it starts from the beginning.
+
+    Returns:
+        UpcomingPhotos: up to ``count`` images to prefetch, with the URL,
+        byte size and dimensions of what the display will show
+    """
+    photo_index.refresh(DISPLAY_IMAGES_DIR)
+    upcoming = UpcomingPhotos(
+        photos=[build_prefetch_image(record) for record in rotation.upcoming(after, count)],
+        rotationLength=len(rotation.order()),
+    )
+    return Response(
+        content=upcoming.model_dump_json(),
+        media_type="application/json",
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+@router.get("/api/photos", tags=["Photos"], response_model=Union[List[Photo], PhotoDelta])
+async def get_photos(
+    since: Optional[str] = Query(default=None, description="Delta cursor; empty for a first load"),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(default=None),
+) -> Response:
     """
     Get all photos from display_images directory.
 
     Returns photos sorted chronologically by file modification time (oldest first).
+    Served from the in-memory photo index: an unchanged poll costs one
+    directory stat and no serialization. Send the last ETag in
+    If-None-Match to get an empty 304 when nothing changed.
+
+    With ``since`` (use an empty value for the first request) returns a
+    PhotoDelta page of at most ``limit`` photos instead; keep requesting
+    with the returned cursor while ``hasMore`` is true.
 
     Returns:
-        List[Photo]: Array of photo objects with id, url, and createdAt
+        List[Photo]: Array of photo objects with id, url, createdAt and
+        renditions (screen-fit, thumbnail, placeholder URLs and dimensions),
+        or PhotoDelta when ``since`` is given
     """
-    photos = []
-
     try:
-        # Check if directory exists
+        # Check if directory exists (the index then simply holds no photos)
         if not DISPLAY_IMAGES_DIR.exists():
             logger.warning(f"Display images directory does not exist: {DISPLAY_IMAGES_DIR}")
-            return photos
-
-        # Get all image files from display_images directory
-        image_extensions = {'.jpg', '.jpeg', '.png', '.heic'}
-        image_files = [
-            f for f in DISPLAY_IMAGES_DIR.iterdir()
-            if f.is_file() and f.suffix.lower() in image_extensions
-        ]
-
-        # Sort by modification time (oldest first)
-        image_files.sort(key=lambda f: f.stat().st_mtime)
-
-        # Build photo objects
-        for image_file in image_files:
-            # Get file modification time
-            mtime = image_file.stat().st_mtime
-            created_at = datetime.fromtimestamp(mtime, tz=timezone.utc).isoformat()
-
-            # Create photo object
-            photo = Photo(
-                id=str(uuid.uuid4()),
-                url=f"/images/{image_file.name}",
-                createdAt=created_at
+
+        photo_index.refresh(DISPLAY_IMAGES_DIR)
+
+        if since is not None:
+            delta = photo_delta(since, limit)
+            return Response(
+                content=delta.model_dump_json(),
+                media_type="application/json",
+                headers={"Cache-Control": "no-store"}
             )
-            photos.append(photo)
 
-        logger.info(f"Fetched {len(photos)} photos from display_images directory")
+        body, etag = photos_body()
 
     except Exception as e:
         logger.error(f"Error fetching photos: {str(e)}")
-        # Return empty list on error
-        return photos
+        # Return empty list on error (not cacheable)
+        return Response(content=EMPTY_BODY, media_type="application/json")
 
-    return photos
+    return json_response(body, etag, if_none_match)
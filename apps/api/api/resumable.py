@@ -0,0 +1,438 @@
+"""
+Resumable photo upload API endpoints.
+
+A simple three-step protocol for guests on flaky Wi-Fi:
+
+1. ``POST /api/upload/sessions`` with ``{"filename", "size"}`` starts a
+   session and returns its ID (and a Location header).
+2. ``PATCH /api/upload/sessions/{id}`` with an ``Upload-Offset`` header
+   appends the request body at that offset. Bytes are written to disk as
+   they arrive, so a transfer cut off half way keeps everything received.
+   The image header is validated as soon as it has arrived; a session
+   whose data is not a valid image is deleted.
+   ``HEAD`` (or ``GET``) on the session returns the ``Upload-Offset`` to
+   resume from. A PATCH at the offset on disk takes over from an earlier
+   PATCH that is still open (a guest whose Wi-Fi dropped mid-transfer
+   leaves the server waiting for the rest of that body); the stalled
+   request stops writing the moment it wakes up.
+3. ``POST /api/upload/sessions/{id}/complete`` once every byte is there
+   de-duplicates the photo and hands it to the processor with an atomic
+   rename into raw_images.
+
+Sessions idle for UPLOAD_SESSION_TTL_SECONDS are deleted in the background.
+"""
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from api.upload import (
+    ALLOWED_EXTENSIONS,
+    MAX_FILE_SIZE,
+    _write_chunk,
+    invalid_image_exception,
+    raw_upload_path,
+)
+from core.config import DEDUP_MODE, FSYNC_POLICY, UPLOAD_HEADER_MAX_BYTES, UPLOAD_RETRY_AFTER_SECONDS
+from core.dedup import content_index, hash_file
+from core.durability import commit_upload, fsync_path
+from core.executors import run_io
+from core.journal import RECEIVED, processing_journal
+from core.processor import pipeline
+from core.upload_sessions import UploadSession, upload_sessions
+from core.validation import InvalidImageError, UploadValidator, validate_file
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Router instance
+router = APIRouter()
+
+
+class SessionClaim:
+    """A request writing a session; a PATCH claim may be taken over."""
+
+    def __init__(self, replaceable: bool):
+        self.replaceable = replaceable
+
+
+# Sessions with a PATCH or completion in progress
+_active: dict[str, SessionClaim] = {}
+
+
+class SessionCreate(BaseModel):
+    """Request body for starting a resumable upload."""
+    filename: str
+    size: int
+
+
+def session_headers(session: UploadSession) -> dict:
+    """Headers describing a session's progress."""
+    return {
+        "Upload-Offset": str(session.offset),
+        "Upload-Length": str(session.size),
+        "Cache-Control": "no-store",
+    }
+
+
+def session_body(session: UploadSession) -> dict:
+    """JSON description of a session."""
+    return {
+        "id": session.id,
+        "offset": session.offset,
+        "size": session.size,
+        "completed": session.result is not None,
+    }
+
+
+async def get_session(session_id: str) -> UploadSession:
+    """
+    Load a session or fail with 404.
+
+    Raises:
+        HTTPException: 404 if the session is unknown or expired
+    """
+    session = await run_io(upload_sessions.get, session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail={"error": "Upload session not found or expired"})
+    return session
+
+
+def claim_session(session: UploadSession, replaceable: bool) -> SessionClaim:
+    """
+    Mark a session busy so two requests never write it at once.
+
+    The caller has checked that it continues from the offset on disk, so an
+    earlier PATCH still holding the session is stalled: its claim is taken
+    over. A completion in progress is never taken over.
+
+    Args:
+        session: Session to write
+        replaceable: True for PATCH, False for completion
+
+    Returns:
+        The claim, to check with owns_session and give back with release_session
+
+    Raises:
+        HTTPException: 409 if the session is being completed
+    """
+    current = _active.get(session.id)
+    if current is not None and not current.replaceable:
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Upload already in progress", "offset": session.offset},
+            headers={**session_headers(session), "Retry-After": "1"},
+        )
+    if current is not None:
+        logger.info(f"Upload session {session.id}: taking over from a stalled PATCH at offset {session.offset}")
+
+    claim = SessionClaim(replaceable)
+    _active[session.id] = claim
+    return claim
+
+
+def owns_session(session_id: str, claim: SessionClaim) -> bool:
+    """True while no newer request has taken the session over."""
+    return _active.get(session_id) is claim
+
+
+def release_session(session_id: str, claim: SessionClaim) -> None:
+    """Give back a claim, unless a newer request has taken it over."""
+    if owns_session(session_id, claim):
+        del _active[session_id]
+
+
+@router.post("/api/upload/sessions", tags=["Upload"], status_code=201)
+async def create_session(body: SessionCreate) -> JSONResponse:
+    """
+    Start a resumable upload.
+
+    Args:
+        body: Original filename and total size in bytes
+
+    Returns:
+        JSONResponse (201) with the session ID, offset 0 and size
+
+    Raises:
+        HTTPException: 400 invalid format or size, 413 too large, 503 busy
+    """
+    file_extension = Path(body.filename).suffix.lower()
+    if file_extension not in ALLOWED_EXTENSIONS:
+        logger.warning(f"Upload session rejected - invalid format: {body.filename}")
+        raise HTTPException(
+            status_code=400,
+            detail={"error": "Invalid file format", "accepted_formats": ["jpeg", "png", "heic"]}
+        )
+    if body.size <= 0:
+        raise HTTPException(status_code=400, detail={"error": "Invalid file size"})
+    if body.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail={"error": "File too large", "max_size_mb": 25})
+
+    if pipeline.running and pipeline.is_full():
+        logger.warning(f"Upload session rejected - processing queue full: {body.filename}")
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Server busy, please retry shortly"},
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)}
+        )
+
+    session = await run_io(upload_sessions.create, body.filename, body.size)
+    logger.info(f"Upload session {session.id} started: {body.filename}, {body.size} bytes")
+    headers = session_headers(session)
+    headers["Location"] = f"/api/upload/sessions/{session.id}"
+    return JSONResponse(status_code=201, content=session_body(session), headers=headers)
+
+
+@router.api_route("/api/upload/sessions/{session_id}", methods=["GET", "HEAD"], tags=["Upload"])
+async def get_upload_session(session_id: str) -> JSONResponse:
+    """
+    Get the offset to resume an upload from.
+
+    Returns:
+        JSONResponse with the session state; Upload-Offset and Upload-Length
+        headers carry the same for HEAD requests
+
+    Raises:
+        HTTPException: 404 if the session is unknown or expired
+    """
+    session = await get_session(session_id)
+    return JSONResponse(content=session_body(session), headers=session_headers(session))
+
+
+@router.patch("/api/upload/sessions/{session_id}", tags=["Upload"], status_code=204)
+async def append_to_session(
+    session_id: str,
+    request: Request,
+    upload_offset: Optional[int] = Header(default=None),
+) -> Response:
+    """
+    Append the request body to an upload at ``Upload-Offset``.
+
+    Each received chunk is written to disk immediately; if the connection
+    drops, the bytes that arrived are kept and HEAD reports the new offset.
+    Until the image header is complete, chunks are also validated; an
+    invalid image ends (and deletes) the session. A PATCH at the offset on
+    disk takes over from a stalled earlier one, which then stops writing.
+
+    Returns:
+        204 with the new Upload-Offset
+
+    Raises:
+        HTTPException: 400 missing Upload-Offset or invalid image, 404
+        unknown session, 409 offset mismatch, completed session, completion
+        in progress or taken over by a newer PATCH, 413 body longer than the
+        declared size or image dimensions too large
+    """
+    if upload_offset is None:
+        raise HTTPException(status_code=400, detail={"error": "Missing Upload-Offset header"})
+
+    session = await get_session(session_id)
+    if session.result is not None or upload_offset != session.offset:
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Upload offset mismatch", "offset": session.offset},
+            headers=session_headers(session),
+        )
+
+    claim = claim_session(session, replaceable=True)
+    superseded = False
+    try:
+        offset = session.offset
+        too_long = False
+        f = await run_io(open, upload_sessions.data_path(session), "r+b")
+        try:
+            # Resume validation where an earlier PATCH left off; past
+            # UPLOAD_HEADER_MAX_BYTES the header has already been checked
+            validator = None
+            if offset < UPLOAD_HEADER_MAX_BYTES:
+                validator = UploadValidator(session.filename)
+                validator.feed(await run_io(f.read, offset))
+            await run_io(f.seek, offset)
+            async for chunk in request.stream():
+                if not owns_session(session_id, claim):
+                    # A newer PATCH resumed the upload while this one stalled
+                    superseded = True
+                    break
+                room = session.size - offset
+                if len(chunk) > room:
+                    chunk, too_long = chunk[:room], True
+                if chunk:
+                    if validator is not None:
+                        validator.feed(chunk)
+                    await run_io(_write_chunk, f, None, chunk)
+                    offset += len(chunk)
+                if too_long:
+                    break
+        finally:
+            await run_io(f.close)
+    except InvalidImageError as e:
+        logger.warning(f"Upload session {session_id} rejected - invalid image: {session.filename}, {e}")
+        await run_io(upload_sessions.delete, session)
+        raise invalid_image_exception(e)
+    finally:
+        release_session(session_id, claim)
+
+    if superseded:
+        logger.info(f"Upload session {session_id}: stalled PATCH stopped after a takeover")
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Upload taken over by a newer request"},
+            headers=session_headers(await get_session(session_id)),
+        )
+
+    session.offset = offset
+    if too_long:
+        logger.warning(f"Upload session {session_id}: body exceeds declared size {session.size}")
+        raise HTTPException(
+            status_code=413,
+            detail={"error": "Upload exceeds declared size"},
+            headers=session_headers(session),
+        )
+    return Response(status_code=204, headers=session_headers(session))
+
+
+@router.post("/api/upload/sessions/{session_id}/complete", tags=["Upload"])
+async def complete_session(session_id: str) -> JSONResponse:
+    """
+    Finish a resumable upload and hand the photo to the processor.
+
+    Completing an already completed session returns the same response, so
+    a client that lost the first reply can simply retry.
+
+    Returns:
+        JSONResponse with success status and filename (``duplicate`` if the
+        same bytes were uploaded before)
+
+    Raises:
+        HTTPException: 400/413 invalid image (the session is deleted), 404
+        unknown session, 409 bytes still missing or a PATCH in progress,
+        500 if the handoff fails
+    """
+    session = await get_session(session_id)
+    if session.result is not None:
+        return JSONResponse(status_code=200, content=session.result)
+    if not session.complete:
+        raise HTTPException(
+            status_code=409,
+            detail={"error": "Upload incomplete", "offset": session.offset},
+            headers=session_headers(session),
+        )
+
+    claim = claim_session(session, replaceable=False)
+    try:
+        data_path = upload_sessions.data_path(session)
+        if session.handoff is not None and not await run_io(data_path.exists):
+            # An earlier attempt moved the data, then crashed or failed
+            result = await finish_hand_off(session)
+            return JSONResponse(status_code=200, content=result)
+        await run_io(validate_file, data_path, session.filename)
+        result = await hand_off(session)
+    except InvalidImageError as e:
+        logger.warning(f"Upload session {session_id} rejected - invalid image: {session.filename}, {e}")
+        await run_io(upload_sessions.delete, session)
+        raise invalid_image_exception(e)
+    except OSError as e:
+        logger.error(f"Failed to complete upload session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail={"error": "Failed to save uploaded file"})
+    finally:
+        release_session(session_id, claim)
+
+    return JSONResponse(status_code=200, content=result)
+
+
+async def hand_off(session: UploadSession) -> dict:
+    """
+    Move a fully received session into raw_images and queue it.
+
+    Args:
+        session: Session whose data file holds every declared byte
+
+    Returns:
+        The upload result, also recorded in the session for retries
+    """
+    data_path = upload_sessions.data_path(session)
+    result = {
+        "success": True,
+        "message": "Photo uploaded successfully",
+        "filename": session.filename,
+    }
+
+    digest = None
+    if DEDUP_MODE != "off":
+        candidate = await run_io(hash_file, data_path)
+        if not content_index.claim(candidate):
+            logger.info(f"Duplicate upload skipped: {session.filename}")
+            result["duplicate"] = True
+            await run_io(upload_sessions.mark_handing_off, session, None, result)
+            await run_io(remove_file, data_path)
+            await run_io(upload_sessions.mark_completed, session, result)
+            return result
+        digest = candidate
+
+    file_path = raw_upload_path(session.filename)
+    try:
+        await run_io(upload_sessions.mark_handing_off, session, file_path, result)
+        if FSYNC_POLICY == "file":
+            await run_io(fsync_path, data_path)
+        # Atomic on POSIX: the processor never sees a partial photo
+        await run_io(os.replace, data_path, file_path)
+    except BaseException:
+        if digest is not None:
+            content_index.release(digest)
+        raise
+
+    await commit_upload(file_path, FSYNC_POLICY)
+    if digest is not None:
+        try:
+            await run_io(content_index.append, digest)
+        except OSError as e:
+            logger.error(f"Failed to persist content hash for {file_path.name}: {e}")
+    await queue_handed_off(session, file_path, result)
+    return result
+
+
+async def finish_hand_off(session: UploadSession) -> dict:
+    """
+    Finish a handoff interrupted after the session's data was moved.
+
+    The photo is queued if it is still waiting in raw_images.
+
+    Args:
+        session: Session with a handoff record and no data file
+
+    Returns:
+        The upload result recorded before the data was moved
+    """
+    result = session.handoff["result"]
+    if session.handoff["path"] is not None:
+        file_path = Path(session.handoff["path"])
+        if await run_io(file_path.exists):
+            logger.warning(f"Upload session {session.id}: finishing interrupted handoff of {file_path.name}")
+            await commit_upload(file_path, FSYNC_POLICY)
+            await queue_handed_off(session, file_path, result)
+            return result
+
+    # A duplicate, or a photo the processor has already taken
+    await run_io(upload_sessions.mark_completed, session, result)
+    return result
+
+
+async def queue_handed_off(session: UploadSession, file_path: Path, result: dict) -> None:
+    """Journal a photo moved into raw_images, complete its session and queue it."""
+    try:
+        await run_io(processing_journal.record, file_path.name, RECEIVED)
+    except OSError as e:
+        logger.error(f"Failed to journal upload {file_path.name}: {e}")
+
+    await run_io(upload_sessions.mark_completed, session, result)
+    logger.info(f"Upload session {session.id} completed: {session.filename}, saved as: {file_path.name}")
+    pipeline.submit(file_path)
+
+
+def remove_file(path: Path) -> None:
+    """Remove a session's data file if it is still there."""
+    path.unlink(missing_ok=True)
@@ -1,18 +1,31 @@
 """
-Photo upload API endpoint.
+Photo upload API endpoints.
 
 Handles multipart/form-data photo uploads with validation for format and size.
+``/api/upload`` takes one photo; ``/api/upload/batch`` takes many photos in
+one request, streams each part to raw_images as it arrives and reports a
+status per file, so one bad photo does not fail the rest.
 """
 import logging
+import os
 import re
 import time
 import uuid
+from functools import partial
 from pathlib import Path
+from typing import Optional, Union
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Request, UploadFile
 from fastapi.responses import JSONResponse
 
-from core.config import RAW_IMAGES_DIR
+from api.multipart import MultipartError, MultipartReader, PartHeaders
+from core.config import DEDUP_MODE, FSYNC_POLICY, RAW_IMAGES_DIR, UPLOAD_RETRY_AFTER_SECONDS
+from core.dedup import HashIndex, content_index, new_content_hasher
+from core.durability import commit_upload
+from core.executors import run_io
+from core.journal import RECEIVED, processing_journal
+from core.processor import pipeline
+from core.validation import InvalidImageError, UploadValidator
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,6 +36,24 @@ router = APIRouter()
 # Constants
 MAX_FILE_SIZE = 25 * 1024 * 1024  # 25MB in bytes
 ALLOWED_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.heic']
+UPLOAD_CHUNK_SIZE = 256 * 1024  # 256KB per read while streaming to disk
+PARTIAL_UPLOAD_SUFFIX = ".part"
+MAX_BATCH_FILES = 50  # photos accepted per batch request
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload stream exceeds MAX_FILE_SIZE."""
+
+
+class DuplicateUploadError(Exception):
+    """Raised when an upload's bytes match a photo that was already received."""
+
+
+def _write_chunk(f, hasher, chunk: bytes) -> None:
+    """Write one chunk and feed it to the content hasher (I/O executor)."""
+    f.write(chunk)
+    if hasher is not None:
+        hasher.update(chunk)
 
 
 def sanitize_filename(filename: str) -> str:
@@ -51,6 +82,132 @@ def sanitize_filename(filename: str) -> str:
     return filename
 
 
+def raw_upload_path(original_filename: str) -> Path:
+    """
+    Choose a unique raw_images path for an upload.
+
+    Args:
+        original_filename: Filename sent by the client
+
+    Returns:
+        Path named ``<timestamp_ns>_<random>_<sanitized name>``, so the
+        processor handles uploads in arrival order
+    """
+    # Sanitize original filename to prevent path traversal
+    safe_filename = sanitize_filename(original_filename)
+
+    # Generate unique temporary filename
+    timestamp = int(time.time_ns())
+    random_suffix = uuid.uuid4().hex[:8]
+    return RAW_IMAGES_DIR / f"{timestamp}_{random_suffix}_{safe_filename}"
+
+
+async def stream_upload_to_disk(
+    photo: Union[UploadFile, MultipartReader],
+    file_path: Path,
+    fsync_policy: str = FSYNC_POLICY,
+    dedup_index: Optional[HashIndex] = None,
+    validator: Optional[UploadValidator] = None,
+) -> int:
+    """
+    Stream an uploaded file to disk in fixed-size chunks.
+
+    The body is copied into a temporary ``.part`` file next to ``file_path``
+    (invisible to the processor's extension globs) and only renamed into place
+    once it is complete, so at most one chunk per upload is held in memory.
+    Every open, write, fsync and rename runs on the I/O executor, never on
+    the event loop.
+
+    With a validator, each chunk is checked before it is written, so a file
+    that is not a valid image is rejected as soon as its header has arrived.
+    With a dedup index the bytes are hashed as they are written; an upload
+    whose hash is already known is discarded before the rename, so the
+    processor never sees it.
+
+    Args:
+        photo: Uploaded file from multipart/form-data, or a MultipartReader
+               positioned on a file part
+        file_path: Final destination path in raw_images
+        fsync_policy: "none", "file" or "batch" (see core.durability)
+        dedup_index: Content hashes of earlier uploads, or None to disable
+        validator: Header validator for the upload, or None to skip
+
+    Returns:
+        Number of bytes written
+
+    Raises:
+        FileTooLargeError: As soon as the running size passes MAX_FILE_SIZE
+        InvalidImageError: As soon as the validator rejects the upload
+        DuplicateUploadError: If the content hash is already in dedup_index
+        OSError: If reading or writing fails
+    """
+    temp_path = file_path.with_name(file_path.name + PARTIAL_UPLOAD_SUFFIX)
+    hasher = new_content_hasher() if dedup_index is not None else None
+    digest = None
+    file_size = 0
+
+    try:
+        f = await run_io(open, temp_path, 'wb')
+        try:
+            while chunk := await photo.read(UPLOAD_CHUNK_SIZE):
+                file_size += len(chunk)
+                if file_size > MAX_FILE_SIZE:
+                    raise FileTooLargeError(file_size)
+                if validator is not None:
+                    validator.feed(chunk)
+                await run_io(_write_chunk, f, hasher, chunk)
+            if validator is not None:
+                validator.finish()
+
+            if hasher is not None:
+                if not dedup_index.claim(hasher.digest()):
+                    raise DuplicateUploadError(hasher.hexdigest())
+                digest = hasher.digest()
+
+            if fsync_policy == "file":
+                await run_io(f.flush)
+                await run_io(os.fsync, f.fileno())
+        finally:
+            await run_io(f.close)
+
+        # Atomic on POSIX: the processor never sees a half-written file
+        await run_io(os.replace, temp_path, file_path)
+    except BaseException:
+        if digest is not None:
+            dedup_index.release(digest)
+        await run_io(partial(temp_path.unlink, missing_ok=True))
+        raise
+
+    await commit_upload(file_path, fsync_policy)
+
+    if digest is not None:
+        try:
+            await run_io(dedup_index.append, digest)
+        except OSError as e:
+            # The photo is safely received; only future dedup of it is lost
+            logger.error(f"Failed to persist content hash for {file_path.name}: {e}")
+
+    try:
+        await run_io(processing_journal.record, file_path.name, RECEIVED)
+    except OSError as e:
+        logger.error(f"Failed to journal upload {file_path.name}: {e}")
+
+    return file_size
+
+
+def invalid_image_status(error: InvalidImageError) -> tuple[int, str, str]:
+    """Status code, error message and reason for a rejected image."""
+    if error.reason == "dimensions":
+        return 413, "Image dimensions too large", error.reason
+    return 400, "Invalid image file", error.reason
+
+
+def invalid_image_exception(error: InvalidImageError) -> HTTPException:
+    """HTTPException for an upload the validator rejected."""
+    status_code, message, reason = invalid_image_status(error)
+    return HTTPException(status_code=status_code, detail={"error": message, "reason": reason})
+
+
 @router.post("/api/upload", tags=["Upload"])
 async def upload_photo(photo: UploadFile = File(...)) -> JSONResponse:
     """
@@ -97,22 +254,45 @@ async def upload_photo(photo: UploadFile = File(...)) -> JSONResponse:
             }
         )
 
-    # Read file content
-    try:
-        contents = await photo.read()
-    except Exception as e:
-        logger.error(f"Failed to read file: {original_filename}, error: {str(e)}")
+    # Backpressure: refuse new work while the processing queue is full
+    if pipeline.running and pipeline.is_full():
+        logger.warning(
+            f"Upload rejected - processing queue full: {original_filename}"
+        )
         raise HTTPException(
-            status_code=500,
-            detail={"error": "Failed to read uploaded file"}
+            status_code=503,
+            detail={"error": "Server busy, please retry shortly"},
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)}
         )
 
-    # Validate file size
-    file_size = len(contents)
-    if file_size > MAX_FILE_SIZE:
+    # Stream file to disk (directory created by app lifespan on startup)
+    file_path = raw_upload_path(original_filename)
+    temp_filename = file_path.name
+    dedup_index = content_index if DEDUP_MODE != "off" else None
+    try:
+        file_size = await stream_upload_to_disk(
+            photo, file_path, FSYNC_POLICY, dedup_index, UploadValidator(original_filename)
+        )
+        logger.info(
+            f"Photo uploaded successfully: {original_filename}, "
+            f"size: {file_size} bytes, saved as: {temp_filename}"
+        )
+    except DuplicateUploadError:
+        # Already received: report success so the guest's retry is not an error
+        logger.info(f"Duplicate upload skipped: {original_filename}")
+        return JSONResponse(
+            status_code=200,
+            content={
+                "success": True,
+                "message": "Photo uploaded successfully",
+                "filename": original_filename,
+                "duplicate": True
+            }
+        )
+    except FileTooLargeError:
         logger.warning(
             f"Upload rejected - file too large: {original_filename}, "
-            f"size: {file_size} bytes"
+            f"size: over {MAX_FILE_SIZE} bytes"
         )
         raise HTTPException(
             status_code=413,
@@ -121,24 +301,9 @@ async def upload_photo(photo: UploadFile = File(...)) -> JSONResponse:
                 "max_size_mb": 25
             }
         )
-
-    # Sanitize original filename to prevent path traversal
-    safe_filename = sanitize_filename(original_filename)
-
-    # Generate unique temporary filename
-    timestamp = int(time.time_ns())
-    random_suffix = uuid.uuid4().hex[:8]
-    temp_filename = f"{timestamp}_{random_suffix}_{safe_filename}"
-
-    # Save file (directory created by app lifespan on startup)
-    file_path = RAW_IMAGES_DIR / temp_filename
-    try:
-        with open(file_path, 'wb') as f:
-            f.write(contents)
-        logger.info(
-            f"Photo uploaded successfully: {original_filename}, "
-            f"size: {file_size} bytes, saved as: {temp_filename}"
-        )
+    except InvalidImageError as e:
+        logger.warning(f"Upload rejected - invalid image: {original_filename}, {e}")
+        raise invalid_image_exception(e)
     except Exception as e:
         logger.error(
             f"Failed to save file: {original_filename}, "
@@ -149,6 +314,10 @@ async def upload_photo(photo: UploadFile = File(...)) -> JSONResponse:
             detail={"error": "Failed to save uploaded file"}
         )
 
+    # Hand off to the processor; if the queue filled up meanwhile, the
+    # reconciliation sweep picks the file up later
+    pipeline.submit(file_path)
+
     # Return success response
     return JSONResponse(
         status_code=200,
@@ -158,3 +327,133 @@ async def upload_photo(photo: UploadFile = File(...)) -> JSONResponse:
             "filename": original_filename
         }
     )
+
+
+def batch_result(filename: str, status: int, **fields) -> dict:
+    """Per-file entry of a batch upload response."""
+    return {"filename": filename, "status": status, "success": status == 200, **fields}
+
+
+async def store_batch_part(
+    reader: MultipartReader,
+    part: PartHeaders,
+    dedup_index: Optional[HashIndex],
+) -> dict:
+    """
+    Validate one file part of a batch upload and stream it into raw_images.
+
+    Args:
+        reader: Reader positioned on the part's data
+        part: The part's headers (filename must be set)
+        dedup_index: Content hashes of earlier uploads, or None to disable
+
+    Returns:
+        batch_result for the file; rejected parts are left unread for the
+        reader to skip
+
+    Raises:
+        MultipartError: If the request body turns out to be malformed
+    """
+    original_filename = part.filename
+    file_extension = Path(original_filename).suffix.lower()
+    if file_extension not in ALLOWED_EXTENSIONS:
+        logger.warning(f"Batch upload file rejected - invalid format: {original_filename}")
+        return batch_result(original_filename, 400, error="Invalid file format")
+
+    file_path = raw_upload_path(original_filename)
+    try:
+        file_size = await stream_upload_to_disk(
+            reader, file_path, FSYNC_POLICY, dedup_index, UploadValidator(original_filename)
+        )
+    except DuplicateUploadError:
+        logger.info(f"Duplicate upload skipped: {original_filename}")
+        return batch_result(original_filename, 200, duplicate=True)
+    except FileTooLargeError:
+        logger.warning(f"Batch upload file rejected - file too large: {original_filename}")
+        return batch_result(original_filename, 413, error="File too large")
+    except InvalidImageError as e:
+        logger.warning(f"Batch upload file rejected - invalid image: {original_filename}, {e}")
+        status_code, message, reason = invalid_image_status(e)
+        return batch_result(original_filename, status_code, error=message, reason=reason)
+    except MultipartError:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to save file: {original_filename}, path: {file_path}, error: {str(e)}")
+        return batch_result(original_filename, 500, error="Failed to save uploaded file")
+
+    logger.info(
+        f"Photo uploaded successfully (batch): {original_filename}, "
+        f"size: {file_size} bytes, saved as: {file_path.name}"
+    )
+    pipeline.submit(file_path)
+    return batch_result(original_filename, 200)
+
+
+@router.post("/api/upload/batch", tags=["Upload"])
+async def upload_batch(request: Request) -> JSONResponse:
+    """
+    Upload many photos in one multipart/form-data request.
+
+    Every file part (any field name) is validated and streamed to disk as it
+    arrives, without waiting for the rest of the request. Each file gets its
+    own status (200, 400 invalid format or image or too many files, 413 too
+    large in bytes or pixels, 500 write failure); a failed file does not affect the others. At most
+    MAX_BATCH_FILES photos are stored per request.
+
+    Args:
+        request: Incoming request; the body is read incrementally
+
+    Returns:
+        JSONResponse with overall success and per-file results
+
+    Raises:
+        HTTPException: 400 if the body is not multipart/form-data or holds
+        no files, 503 while the processing queue is full
+    """
+    if pipeline.running and pipeline.is_full():
+        logger.warning("Batch upload rejected - processing queue full")
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Server busy, please retry shortly"},
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER_SECONDS)}
+        )
+
+    try:
+        reader = MultipartReader(request.headers.get("content-type", ""), request.stream())
+    except MultipartError:
+        raise HTTPException(status_code=400, detail={"error": "Expected multipart/form-data"})
+
+    dedup_index = content_index if DEDUP_MODE != "off" else None
+    results: list[dict] = []
+    storing: Optional[str] = None
+    try:
+        while (part := await reader.next_part()) is not None:
+            if part.filename is None:
+                continue  # plain form fields are ignored
+            if len(results) >= MAX_BATCH_FILES:
+                results.append(batch_result(part.filename, 400, error="Too many files"))
+                continue
+            storing = part.filename
+            results.append(await store_batch_part(reader, part, dedup_index))
+            storing = None
+    except MultipartError as e:
+        logger.warning(f"Batch upload body malformed after {len(results)} files: {e}")
+        if storing is not None:
+            results.append(batch_result(storing, 400, error="Malformed multipart body"))
+        elif not results:
+            raise HTTPException(status_code=400, detail={"error": "Malformed multipart body"})
+
+    if not results:
+        logger.warning("Batch upload rejected - no files")
+        raise HTTPException(status_code=400, detail={"error": "Missing photo field"})
+
+    uploaded = sum(1 for result in results if result["success"])
+    return JSONResponse(
+        status_code=200,
+        content={
+            "success": uploaded == len(results),
+            "uploaded": uploaded,
+            "failed": len(results) - uploaded,
+            "results": results,
+        }
+    )
@@ -0,0 +1,81 @@
+"""
+Backlog drain benchmark for the processing worker pool.
+
+Fills a temporary raw_images directory with N JPEGs (as after a Wi-Fi
+reconnect burst), starts the processor and measures how long it takes to
+empty the backlog. For comparison it prints the lower bound of the old
+scheduler, which processed a fixed slice of 5 files and then slept 10 s.
+
+Usage (from apps/api):
+    python benchmarks/bench_backlog_drain.py [--sizes 100,500,2000] [--workers N]
+"""
+import argparse
+import asyncio
+import math
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+import core.processor as processor  # noqa: E402
+
+OLD_SLICE = 5
+OLD_SLEEP_SECONDS = 10
+
+
+async def drain(count: int, payload: bytes) -> tuple[float, dict]:
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_drain_"))
+    raw_dir, display_dir, failed_dir = (work_dir / d for d in ("raw", "display", "failed"))
+    for directory in (raw_dir, display_dir, failed_dir):
+        directory.mkdir()
+    for i in range(count):
+        (raw_dir / f"{i:06d}_burst.jpg").write_bytes(payload)
+
+    processor.RAW_IMAGES_DIR = raw_dir
+    processor.DISPLAY_IMAGES_DIR = display_dir
+    processor.FAILED_IMAGES_DIR = failed_dir
+
+    start = time.perf_counter()
+    task = asyncio.create_task(processor.run_processor("poll"))
+    while any(raw_dir.iterdir()):
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - start
+    stats = processor.pipeline.stats()
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    shutil.rmtree(work_dir)
+    return elapsed, stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,500,2000")
+    parser.add_argument("--workers", type=int, default=processor.pipeline.workers)
+    parser.add_argument("--resolution", default="1280x960")
+    args = parser.parse_args()
+
+    processor.logger.setLevel("WARNING")
+    processor.pipeline.workers = args.workers
+
+    width, height = (int(v) for v in args.resolution.split("x"))
+    source = Path(tempfile.mkdtemp()) / "source.jpg"
+    Image.new("RGB", (width, height), color="orange").save(source, format="JPEG")
+    payload = source.read_bytes()
+
+    print(f"workers={args.workers} resolution={args.resolution}")
+    print(f"{'files':>6} {'drain (s)':>10} {'files/s':>8} {'mean util':>10} {'old lower bound (s)':>20}")
+    for count in (int(v) for v in args.sizes.split(",")):
+        elapsed, stats = asyncio.run(drain(count, payload))
+        utilisation = sum(w["utilisation"] for w in stats["workers"]) / len(stats["workers"])
+        old_bound = math.ceil(count / OLD_SLICE) * OLD_SLEEP_SECONDS
+        print(f"{count:>6} {elapsed:>10.1f} {count / elapsed:>8.1f} {utilisation:>10.2f} {old_bound:>20}")
+
+
+if __name__ == "__main__":
+    main()
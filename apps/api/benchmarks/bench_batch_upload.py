@@ -0,0 +1,167 @@
+"""
+Batch upload benchmark: one POST /api/upload/batch vs N sequential
+POST /api/upload requests.
+
+Starts the upload router under uvicorn in a child process and uploads the
+same N photos both ways, as the upload page would from a phone. A local TCP
+proxy adds a round-trip delay to every connection to stand in for a crowded
+Wi-Fi access point (it delays data without limiting bandwidth). Reports
+wall time, throughput and the server's CPU time (from /proc, Linux only).
+
+Usage (from apps/api):
+    python benchmarks/bench_batch_upload.py [--photos 30] [--size-mb 3] [--rtt-ms 0,30,80]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def serve(port: int, raw_dir: Path) -> None:
+    """Child process: upload router only."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    import api.upload as upload
+
+    upload.RAW_IMAGES_DIR = raw_dir
+    upload.DEDUP_MODE = "off"
+    app = FastAPI()
+    app.include_router(upload.router)
+    uvicorn.run(app, port=port, log_level="error")
+
+
+def cpu_seconds(pid: int) -> float:
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def delay_proxy(listen_port: int, target_port: int, rtt: float) -> asyncio.AbstractServer:
+    """TCP proxy adding rtt/2 of latency in each direction."""
+    async def pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def forward() -> None:
+            while (item := await queue.get()) is not None:
+                due, data = item
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+
+        task = asyncio.create_task(forward())
+        while data := await reader.read(65536):
+            queue.put_nowait((time.perf_counter() + rtt / 2, data))
+        queue.put_nowait(None)
+        await task
+
+    async def handle(client_reader, client_writer) -> None:
+        server_reader, server_writer = await asyncio.open_connection("127.0.0.1", target_port)
+        await asyncio.gather(
+            pipe(client_reader, server_writer), pipe(server_reader, client_writer),
+            return_exceptions=True,
+        )
+
+    return await asyncio.start_server(handle, "127.0.0.1", listen_port)
+
+
+async def upload(port: int, photos: list[tuple[str, bytes]], batched: bool) -> None:
+    import httpx
+
+    base = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base, timeout=None) as client:
+        if batched:
+            files = [("photos", (name, data, "image/jpeg")) for name, data in photos]
+            response = await client.post("/api/upload/batch", files=files)
+            response.raise_for_status()
+            assert response.json()["uploaded"] == len(photos)
+        else:
+            for name, data in photos:
+                response = await client.post("/api/upload", files={"photo": (name, data, "image/jpeg")})
+                response.raise_for_status()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def photo_bytes(size: int) -> bytes:
+    """Random bytes behind a real JPEG header, so uploads pass validation."""
+    import io
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buffer, "JPEG")
+    return buffer.getvalue() + os.urandom(size - buffer.tell())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=30)
+    parser.add_argument("--size-mb", type=float, default=3)
+    parser.add_argument("--rtt-ms", default="0,30,80", help="simulated round-trip times")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--raw-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, Path(args.raw_dir))
+        return
+
+    port = free_port()
+    raw_dir = Path(tempfile.mkdtemp(prefix="bench_batch_"))
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port), "--raw-dir", str(raw_dir)],
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    size = int(args.size_mb * 1024 * 1024)
+    photos = [(f"photo_{i:02d}.jpg", photo_bytes(size)) for i in range(args.photos)]
+    total_mb = size * args.photos / 1e6
+
+    print(f"{args.photos} photos x {args.size_mb:g} MB, best of {args.repeat}")
+    print(f"{'RTT (ms)':>8} {'mode':<12} {'seconds':>8} {'MB/s':>8} {'server CPU s':>12}")
+    try:
+        time.sleep(1.5)  # server startup
+        for rtt_ms in (float(v) for v in args.rtt_ms.split(",")):
+            for batched in (False, True):
+                async def measure() -> tuple[float, float]:
+                    target = port
+                    proxy = None
+                    if rtt_ms:
+                        target = free_port()
+                        proxy = await delay_proxy(target, port, rtt_ms / 1000)
+                    best = (float("inf"), 0.0)
+                    for _ in range(args.repeat):
+                        cpu_start, start = cpu_seconds(child.pid), time.perf_counter()
+                        await upload(target, photos, batched)
+                        elapsed = time.perf_counter() - start
+                        best = min(best, (elapsed, cpu_seconds(child.pid) - cpu_start))
+                        for path in raw_dir.iterdir():
+                            path.unlink()
+                    if proxy is not None:
+                        proxy.close()
+                    return best
+
+                elapsed, cpu = asyncio.run(measure())
+                mode = "batch" if batched else "sequential"
+                print(f"{rtt_ms:>8g} {mode:<12} {elapsed:>8.2f} {total_mb / elapsed:>8.1f} {cpu:>12.2f}")
+    finally:
+        child.terminate()
+        child.wait()
+        shutil.rmtree(raw_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
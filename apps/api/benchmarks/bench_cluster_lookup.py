@@ -0,0 +1,81 @@
+"""
+Near-duplicate lookup benchmark: multi-index hashing vs a linear scan.
+
+Fills the index with N synthetic dHash values (random photos plus bursts of
+near-identical frames) and times radius searches at several clustering
+thresholds, along with the share of stored hashes actually compared.
+
+Usage (from apps/api):
+    python benchmarks/bench_cluster_lookup.py [--sizes 1000,10000,100000] [--distances 4,8,12]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core.phash as phash  # noqa: E402
+from core.phash import MultiIndexHash, hamming_distance  # noqa: E402
+
+
+def synthetic_hashes(count: int, rng: random.Random) -> list[int]:
+    values = []
+    while len(values) < count:
+        base = rng.getrandbits(64)
+        values.append(base)
+        # One photo in five starts a burst of 5 near-identical frames
+        if rng.random() < 0.2:
+            for _ in range(4):
+                values.append(base ^ sum(1 << rng.randrange(64) for _ in range(rng.randrange(1, 5))))
+    return values[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--distances", default="4,8,12")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print(f"{'photos':>7} {'distance':>9} {'linear (ms)':>12} {'MIH (ms)':>10} {'compared':>9}")
+    for count in (int(v) for v in args.sizes.split(",")):
+        values = synthetic_hashes(count, rng)
+        index = MultiIndexHash()
+        for i, value in enumerate(values):
+            index.add(str(i), value)
+        queries = [rng.choice(values) ^ (1 << rng.randrange(64)) for _ in range(args.queries)]
+
+        for distance in (int(v) for v in args.distances.split(",")):
+            linear_queries = queries[:max(1, args.queries // 20)]
+            start = time.perf_counter()
+            for query in linear_queries:
+                [v for v in values if hamming_distance(query, v) <= distance]
+            linear_ms = (time.perf_counter() - start) / len(linear_queries) * 1000
+
+            compared = 0
+            original = phash.hamming_distance
+
+            def counting(a: int, b: int) -> int:
+                nonlocal compared
+                compared += 1
+                return original(a, b)
+
+            phash.hamming_distance = counting
+            for query in queries:
+                index.search(query, distance)
+            phash.hamming_distance = original
+
+            start = time.perf_counter()
+            for query in queries:
+                index.search(query, distance)
+            mih_ms = (time.perf_counter() - start) / len(queries) * 1000
+
+            share = compared / len(queries) / count
+            print(f"{count:>7} {distance:>9} {linear_ms:>12.3f} {mih_ms:>10.3f} {share:>9.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Display encoding benchmark: encode time versus bytes served.
+
+Downscales a camera-like photo and a phone screenshot to the display
+rendition size, then encodes them as JPEG (the previous rendition format),
+WebP and AVIF at several qualities, plus lossless WebP for the screenshot.
+Reports encode time and size per encoding, then the full policy
+(EncodePolicy.choose + encode_within_budget) under a few byte budgets,
+including the extra encodes of the quality search.
+
+Usage (from apps/api):
+    python benchmarks/bench_encode_policy.py [--repeat 3] [--size 1920]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from core.encoding import EncodePolicy, Encoding  # noqa: E402
+
+QUALITIES = (60, 75, 85, 95)
+BUDGETS_KB = (0, 500, 250, 100)
+
+
+def camera_photo() -> Image.Image:
+    noise = Image.merge("RGB", [Image.effect_noise((4032, 3024), sigma) for sigma in (20, 30, 40)])
+    return noise.filter(ImageFilter.GaussianBlur(1.5))
+
+
+def phone_screenshot() -> Image.Image:
+    image = Image.new("RGB", (1170, 2532), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1170, 180), fill=(30, 90, 200))
+    for y in range(300, 2400, 90):
+        draw.rectangle((40, y, 1130, y + 50), fill=(210, 210, 210))
+        draw.text((60, y + 15), "Lorem ipsum dolor sit amet " * 3, fill=(20, 20, 20))
+    return image
+
+
+def timed(func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--size", type=int, default=1920, help="display rendition longest edge")
+    args = parser.parse_args()
+
+    inputs = [("photo", "JPEG", camera_photo()), ("screenshot", "PNG", phone_screenshot())]
+    for _, _, image in inputs:
+        image.thumbnail((args.size, args.size), Image.Resampling.LANCZOS)
+
+    print(f"{'input':<11} {'encoding':<18} {'ms':>8} {'KB':>8}")
+    for label, _, image in inputs:
+        encodings = [Encoding(fmt, q) for fmt in ("JPEG", "WEBP") for q in QUALITIES]
+        encodings += [Encoding("AVIF", q) for q in (40, 50, 65, 80)]
+        if label == "screenshot":
+            encodings.append(Encoding("WEBP", 0, lossless=True))
+        for encoding in encodings:
+            data, ms = timed(lambda: EncodePolicy.encode(image, encoding), args.repeat)
+            name = f"{encoding.format} " + ("lossless" if encoding.lossless else f"q{encoding.quality}")
+            print(f"{label:<11} {name:<18} {ms:>8.1f} {len(data) / 1024:>8.1f}")
+
+    print()
+    print(f"{'input':<11} {'policy':<10} {'budget KB':>9} {'chosen':<18} {'ms':>8} {'KB':>8}")
+    for label, source_format, image in inputs:
+        for display_format in ("AUTO", "AVIF"):
+            for budget_kb in BUDGETS_KB:
+                policy = EncodePolicy(display_format, byte_budget=budget_kb * 1024)
+
+                def run():
+                    return policy.encode_within_budget(image, policy.choose(image, source_format))
+
+                (data, encoding), ms = timed(run, args.repeat)
+                chosen = f"{encoding.format} " + ("lossless" if encoding.lossless else f"q{encoding.quality}")
+                budget = str(budget_kb) if budget_kb else "none"
+                print(
+                    f"{label:<11} {display_format:<10} {budget:>9} {chosen:<18} "
+                    f"{ms:>8.1f} {len(data) / 1024:>8.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
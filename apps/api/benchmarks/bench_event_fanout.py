@@ -0,0 +1,122 @@
+"""
+Event fan-out benchmark: photo events pushed to N SSE subscribers.
+
+Starts the /api/events endpoint under uvicorn in a child process, connects
+N streaming HTTP clients, and has the server publish photo_added events at
+a fixed rate. Reports delivery latency (publish to client receipt, across
+all subscribers) and the server process's CPU usage while publishing.
+
+Usage (from apps/api):
+    python benchmarks/bench_event_fanout.py [--subscribers 1,10,50] [--events 200] [--rate 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def serve(port: int, subscribers: int, events: int, rate: float) -> None:
+    """Child process: serve /api/events and publish events once all clients are in."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    from api.events import router
+    from core.events import broadcaster
+
+    app = FastAPI()
+    app.include_router(router)
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+
+    async def publisher() -> None:
+        while broadcaster.subscriber_count < subscribers:
+            await asyncio.sleep(0.05)
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        for seq in range(events):
+            broadcaster.publish("photo_added", {"seq": seq, "sentAt": time.time()})
+            await asyncio.sleep(1 / rate)
+        # Let the last events drain before reporting
+        await asyncio.sleep(0.5)
+        cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+        print(json.dumps({"cpu": cpu, "wall": wall, "stats": broadcaster.stats()}), flush=True)
+        server.should_exit = True
+
+    async def main() -> None:
+        task = asyncio.create_task(publisher())
+        await server.serve()
+        task.cancel()
+
+    asyncio.run(main())
+
+
+async def subscribe(port: int, events: int, latencies: list[float]) -> None:
+    import httpx
+
+    received = 0
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("GET", f"http://127.0.0.1:{port}/api/events") as response:
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    latencies.append((time.time() - json.loads(line[6:])["sentAt"]) * 1000)
+                    received += 1
+                    if received == events:
+                        return
+
+
+def run(subscribers: int, events: int, rate: float) -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port),
+         "--subscribers", str(subscribers), "--events", str(events), "--rate", str(rate)],
+        stdout=subprocess.PIPE, text=True, cwd=Path(__file__).resolve().parent.parent,
+    )
+    time.sleep(1.5)  # server startup
+
+    latencies: list[float] = []
+
+    async def clients() -> None:
+        await asyncio.gather(*(subscribe(port, events, latencies) for _ in range(subscribers)))
+
+    asyncio.run(clients())
+    report = json.loads(child.stdout.readline())
+    child.wait()
+
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    cpu_pct = 100 * report["cpu"] / report["wall"]
+    print(f"{subscribers:>11} {len(latencies):>10} {p50:>12.2f} {p99:>9.2f} {latencies[-1]:>9.2f} "
+          f"{cpu_pct:>13.1f} {report['stats']['resyncs']:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", default="1,10,50")
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20, help="events per second")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, int(args.subscribers), args.events, args.rate)
+        return
+
+    print(f"{args.events} events at {args.rate:g}/s")
+    print(f"{'subscribers':>11} {'delivered':>10} {'p50 (ms)':>12} {'p99':>9} {'max':>9} "
+          f"{'server CPU %':>13} {'resyncs':>8}")
+    for subscribers in (int(v) for v in args.subscribers.split(",")):
+        run(subscribers, args.events, args.rate)
+
+
+if __name__ == "__main__":
+    main()
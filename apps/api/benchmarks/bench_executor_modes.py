@@ -0,0 +1,78 @@
+"""
+Thread vs process executor benchmark for the CPU-heavy processing stage.
+
+Generates a mixed set of 12 MP JPEG and PNG files and runs
+PhotoProcessor.render_display_image over all of them concurrently, first on
+the thread pool and then on the process pool.
+
+Usage (from apps/api):
+    python benchmarks/bench_executor_modes.py [--jpeg 8] [--png 4] [--workers 4]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+from core import executors  # noqa: E402
+from core.processor import PhotoProcessor  # noqa: E402
+
+SIZE_12MP = (4000, 3000)
+
+
+def make_sources(work_dir: Path, jpegs: int, pngs: int) -> list[Path]:
+    """Create noisy 12 MP test images (noise keeps the codecs honest)."""
+    noise = Image.merge("RGB", [Image.effect_noise(SIZE_12MP, sigma) for sigma in (40, 60, 80)])
+    sources = []
+    for i in range(jpegs):
+        path = work_dir / f"photo_{i}.jpg"
+        noise.save(path, format="JPEG", quality=90)
+        sources.append(path)
+    for i in range(pngs):
+        path = work_dir / f"screenshot_{i}.png"
+        noise.save(path, format="PNG", compress_level=1)
+        sources.append(path)
+    return sources
+
+
+async def run_all(sources: list[Path], out_dir: Path) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        executors.run_cpu(PhotoProcessor.render_display_image, src, out_dir / src.name)
+        for src in sources
+    ))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jpeg", type=int, default=8)
+    parser.add_argument("--png", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_exec_"))
+    out_dir = work_dir / "out"
+    out_dir.mkdir()
+    sources = make_sources(work_dir, args.jpeg, args.png)
+
+    print(f"{len(sources)} files ({args.jpeg} JPEG + {args.png} PNG, 12 MP), workers={args.workers}, "
+          f"cores={os.cpu_count()}")
+    print(f"{'mode':<8} {'warm-up (s)':>12} {'total (s)':>10} {'files/s':>8}")
+    for mode in executors.EXECUTOR_MODES:
+        executors.configure_cpu_executor(mode, args.workers)
+        # First call pays process start-up/import cost; report it separately
+        warm_up = asyncio.run(run_all(sources[:1], out_dir))
+        elapsed = asyncio.run(run_all(sources, out_dir))
+        print(f"{mode:<8} {warm_up:>12.2f} {elapsed:>10.2f} {len(sources) / elapsed:>8.2f}")
+        executors.shutdown_executors()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Event-loop responsiveness benchmark: /health latency during parallel uploads.
+
+Starts the upload endpoint and /health under uvicorn in a child process,
+runs N clients uploading large files back to back, and probes /health
+every few milliseconds. Compares writing on the event loop (previous
+behaviour) with the I/O executor, under each fsync policy.
+
+Usage (from apps/api):
+    python benchmarks/bench_health_under_upload.py [--uploads 20] [--size-mb 20] [--seconds 10]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# (label, write mode, fsync policy)
+SCENARIOS = [
+    ("loop writes", "inline", "none"),
+    ("io executor", "offload", "none"),
+    ("loop writes + fsync", "inline", "file"),
+    ("io executor + fsync", "offload", "file"),
+    ("io executor + batch", "offload", "batch"),
+]
+
+
+def serve(port: int, raw_dir: Path, write_mode: str, fsync_policy: str) -> None:
+    """Child process: upload router plus /health."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    import api.upload as upload
+    import core.durability as durability
+
+    upload.RAW_IMAGES_DIR = raw_dir
+    upload.FSYNC_POLICY = fsync_policy
+    if write_mode == "inline":
+        # Previous behaviour: blocking file calls directly on the event loop
+        async def run_inline(func, *args):
+            return func(*args)
+        upload.run_io = run_inline
+        durability.run_io = run_inline
+
+    app = FastAPI()
+    app.include_router(upload.router)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    async def main() -> None:
+        server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+        if fsync_policy == "batch":
+            asyncio.get_running_loop().create_task(durability.fsync_batcher.run())
+        await server.serve()
+
+    asyncio.run(main())
+
+
+async def uploader(port: int, payload: bytes, deadline: float, raw_dir: Path) -> int:
+    import httpx
+
+    count = 0
+    async with httpx.AsyncClient(timeout=None) as client:
+        while time.perf_counter() < deadline:
+            response = await client.post(
+                f"http://127.0.0.1:{port}/api/upload",
+                files={"photo": ("bench.jpg", payload, "image/jpeg")},
+            )
+            response.raise_for_status()
+            count += 1
+            # Keep the disk from filling up: stand in for the processor
+            for path in raw_dir.glob("*bench.jpg"):
+                path.unlink(missing_ok=True)
+    return count
+
+
+def probe(port: int, seconds: float) -> None:
+    """Probe process: print /health latencies (ms) as JSON, away from the upload clients."""
+    import httpx
+
+    samples = []
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(timeout=None) as client:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.get(f"http://127.0.0.1:{port}/health").raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.01)
+    print(json.dumps(samples))
+
+
+def run(label: str, write_mode: str, fsync_policy: str, args: argparse.Namespace) -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    raw_dir = Path(tempfile.mkdtemp(prefix="bench_upload_", dir=args.dir))
+
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port), "--raw-dir", str(raw_dir),
+         "--write-mode", write_mode, "--fsync", fsync_policy],
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    try:
+        time.sleep(1.5)  # server startup
+        payload = photo_bytes(args.size_mb * 1024 * 1024)
+        prober = subprocess.Popen(
+            [sys.executable, __file__, "--probe", str(port), "--seconds", str(args.seconds)],
+            stdout=subprocess.PIPE, text=True,
+        )
+
+        async def load() -> int:
+            deadline = time.perf_counter() + args.seconds
+            results = await asyncio.gather(
+                *(uploader(port, payload, deadline, raw_dir) for _ in range(args.uploads)),
+            )
+            return sum(results)
+
+        uploads = asyncio.run(load())
+        samples = json.loads(prober.communicate()[0])
+    finally:
+        child.terminate()
+        child.wait()
+        shutil.rmtree(raw_dir, ignore_errors=True)
+
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{label:<22} {uploads:>8} {statistics.median(samples):>10.1f} {p99:>9.1f} {samples[-1]:>9.1f}")
+
+
+def photo_bytes(size: int) -> bytes:
+    """Random bytes behind a real JPEG header, so uploads pass validation."""
+    import io
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buffer, "JPEG")
+    return buffer.getvalue() + os.urandom(size - buffer.tell())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=20, help="parallel uploading clients")
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--dir", default=None, help="directory on the disk under test")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--probe", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--raw-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--write-mode", help=argparse.SUPPRESS)
+    parser.add_argument("--fsync", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe(args.probe, args.seconds)
+        return
+    if args.serve:
+        serve(args.serve, Path(args.raw_dir), args.write_mode, args.fsync)
+        return
+
+    print(f"{args.uploads} parallel uploads of {args.size_mb} MB for {args.seconds:g}s")
+    print(f"{'scenario':<22} {'uploads':>8} {'health p50':>10} {'p99 (ms)':>9} {'max':>9}")
+    for label, write_mode, fsync_policy in SCENARIOS:
+        run(label, write_mode, fsync_policy, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+HEIC transcode throughput benchmark.
+
+Encodes 12 MP camera-like HEIC photos with pillow-heif, then measures
+PhotoProcessor.transcode_heif (one decode shared by the display image and
+the renditions) with JPEG and WebP display output. Reports photos per
+second, the time of the bare HEIC decode for reference, and the display
+image size. The "dhash + transcode" row is what perceptual dedup mode cost
+when HEICs were hashed with a separate full decode; the processor now
+takes their dHash from the transcode. Needs the optional pillow-heif package.
+
+Usage (from apps/api):
+    python benchmarks/bench_heic_transcode.py [--photos 4]
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+import core.processor as processor  # noqa: E402
+from core.heif import HeifUnavailableError, ensure_heif_opener  # noqa: E402
+from core.phash import dhash  # noqa: E402
+from core.processor import PhotoProcessor  # noqa: E402
+
+SIZE_12MP = (4032, 3024)
+
+
+def make_sources(work_dir: Path, count: int) -> list[Path]:
+    import pillow_heif
+
+    noise = Image.merge("RGB", [Image.effect_noise(SIZE_12MP, sigma) for sigma in (20, 30, 40)])
+    sources = []
+    for i in range(count):
+        path = work_dir / f"iphone_{i}.heic"
+        pillow_heif.from_pillow(noise).save(path, quality=85)
+        sources.append(path)
+    return sources
+
+
+def decode_only(sources: list[Path]) -> float:
+    start = time.perf_counter()
+    for src in sources:
+        with Image.open(src) as image:
+            image.load()
+    return time.perf_counter() - start
+
+
+def transcode(
+    sources: list[Path], out_dir: Path, display_format: str, suffix: str, hash_first: bool = False
+) -> tuple[float, int]:
+    processor.HEIF_DISPLAY_FORMAT = display_format
+    total_out = 0
+    start = time.perf_counter()
+    for i, src in enumerate(sources):
+        if hash_first:
+            dhash(src)
+        output = out_dir / f"{display_format}_{i}{suffix}"
+        PhotoProcessor.transcode_heif(src, output, out_dir / f"{display_format}_{i}")
+        total_out += output.stat().st_size
+    return time.perf_counter() - start, total_out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=4)
+    args = parser.parse_args()
+
+    try:
+        ensure_heif_opener()
+    except HeifUnavailableError as e:
+        sys.exit(f"{e}: pip install pillow-heif")
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_heic_"))
+    out_dir = work_dir / "out"
+    out_dir.mkdir()
+    try:
+        sources = make_sources(work_dir, args.photos)
+        source_mb = sum(src.stat().st_size for src in sources) / len(sources) / 1e6
+        print(f"{args.photos} HEIC photos, {SIZE_12MP[0]}x{SIZE_12MP[1]}, {source_mb:.2f} MB each")
+        print(f"{'step':<22} {'s/photo':>8} {'photos/s':>9} {'display MB':>11}")
+
+        elapsed = decode_only(sources)
+        print(f"{'decode only':<22} {elapsed / args.photos:>8.2f} {args.photos / elapsed:>9.2f} {'-':>11}")
+        for display_format, suffix in (("JPEG", ".jpg"), ("WEBP", ".webp")):
+            elapsed, total_out = transcode(sources, out_dir, display_format, suffix)
+            print(
+                f"{'transcode ' + display_format:<22} {elapsed / args.photos:>8.2f} "
+                f"{args.photos / elapsed:>9.2f} {total_out / args.photos / 1e6:>11.2f}"
+            )
+        elapsed, total_out = transcode(sources, out_dir, "JPEG", ".jpg", hash_first=True)
+        print(
+            f"{'dhash + transcode JPEG':<22} {elapsed / args.photos:>8.2f} "
+            f"{args.photos / elapsed:>9.2f} {total_out / args.photos / 1e6:>11.2f}"
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
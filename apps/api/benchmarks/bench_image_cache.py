@@ -0,0 +1,76 @@
+"""
+/images serving benchmark: StaticFiles vs the in-memory image cache.
+
+Simulates D carousel displays that each fetch the same P screen renditions
+in the same order (as they do when a new photo is pushed to all of them),
+against a plain StaticFiles mount and the cached mount. Reports requests
+per second and how many bytes had to be read from storage.
+
+Usage (from apps/api):
+    python benchmarks/bench_image_cache.py [--displays 20] [--photos 50] [--kb 400]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+from starlette.staticfiles import StaticFiles  # noqa: E402
+
+from api.images import CachedStaticFiles  # noqa: E402
+from core.image_cache import ImageCache  # noqa: E402
+
+
+async def run(app: FastAPI, names: list[str], displays: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def display() -> None:
+            for name in names:
+                response = await client.get(f"/images/{name}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(display() for _ in range(displays)))
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--displays", type=int, default=20)
+    parser.add_argument("--photos", type=int, default=50)
+    parser.add_argument("--kb", type=int, default=400, help="size of each rendition")
+    args = parser.parse_args()
+
+    directory = Path(tempfile.mkdtemp(prefix="bench_images_"))
+    names = []
+    for i in range(args.photos):
+        name = f"{i:04d}-screen.jpg"
+        (directory / name).write_bytes(os.urandom(args.kb * 1024))
+        names.append(name)
+    requests = args.displays * args.photos
+    served = requests * args.kb * 1024
+
+    plain = FastAPI()
+    plain.mount("/images", StaticFiles(directory=str(directory)))
+    cache = ImageCache(max_bytes=64 * 1024 * 1024)
+    cached = FastAPI()
+    cached.mount("/images", CachedStaticFiles(directory=str(directory), cache=cache))
+
+    print(f"{args.displays} displays x {args.photos} renditions of {args.kb} KB")
+    print(f"{'mount':<12} {'req/s':>8} {'MB from storage':>16}")
+    elapsed = asyncio.run(run(plain, names, args.displays))
+    print(f"{'StaticFiles':<12} {requests / elapsed:>8.0f} {served / 1e6:>16.1f}")
+    elapsed = asyncio.run(run(cached, names, args.displays))
+    stored = served - cache.bytes_saved
+    print(f"{'cached':<12} {requests / elapsed:>8.0f} {stored / 1e6:>16.1f}")
+    print(f"hit ratio {cache.stats()['hitRatio']:.2%}, {cache.bytes_saved / 1e6:.1f} MB served from memory")
+
+
+if __name__ == "__main__":
+    main()
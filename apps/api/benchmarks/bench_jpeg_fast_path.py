@@ -0,0 +1,83 @@
+"""
+Lossless JPEG fast path benchmark.
+
+Generates 12 MP camera-like JPEGs (quality 92, with EXIF) and measures
+PhotoProcessor.render_display_image throughput and output size with the fast
+path disabled (decode + re-encode) and enabled. Upright photos exercise the
+lossless copy; rotated ones show the "transpose" vs "exif" orientation modes.
+
+Usage (from apps/api):
+    python benchmarks/bench_jpeg_fast_path.py [--photos 6]
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+import core.processor as processor  # noqa: E402
+from core.processor import PhotoProcessor  # noqa: E402
+
+SIZE_12MP = (4000, 3000)
+
+
+def make_sources(work_dir: Path, count: int, orientation: int) -> list[Path]:
+    noise = Image.merge("RGB", [Image.effect_noise(SIZE_12MP, sigma) for sigma in (20, 30, 40)])
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    exif[0x010F] = "BenchCam"
+    sources = []
+    for i in range(count):
+        path = work_dir / f"o{orientation}_{i}.jpg"
+        noise.save(path, format="JPEG", quality=92, exif=exif.tobytes())
+        sources.append(path)
+    return sources
+
+
+def run(sources: list[Path], out_dir: Path) -> tuple[float, int, str]:
+    total_out = 0
+    start = time.perf_counter()
+    for src in sources:
+        output = out_dir / f"{time.time_ns()}.jpg"
+        result = PhotoProcessor.render_display_image(src, output)
+        total_out += output.stat().st_size
+    return time.perf_counter() - start, total_out, result["method"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=6)
+    args = parser.parse_args()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_fast_"))
+    out_dir = work_dir / "out"
+    out_dir.mkdir()
+
+    cases = [
+        ("upright", 1, False, "transpose"),
+        ("upright", 1, True, "transpose"),
+        ("rotated", 6, True, "transpose"),
+        ("rotated", 6, True, "exif"),
+    ]
+    print(f"{args.photos} x 12 MP JPEG per case")
+    print(f"{'photos':<8} {'fast path':<10} {'orient.':<10} {'method':<9} {'photos/s':>9} {'out/in size':>12}")
+    sources_by_orientation = {}
+    for label, orientation, fast_path, mode in cases:
+        if orientation not in sources_by_orientation:
+            sources_by_orientation[orientation] = make_sources(work_dir, args.photos, orientation)
+        sources = sources_by_orientation[orientation]
+        total_in = sum(src.stat().st_size for src in sources)
+
+        processor.JPEG_FAST_PATH = fast_path
+        processor.ORIENTATION_MODE = mode
+        elapsed, total_out, method = run(sources, out_dir)
+        print(f"{label:<8} {'on' if fast_path else 'off':<10} {mode:<10} {method:<9} "
+              f"{len(sources) / elapsed:>9.2f} {total_out / total_in:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Large original download benchmark: StaticFiles vs the /images mount.
+
+Writes N large files, serves them under uvicorn in a child process with
+either a plain StaticFiles mount or the CachedStaticFiles mount used for
+/images, and downloads every file with C concurrent clients. Reports
+throughput and the server process's CPU time (user + system, read from
+/proc, so Linux only) per GB served. A second pass downloads each file in
+two halves with Range requests, as a client resuming an interrupted
+transfer would.
+
+uvicorn does not advertise the ASGI zero-copy extension, so under uvicorn
+both mounts copy through Python and the difference measured here is the
+read chunk size (FILE_CHUNK_BYTES vs Starlette's 64 KB). Servers that do
+advertise it get sendfile() from the /images mount.
+
+Usage (from apps/api):
+    python benchmarks/bench_large_files.py [--files 100] [--mb 25] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def serve(port: int, mode: str, directory: str) -> None:
+    """Child process: serve the directory with the requested mount."""
+    import uvicorn
+    from fastapi import FastAPI
+    from starlette.staticfiles import StaticFiles
+
+    from api.images import CachedStaticFiles
+
+    app = FastAPI()
+    mount = StaticFiles if mode == "StaticFiles" else CachedStaticFiles
+    app.mount("/images", mount(directory=directory))
+    uvicorn.run(app, port=port, log_level="warning")
+
+
+def cpu_seconds(pid: int) -> float:
+    fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def download(port: int, names: list[str], concurrency: int, size: int, ranged: bool) -> int:
+    import httpx
+
+    queue = list(names)
+    received = 0
+
+    async def worker(client: "httpx.AsyncClient") -> None:
+        nonlocal received
+        while queue:
+            url = f"/images/{queue.pop()}"
+            parts = [{"Range": f"bytes=0-{size // 2 - 1}"}, {"Range": f"bytes={size // 2}-"}] if ranged else [{}]
+            for headers in parts:
+                async with client.stream("GET", url, headers=headers) as response:
+                    response.raise_for_status()
+                    async for chunk in response.aiter_raw():
+                        received += len(chunk)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return received
+
+
+def run(mode: str, directory: Path, names: list[str], size: int, concurrency: int) -> None:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port), "--mode", mode, "--dir", str(directory)],
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    time.sleep(1.5)  # server startup
+    try:
+        for ranged in (False, True):
+            cpu_start, wall_start = cpu_seconds(child.pid), time.perf_counter()
+            received = asyncio.run(download(port, names, concurrency, size, ranged))
+            cpu, wall = cpu_seconds(child.pid) - cpu_start, time.perf_counter() - wall_start
+            assert received == size * len(names)
+            gb = received / 1e9
+            label = f"{mode}{' (2 ranges)' if ranged else ''}"
+            print(f"{label:<28} {received / 1e6 / wall:>10.0f} {cpu:>12.2f} {cpu / gb:>12.2f} "
+                  f"{100 * cpu / wall:>13.1f}")
+    finally:
+        child.terminate()
+        child.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--mb", type=int, default=25, help="size of each file")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.mode, args.dir)
+        return
+
+    size = args.mb * 1024 * 1024
+    with tempfile.TemporaryDirectory(prefix="bench_large_") as tmp:
+        directory = Path(tmp)
+        block = os.urandom(size)
+        names = [f"original_{i:03d}.jpg" for i in range(args.files)]
+        for name in names:
+            (directory / name).write_bytes(block)
+
+        print(f"{args.files} files x {args.mb} MB, {args.concurrency} concurrent downloads")
+        print(f"{'mount':<28} {'MB/s':>10} {'server CPU s':>12} {'CPU s / GB':>12} "
+              f"{'server CPU %':>13}")
+        for mode in ("StaticFiles", "CachedStaticFiles"):
+            run(mode, directory, names, size, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+/api/photos latency benchmark: directory scan vs in-memory photo index.
+
+Fills a temporary display_images directory with N photos and measures the
+latency of unchanged polls for the previous implementation (list + two
+stat() calls per file + Pydantic models on every request) and for the
+indexed endpoint.
+
+Usage (from apps/api):
+    python benchmarks/bench_photos_endpoint.py [--sizes 100,1000,10000] [--requests 50]
+"""
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import api.photos as photos  # noqa: E402
+from api.photos import Photo  # noqa: E402
+
+
+def build_app(display_dir: Path) -> FastAPI:
+    photos.DISPLAY_IMAGES_DIR = display_dir
+    app = FastAPI()
+    app.include_router(photos.router)
+
+    @app.get("/api/photos-scan")
+    async def get_photos_scan() -> List[Photo]:
+        # Previous implementation, kept here for comparison
+        image_files = [
+            f for f in display_dir.iterdir()
+            if f.is_file() and f.suffix.lower() in {'.jpg', '.jpeg', '.png', '.heic'}
+        ]
+        image_files.sort(key=lambda f: f.stat().st_mtime)
+        return [
+            Photo(
+                id=str(uuid.uuid4()),
+                url=f"/images/{f.name}",
+                createdAt=datetime.fromtimestamp(f.stat().st_mtime, tz=timezone.utc).isoformat(),
+            )
+            for f in image_files
+        ]
+
+    return app
+
+
+def measure(client: TestClient, url: str, requests: int) -> tuple[float, float]:
+    client.get(url)  # warm-up (index build / first serialization)
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(url)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    photos.logger.setLevel("WARNING")
+    print(f"{'photos':>7} {'scan p50 (ms)':>14} {'scan p95':>9} {'index p50 (ms)':>15} {'index p95':>10}")
+    for count in (int(v) for v in args.sizes.split(",")):
+        display_dir = Path(tempfile.mkdtemp(prefix="bench_photos_"))
+        for _ in range(count):
+            (display_dir / f"{uuid.uuid4()}.jpg").write_bytes(b"x")
+
+        with TestClient(build_app(display_dir)) as client:
+            scan = measure(client, "/api/photos-scan", args.requests)
+            indexed = measure(client, "/api/photos", args.requests)
+        print(f"{count:>7} {scan[0]:>14.2f} {scan[1]:>9.2f} {indexed[0]:>15.2f} {indexed[1]:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Upload-to-display latency benchmark for the photo processor modes.
+
+Drops JPEGs into a temporary raw_images directory the same way upload_photo
+does (write a .part file, then rename) at a fixed interval, and measures the
+time until each one has been processed (raw file removed, display file
+written). Runs once with the inotify watcher ("watch") and once with plain
+polling ("poll").
+
+Usage (from apps/api):
+    python benchmarks/bench_processing_latency.py [--photos 10] [--gap 1.5]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+import core.processor as processor  # noqa: E402
+
+
+async def measure(mode: str, photos: int, gap: float) -> list[float]:
+    work_dir = Path(tempfile.mkdtemp(prefix=f"bench_{mode}_"))
+    raw_dir, display_dir, failed_dir = (work_dir / d for d in ("raw", "display", "failed"))
+    for directory in (raw_dir, display_dir, failed_dir):
+        directory.mkdir()
+    processor.RAW_IMAGES_DIR = raw_dir
+    processor.DISPLAY_IMAGES_DIR = display_dir
+    processor.FAILED_IMAGES_DIR = failed_dir
+
+    source = work_dir / "source.jpg"
+    Image.new("RGB", (1920, 1080), color="teal").save(source, format="JPEG")
+    payload = source.read_bytes()
+
+    task = asyncio.create_task(processor.run_processor(mode))
+    await asyncio.sleep(0.5)
+
+    latencies = []
+    for i in range(photos):
+        final_path = raw_dir / f"{time.time_ns()}_{i:04d}_bench.jpg"
+        partial = final_path.with_name(final_path.name + ".part")
+        partial.write_bytes(payload)
+        partial.rename(final_path)
+        landed = time.perf_counter()
+
+        while final_path.exists():
+            await asyncio.sleep(0.005)
+        latencies.append(time.perf_counter() - landed)
+        await asyncio.sleep(gap)
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=10)
+    parser.add_argument("--gap", type=float, default=1.5, help="seconds between uploads")
+    args = parser.parse_args()
+
+    processor.logger.setLevel("WARNING")
+    print(f"{'mode':<6} {'photos':>6} {'p50 (s)':>9} {'max (s)':>9}")
+    for mode in ("watch", "poll"):
+        latencies = asyncio.run(measure(mode, args.photos, args.gap))
+        print(f"{mode:<6} {len(latencies):>6} {statistics.median(latencies):>9.3f} {max(latencies):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Upload burst load test: 200 guests uploading at once, with and without
+admission control.
+
+Starts the upload endpoint and /health under uvicorn in a child process,
+with a stand-in processor that drains raw_images at a fixed rate (the Pi
+cannot process faster than that). N clients, each on its own loopback
+address so they count as separate guests, upload a photo at the same
+moment and keep retrying after Retry-After until it is accepted. A probe
+process measures /health latency throughout.
+
+Reports the server's peak RSS, the largest raw_images backlog, /health
+latency, how many requests were shed, and how long until every photo was
+accepted.
+
+Usage (from apps/api):
+    python benchmarks/bench_upload_burst.py [--clients 200] [--size-mb 4] [--drain-rate 20]
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def serve(port: int, raw_dir: Path, admission_on: bool, drain_rate: float) -> None:
+    """Child process: upload router behind the admission middleware, plus /health."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    import api.upload as upload
+    from api.admission import UploadAdmissionMiddleware
+    from core.admission import AdmissionController
+
+    upload.RAW_IMAGES_DIR = raw_dir
+    upload.DEDUP_MODE = "off"
+    if admission_on:
+        controller = AdmissionController(raw_dir=raw_dir)
+    else:
+        controller = AdmissionController(
+            raw_dir=raw_dir, max_inflight_bytes=2**62, max_backlog=2**62,
+            min_free_bytes=0, rate=1e9, burst=10**9,
+        )
+
+    app = FastAPI()
+    app.add_middleware(UploadAdmissionMiddleware, controller=controller)
+    app.include_router(upload.router)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/bench/stats")
+    async def stats():
+        status = Path("/proc/self/status").read_text()
+        peak_kb = int(next(line for line in status.splitlines() if line.startswith("VmHWM")).split()[1])
+        return {"peakRssMb": peak_kb / 1024, "maxBacklog": max_backlog}
+
+    max_backlog = 0
+
+    async def drain() -> None:
+        """Stand-in processor: consume raw uploads at drain_rate per second."""
+        nonlocal max_backlog
+        while True:
+            await asyncio.sleep(1 / drain_rate)
+            pending = sorted(p for p in raw_dir.iterdir() if not p.name.endswith(".part"))
+            max_backlog = max(max_backlog, len(pending))
+            if pending:
+                pending[0].unlink(missing_ok=True)
+
+    async def main() -> None:
+        server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="error"))
+        asyncio.get_running_loop().create_task(drain())
+        await server.serve()
+
+    asyncio.run(main())
+
+
+async def guest(port: int, address: str, payload: bytes, statuses: Counter) -> float:
+    """Upload one photo, honouring Retry-After; return seconds until accepted."""
+    import httpx
+
+    start = time.perf_counter()
+    transport = httpx.AsyncHTTPTransport(local_address=address)
+    async with httpx.AsyncClient(transport=transport, timeout=None) as client:
+        while True:
+            response = await client.post(
+                f"http://127.0.0.1:{port}/api/upload",
+                files={"photo": ("burst.jpg", payload, "image/jpeg")},
+            )
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                return time.perf_counter() - start
+            await asyncio.sleep(float(response.headers.get("retry-after", "1")))
+
+
+def probe(port: int, seconds: float) -> None:
+    """Probe process: print /health latencies (ms) as JSON."""
+    import httpx
+
+    samples = []
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(timeout=None) as client:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            client.get(f"http://127.0.0.1:{port}/health").raise_for_status()
+            samples.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.02)
+    print(json.dumps(samples))
+
+
+def run(label: str, admission_on: bool, args: argparse.Namespace) -> None:
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    raw_dir = Path(tempfile.mkdtemp(prefix="bench_burst_", dir=args.dir))
+
+    child = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port), "--raw-dir", str(raw_dir),
+         "--admission", "on" if admission_on else "off", "--drain-rate", str(args.drain_rate)],
+        cwd=Path(__file__).resolve().parent.parent,
+        stderr=subprocess.DEVNULL,  # one shed warning per rejected request
+    )
+    try:
+        time.sleep(1.5)  # server startup
+        payload = photo_bytes(args.size_mb * 1024 * 1024)
+        prober = subprocess.Popen(
+            [sys.executable, __file__, "--probe", str(port), "--probe-seconds", str(args.probe_seconds)],
+            stdout=subprocess.PIPE, text=True,
+        )
+        statuses: Counter = Counter()
+
+        async def burst() -> list[float]:
+            return await asyncio.gather(*(
+                guest(port, f"127.0.{1 + i // 250}.{1 + i % 250}", payload, statuses)
+                for i in range(args.clients)
+            ))
+
+        accepted = asyncio.run(burst())
+        samples = json.loads(prober.communicate()[0])
+        server = httpx.get(f"http://127.0.0.1:{port}/bench/stats").json()
+    finally:
+        child.terminate()
+        child.wait()
+        shutil.rmtree(raw_dir, ignore_errors=True)
+
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    shed = statuses[429] + statuses[503]
+    print(f"{label:<14} {server['peakRssMb']:>9.0f} {server['maxBacklog']:>8} "
+          f"{statistics.median(samples):>9.1f} {p99:>8.1f} {samples[-1]:>8.1f} "
+          f"{shed:>6} {max(accepted):>10.1f}")
+
+
+def photo_bytes(size: int) -> bytes:
+    """Random bytes behind a real JPEG header, so uploads pass validation."""
+    import io
+
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64)).save(buffer, "JPEG")
+    return buffer.getvalue() + os.urandom(size - buffer.tell())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--size-mb", type=int, default=4)
+    parser.add_argument("--drain-rate", type=float, default=20, help="photos processed per second")
+    parser.add_argument("--probe-seconds", type=float, default=15)
+    parser.add_argument("--dir", default=None, help="directory on the disk under test")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--probe", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--raw-dir", help=argparse.SUPPRESS)
+    parser.add_argument("--admission", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe(args.probe, args.probe_seconds)
+        return
+    if args.serve:
+        serve(args.serve, Path(args.raw_dir), args.admission == "on", args.drain_rate)
+        return
+
+    print(f"{args.clients} guests uploading {args.size_mb} MB at once, "
+          f"processor drains {args.drain_rate:g} photos/s")
+    print(f"{'admission':<14} {'peak RSS':>9} {'backlog':>8} {'health p50':>9} {'p99 (ms)':>8} "
+          f"{'max':>8} {'shed':>6} {'all in (s)':>10}")
+    run("off", False, args)
+    run("on", True, args)
+
+
+if __name__ == "__main__":
+    main()
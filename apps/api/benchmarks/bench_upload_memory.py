@@ -0,0 +1,105 @@
+"""
+Peak memory benchmark for concurrent photo uploads.
+
+Runs N concurrent uploads of the same file against the upload router (in
+process, through httpx's ASGI transport) and reports the growth in peak RSS.
+Each concurrency level runs in a fresh subprocess so ru_maxrss is not shared
+between levels. The "buffered" mode reproduces the old whole-file
+``await photo.read()`` behaviour for comparison.
+
+Usage (from apps/api):
+    python benchmarks/bench_upload_memory.py [--size-mb 20] [--levels 1,10,20,40]
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_uploads(mode: str, concurrency: int, size_mb: int) -> dict:
+    import httpx
+    from fastapi import FastAPI, File, UploadFile
+    from PIL import Image
+
+    import api.upload as upload
+
+    work_dir = Path(tempfile.mkdtemp(prefix="bench_upload_"))
+    raw_dir = work_dir / "raw_images"
+    raw_dir.mkdir()
+    upload.RAW_IMAGES_DIR = raw_dir
+
+    app = FastAPI()
+    app.include_router(upload.router)
+
+    @app.post("/api/upload-buffered")
+    async def upload_buffered(photo: UploadFile = File(...)):
+        contents = await photo.read()
+        (raw_dir / f"buffered_{id(contents)}.jpg").write_bytes(contents)
+        return {"success": True}
+
+    source = work_dir / "source.jpg"
+    with open(source, "wb") as f:
+        # A real JPEG header so the upload passes validation
+        Image.new("RGB", (64, 64)).save(f, "JPEG")
+        for _ in range(size_mb):
+            f.write(b"\xff" * (1024 * 1024))
+
+    url = "/api/upload" if mode == "streaming" else "/api/upload-buffered"
+    transport = httpx.ASGITransport(app=app)
+
+    async def one_upload(client: httpx.AsyncClient) -> int:
+        with open(source, "rb") as f:
+            response = await client.post(url, files={"photo": ("bench.jpg", f, "image/jpeg")})
+        return response.status_code
+
+    baseline = peak_rss_mb()
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        statuses = await asyncio.gather(*(one_upload(client) for _ in range(concurrency)))
+
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "size_mb": size_mb,
+        "ok": sum(1 for s in statuses if s == 200),
+        "peak_rss_growth_mb": round(peak_rss_mb() - baseline, 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=20)
+    parser.add_argument("--levels", default="1,10,20,40")
+    parser.add_argument("--modes", default="streaming,buffered")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "CONCURRENCY"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, concurrency = args.child[0], int(args.child[1])
+        print(json.dumps(asyncio.run(run_uploads(mode, concurrency, args.size_mb))))
+        return
+
+    print(f"{'mode':<10} {'uploads':>8} {'ok':>4} {'peak RSS growth (MB)':>22}")
+    for mode in args.modes.split(","):
+        for level in args.levels.split(","):
+            output = subprocess.run(
+                [sys.executable, __file__, "--size-mb", str(args.size_mb), "--child", mode, level],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{result['mode']:<10} {result['concurrency']:>8} {result['ok']:>4} "
+                  f"{result['peak_rss_growth_mb']:>22}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Upload validation cost benchmark.
+
+Feeds in-memory uploads through UploadValidator in 256 KB chunks (as
+stream_upload_to_disk does) and reports the time per file, next to what the
+processor used to spend before it could reject the same file: a full
+``Image.open(...).load()`` decode attempt. Inputs are a 12 MP camera JPEG
+with a large EXIF block, a PNG screenshot, a synthetic HEIC header, random
+garbage named .jpg, a JPEG cut off inside its header, and a small PNG that
+declares 40000x40000 pixels (decompression bomb).
+
+Usage (from apps/api):
+    python benchmarks/bench_upload_validation.py [--repeat 200]
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+import time
+import warnings
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import Image  # noqa: E402
+
+from core.validation import InvalidImageError, UploadValidator  # noqa: E402
+
+CHUNK_SIZE = 256 * 1024
+
+
+def camera_jpeg() -> bytes:
+    noise = Image.merge("RGB", [Image.effect_noise((4000, 3000), sigma) for sigma in (20, 30, 40)])
+    exif = Image.Exif()
+    exif[0x010F] = "BenchCam"
+    exif[0x010E] = "x" * 40_000  # stands in for maker notes and thumbnails
+    buffer = io.BytesIO()
+    noise.save(buffer, "JPEG", quality=92, exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+def screenshot_png() -> bytes:
+    buffer = io.BytesIO()
+    Image.effect_noise((1170, 2532), 10).convert("RGB").save(buffer, "PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def heic_header(size_bytes: int) -> bytes:
+    def box(box_type: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", 8 + len(body)) + box_type + body
+
+    ispe = box(b"ispe", b"\0\0\0\0" + struct.pack(">II", 4032, 3024))
+    header = box(b"ftyp", b"heic\0\0\0\0mif1heic") + box(b"meta", b"\0\0\0\0" + box(b"iprp", box(b"ipco", ispe)))
+    return header + os.urandom(size_bytes - len(header))
+
+
+def bomb_png(width: int, height: int) -> bytes:
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(b"\0" * 4096))
+
+
+def validate(filename: str, chunks: list[bytes]) -> str:
+    validator = UploadValidator(filename)
+    try:
+        for chunk in chunks:
+            validator.feed(chunk)
+        info = validator.finish()
+    except InvalidImageError as e:
+        return f"rejected ({e.reason})"
+    return f"ok {info.width}x{info.height}"
+
+
+def full_decode(data: bytes) -> str:
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            with Image.open(io.BytesIO(data)) as image:
+                image.load()
+    except Exception as e:
+        return f"failed ({type(e).__name__})"
+    return "decoded"
+
+
+def per_call_ms(func, *args, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(*args)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--decode-repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    jpeg = camera_jpeg()
+    cases = [
+        ("camera.jpg", jpeg),
+        ("screenshot.png", screenshot_png()),
+        ("photo.heic", heic_header(2 * 1024 * 1024)),
+        ("garbage.jpg", os.urandom(4 * 1024 * 1024)),
+        ("truncated.jpg", jpeg[:20_000]),
+        ("bomb.png", bomb_png(40000, 40000)),
+    ]
+
+    print(f"{'input':<16} {'size':>9} {'validation':<24} {'ms':>8} {'full decode':<32} {'ms':>8}")
+    for filename, data in cases:
+        chunks = [data[start:start + CHUNK_SIZE] for start in range(0, len(data), CHUNK_SIZE)]
+        verdict = validate(filename, chunks)
+        validate_ms = per_call_ms(validate, filename, chunks, repeat=args.repeat)
+        if filename.endswith(".heic") or filename.startswith("bomb"):
+            # No HEIF decoder needed to validate; a bomb is not worth decoding
+            decoded, decode_ms = "not attempted", float("nan")
+        else:
+            decoded = full_decode(data)
+            decode_ms = per_call_ms(full_decode, data, repeat=args.decode_repeat)
+        print(
+            f"{filename:<16} {len(data) / 1e6:>7.2f}MB {verdict:<24} {validate_ms:>8.3f} "
+            f"{decoded:<32} {decode_ms:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
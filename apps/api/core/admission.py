@@ -0,0 +1,221 @@
+"""
+Upload admission control.
+
+Decides, before an upload's body is read, whether the Pi can take it:
+
+- Bytes currently being received stay under UPLOAD_MAX_INFLIGHT_BYTES
+  (one request is always let through, however large, so nothing starves)
+- Unprocessed uploads waiting in raw_images stay under UPLOAD_MAX_BACKLOG
+- Free disk space stays above UPLOAD_MIN_FREE_BYTES, counting the bytes
+  still on their way in
+
+Any of these sheds the upload with 503 and Retry-After. Each client IP also
+has a token bucket (UPLOAD_RATE_PER_CLIENT per second, bursts of
+UPLOAD_BURST_PER_CLIENT) and gets 429 with the time until its next token
+when it runs dry, so one guest cannot take the whole budget.
+
+The backlog and free space are sampled at most once per
+``sample_interval`` seconds, so a burst of requests costs one directory
+scan rather than one per request.
+"""
+import math
+import os
+import shutil
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional
+
+from core.config import (
+    RAW_IMAGES_DIR,
+    UPLOAD_BURST_PER_CLIENT,
+    UPLOAD_MAX_BACKLOG,
+    UPLOAD_MAX_INFLIGHT_BYTES,
+    UPLOAD_MIN_FREE_BYTES,
+    UPLOAD_RATE_PER_CLIENT,
+    UPLOAD_RETRY_AFTER_SECONDS,
+)
+from core.processor import is_raw_image
+
+# Client buckets remembered; the least recently seen client is forgotten
+MAX_TRACKED_CLIENTS = 1024
+
+# Retry-After when the disk is nearly full: space only comes back slowly
+LOW_DISK_RETRY_AFTER_SECONDS = 60
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate`` tokens per second."""
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """
+        Take one token if available.
+
+        Args:
+            now: Current monotonic time
+
+        Returns:
+            0 if a token was taken, otherwise seconds until one is available
+        """
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+@dataclass
+class Rejection:
+    """Why an upload was refused and when the client should retry."""
+    status_code: int
+    reason: str
+    retry_after: int
+
+
+@dataclass
+class Ticket:
+    """An admitted upload; hand it back to release() when the request ends."""
+    size: int
+
+
+class AdmissionController:
+    """Admits or sheds uploads based on server load and per-client rate."""
+
+    def __init__(
+        self,
+        raw_dir: Path = RAW_IMAGES_DIR,
+        max_inflight_bytes: int = UPLOAD_MAX_INFLIGHT_BYTES,
+        max_backlog: int = UPLOAD_MAX_BACKLOG,
+        min_free_bytes: int = UPLOAD_MIN_FREE_BYTES,
+        rate: float = UPLOAD_RATE_PER_CLIENT,
+        burst: int = UPLOAD_BURST_PER_CLIENT,
+        sample_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.raw_dir = raw_dir
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_backlog = max_backlog
+        self.min_free_bytes = min_free_bytes
+        self.rate = rate
+        self.burst = burst
+        self.sample_interval = sample_interval
+        self.clock = clock
+
+        self.inflight_bytes = 0
+        self.inflight_requests = 0
+        self.admitted = 0
+        self.rejected: dict[str, int] = {}
+        self.backlog = 0
+        self.free_bytes: Optional[int] = None
+        self._sampled_at: Optional[float] = None
+        self._buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def sample(self) -> None:
+        """Measure the raw_images backlog and free disk space (blocking)."""
+        try:
+            with os.scandir(self.raw_dir) as entries:
+                self.backlog = sum(
+                    1 for entry in entries if entry.is_file() and is_raw_image(Path(entry.name))
+                )
+            self.free_bytes = shutil.disk_usage(self.raw_dir).free
+        except OSError:
+            # Directory not created yet: nothing queued, space unknown
+            self.backlog, self.free_bytes = 0, None
+        self._sampled_at = self.clock()
+
+    def needs_sample(self) -> bool:
+        """True if the backlog and free space readings are stale."""
+        return self._sampled_at is None or self.clock() - self._sampled_at >= self.sample_interval
+
+    def admit(
+        self, client: str, size: int, rate_limited: bool = True
+    ) -> tuple[Optional[Ticket], Optional[Rejection]]:
+        """
+        Decide whether to accept an upload.
+
+        Call ``sample()`` first when ``needs_sample()`` is true.
+
+        Args:
+            client: Client identifier (IP address)
+            size: Expected request body size in bytes
+            rate_limited: Whether the request takes a token from the client's
+                          bucket (False for requests continuing an upload
+                          that was already admitted)
+
+        Returns:
+            (ticket, None) if admitted, (None, rejection) otherwise
+        """
+        rejection = self._check_load(size)
+        if rejection is None and rate_limited:
+            rejection = self._check_rate(client)
+        if rejection is not None:
+            self.rejected[rejection.reason] = self.rejected.get(rejection.reason, 0) + 1
+            return None, rejection
+
+        self.inflight_bytes += size
+        self.inflight_requests += 1
+        self.admitted += 1
+        return Ticket(size), None
+
+    def release(self, ticket: Ticket) -> None:
+        """Return an admitted upload's bytes to the budget."""
+        self.inflight_bytes -= ticket.size
+        self.inflight_requests -= 1
+
+    def _check_load(self, size: int) -> Optional[Rejection]:
+        if self.inflight_requests and self.inflight_bytes + size > self.max_inflight_bytes:
+            return Rejection(503, "inflight", UPLOAD_RETRY_AFTER_SECONDS)
+        if self.backlog >= self.max_backlog:
+            return Rejection(503, "backlog", UPLOAD_RETRY_AFTER_SECONDS)
+        if (
+            self.free_bytes is not None
+            and self.free_bytes - self.inflight_bytes - size < self.min_free_bytes
+        ):
+            return Rejection(503, "disk", LOW_DISK_RETRY_AFTER_SECONDS)
+        return None
+
+    def _check_rate(self, client: str) -> Optional[Rejection]:
+        now = self.clock()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = TokenBucket(self.rate, self.burst, now)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+
+        wait = bucket.take(now)
+        if wait:
+            return Rejection(429, "rate", max(1, math.ceil(wait)))
+        return None
+
+    def reset(self) -> None:
+        """Forget all client buckets and counters (in-flight uploads are kept)."""
+        self._buckets.clear()
+        self.admitted = 0
+        self.rejected = {}
+        self._sampled_at = None
+
+    def stats(self) -> dict:
+        """Current load and admission counters, for /api/metrics."""
+        return {
+            "inflightBytes": self.inflight_bytes,
+            "inflightRequests": self.inflight_requests,
+            "backlog": self.backlog,
+            "freeBytes": self.free_bytes,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "trackedClients": len(self._buckets),
+        }
+
+
+# Shared controller consulted by the upload admission middleware
+admission = AdmissionController()
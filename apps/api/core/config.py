@@ -4,6 +4,7 @@ Centralized configuration for the Image Share API.
 This module provides centralized access to configuration values,
 following the "Variables de Entorno Centralizadas" coding standard.
 """
+import os
 from pathlib import Path
 
 # Image directories configuration
@@ -12,3 +13,145 @@ IMAGE_DATA_ROOT = Path("/image-share-data")
 RAW_IMAGES_DIR = IMAGE_DATA_ROOT / "raw_images"
 DISPLAY_IMAGES_DIR = IMAGE_DATA_ROOT / "display_images"
 FAILED_IMAGES_DIR = IMAGE_DATA_ROOT / "failed_images"
+
+# Photo processor configuration
+# "watch" reacts to filesystem events (inotify) and keeps a slow polling
+# sweep for reconciliation; "poll" only polls raw_images/ periodically.
+PROCESSOR_WATCH_MODE = os.getenv("PROCESSOR_WATCH_MODE", "watch")
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("RECONCILE_INTERVAL_SECONDS", "60"))
+
+# Processing pipeline configuration
+# Uploads are rejected with 503 + Retry-After while the queue is full.
+# Workers default to one per CPU core: decoding/encoding is CPU-bound.
+PROCESSING_WORKERS = int(os.getenv("PROCESSING_WORKERS", str(os.cpu_count() or 1)))
+PROCESSING_QUEUE_SIZE = int(os.getenv("PROCESSING_QUEUE_SIZE", "200"))
+UPLOAD_RETRY_AFTER_SECONDS = int(os.getenv("UPLOAD_RETRY_AFTER_SECONDS", "5"))
+
+# Upload admission control, applied before an upload's body is read.
+# Uploads are shed with 503 while the bytes being received, the unprocessed
+# backlog in raw_images or the free disk space are past these limits, and
+# with 429 when one client exceeds its token bucket (sustained uploads per
+# second, plus a burst allowance).
+UPLOAD_MAX_INFLIGHT_BYTES = int(os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(200 * 1024 * 1024)))
+UPLOAD_MAX_BACKLOG = int(os.getenv("UPLOAD_MAX_BACKLOG", "300"))
+UPLOAD_MIN_FREE_BYTES = int(os.getenv("UPLOAD_MIN_FREE_BYTES", str(512 * 1024 * 1024)))
+UPLOAD_RATE_PER_CLIENT = float(os.getenv("UPLOAD_RATE_PER_CLIENT", "1"))
+UPLOAD_BURST_PER_CLIENT = int(os.getenv("UPLOAD_BURST_PER_CLIENT", "10"))
+
+# Resumable uploads: each session keeps its received bytes and metadata in
+# raw_images/.sessions/<id>/ (invisible to the processor, same filesystem
+# so completion is an atomic rename). Sessions idle for longer than
+# UPLOAD_SESSION_TTL_SECONDS are deleted.
+UPLOAD_SESSIONS_DIR = RAW_IMAGES_DIR / ".sessions"
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "3600"))
+
+# Upload validation, done on the first bytes while the body streams in:
+# the file must start with a JPEG/PNG/HEIC signature matching its extension,
+# and its header (parsed without decoding pixels, found within the first
+# UPLOAD_HEADER_MAX_BYTES) must declare at most UPLOAD_MAX_PIXELS pixels.
+UPLOAD_MAX_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(100_000_000)))
+UPLOAD_HEADER_MAX_BYTES = int(os.getenv("UPLOAD_HEADER_MAX_BYTES", str(1024 * 1024)))
+
+# CPU executor for decode/orientation/encode work
+# "thread" uses a thread pool; "process" uses long-lived worker processes
+# so Pillow work that holds the GIL scales across the Pi's cores.
+PROCESSOR_EXECUTOR = os.getenv("PROCESSOR_EXECUTOR", "thread")
+
+# Lossless JPEG fast path
+# Upright JPEGs are copied into display_images without decoding/re-encoding.
+# ORIENTATION_MODE "transpose" rotates pixels of rotated photos (re-encode);
+# "exif" keeps their pixels and only the EXIF orientation tag, which browsers
+# apply on display. STRIP_DISPLAY_METADATA removes EXIF (GPS, camera serials)
+# losslessly; when disabled the original is hard-linked instead.
+JPEG_FAST_PATH = os.getenv("JPEG_FAST_PATH", "true").lower() == "true"
+ORIENTATION_MODE = os.getenv("ORIENTATION_MODE", "transpose")
+STRIP_DISPLAY_METADATA = os.getenv("STRIP_DISPLAY_METADATA", "true").lower() == "true"
+
+# Display renditions generated for every photo, stored under
+# display_images/renditions/<photo id>/<name>.<format suffix>
+# Format: "name:longest_edge_px" pairs, e.g. "screen:1920,thumb:480,placeholder:32"
+RENDITIONS = {
+    name.strip(): int(size)
+    for name, size in (
+        item.split(":")
+        for item in os.getenv("RENDITIONS", "screen:1920,thumb:480,placeholder:32").split(",")
+    )
+}
+RENDITION_QUALITY = int(os.getenv("RENDITION_QUALITY", "85"))
+RENDITIONS_DIRNAME = "renditions"
+RENDITION_MANIFEST = "manifest.json"
+
+# Rendition encoding policy (see core.encoding). "AUTO" encodes photos as
+# lossy WebP and screenshots/graphics as lossless WebP; "WEBP", "AVIF" or
+# "JPEG" force a format. A display (largest) rendition over
+# DISPLAY_BYTE_BUDGET bytes (0: no budget) is re-encoded at the highest
+# quality down to DISPLAY_MIN_QUALITY that fits. RENDITION_QUALITY is the
+# starting quality for JPEG/WebP, AVIF_QUALITY for AVIF. The full-size
+# display image stays the export original; JPEGs that must be re-encoded
+# for it (rotated pixels) are saved at EXPORT_JPEG_QUALITY.
+DISPLAY_FORMAT = os.getenv("DISPLAY_FORMAT", "auto").upper()
+DISPLAY_BYTE_BUDGET = int(os.getenv("DISPLAY_BYTE_BUDGET", str(500 * 1024)))
+DISPLAY_MIN_QUALITY = int(os.getenv("DISPLAY_MIN_QUALITY", "50"))
+AVIF_QUALITY = int(os.getenv("AVIF_QUALITY", "65"))
+EXPORT_JPEG_QUALITY = int(os.getenv("EXPORT_JPEG_QUALITY", "95"))
+
+# HEIC/HEIF photos (iPhones) are decoded with the optional pillow-heif
+# package, imported on the first HEIC so startup does not pay for it. Each is
+# decoded once and transcoded to HEIF_DISPLAY_FORMAT ("JPEG" or "WEBP") for
+# the display image and renditions; a decode still running after
+# HEIF_DECODE_TIMEOUT_SECONDS fails the photo.
+HEIF_DISPLAY_FORMAT = os.getenv("HEIF_DISPLAY_FORMAT", "JPEG").upper()
+HEIF_DISPLAY_QUALITY = int(os.getenv("HEIF_DISPLAY_QUALITY", "90"))
+HEIF_DECODE_TIMEOUT_SECONDS = float(os.getenv("HEIF_DECODE_TIMEOUT_SECONDS", "60"))
+
+# Carousel prefetch: how many upcoming photos /api/photos/next returns by
+# default (displays download and decode them ahead of the crossfade)
+PREFETCH_WINDOW = int(os.getenv("PREFETCH_WINDOW", "3"))
+
+# Server-sent events (new-photo push to carousel displays)
+# Each subscriber buffers at most EVENT_BUFFER_SIZE events; a client that
+# falls further behind loses its backlog and gets a single "resync" event.
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "100"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+
+# Disk I/O on the request path (upload writes, renames, fsync) runs on a
+# dedicated thread pool so a slow SD card or USB disk never stalls the loop
+IO_WORKERS = int(os.getenv("IO_WORKERS", "4"))
+
+# Upload durability before the processor picks a file up:
+# "none" leaves flushing to the OS, "file" fsyncs every upload before
+# replying, "batch" fsyncs new uploads in the background every
+# FSYNC_BATCH_INTERVAL_SECONDS (at most that window is lost on power loss)
+FSYNC_POLICY = os.getenv("FSYNC_POLICY", "none")
+FSYNC_BATCH_INTERVAL_SECONDS = float(os.getenv("FSYNC_BATCH_INTERVAL_SECONDS", "1"))
+
+# Upload de-duplication
+# "off", "exact" (skip byte-identical uploads, hashed while streaming) or
+# "perceptual" (additionally skip re-encoded copies whose dHash differs by
+# at most PERCEPTUAL_DUPLICATE_DISTANCE of 64 bits)
+DEDUP_MODE = os.getenv("DEDUP_MODE", "exact")
+CONTENT_HASH_INDEX = IMAGE_DATA_ROOT / "content_hashes.bin"
+PERCEPTUAL_HASH_INDEX = IMAGE_DATA_ROOT / "perceptual_hashes.bin"
+PERCEPTUAL_DUPLICATE_DISTANCE = int(os.getenv("PERCEPTUAL_DUPLICATE_DISTANCE", "4"))
+
+# Processing journal: an append-only log of each upload's received ->
+# processing -> written -> committed transitions, replayed at startup so a
+# power cut mid-processing never yields a second display copy. It is
+# compacted to the uploads still pending every JOURNAL_COMPACT_RECORDS
+# appends (and at startup), so recovery reads O(pending) records.
+PROCESSING_JOURNAL = IMAGE_DATA_ROOT / "processing_journal.log"
+JOURNAL_COMPACT_RECORDS = int(os.getenv("JOURNAL_COMPACT_RECORDS", "1000"))
+
+# Near-duplicate clustering (burst shots): photos whose dHash differs by at
+# most CLUSTER_DISTANCE of 64 bits share a clusterId in /api/photos
+CLUSTER_DISTANCE = int(os.getenv("CLUSTER_DISTANCE", "8"))
+
+# In-memory cache of display images and renditions served under /images.
+# Files larger than IMAGE_CACHE_MAX_FILE_BYTES (full-size originals) are
+# always streamed from disk.
+IMAGE_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_BYTES", str(64 * 1024 * 1024)))
+IMAGE_CACHE_MAX_FILE_BYTES = int(os.getenv("IMAGE_CACHE_MAX_FILE_BYTES", str(4 * 1024 * 1024)))
+
+# Read size used when streaming files from disk under /images. Servers that
+# support the ASGI zero-copy extension send files with sendfile() instead.
+FILE_CHUNK_BYTES = int(os.getenv("FILE_CHUNK_BYTES", str(1024 * 1024)))
@@ -0,0 +1,197 @@
+"""
+Persistent indexes of uploads already seen, for ingest-time de-duplication.
+
+Each index is an append-only file of fixed-size records under
+IMAGE_DATA_ROOT: 16-byte BLAKE2b digests of upload bytes, and 8-byte dHash
+values in perceptual mode. Loading is a single read, and 10,000 photos
+take 160 KB on disk and well under 2 MB in memory. A torn record from a
+crash mid-append is ignored on load.
+
+Hashes are claimed in memory on the event loop before anything is written,
+so two concurrent copies of the same photo cannot both get through. A photo
+that fails processing has its hashes removed again, so the guest's retry
+is not turned away as a duplicate of a photo that never appeared.
+"""
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from core.config import (
+    CONTENT_HASH_INDEX,
+    DEDUP_MODE,
+    PERCEPTUAL_DUPLICATE_DISTANCE,
+    PERCEPTUAL_HASH_INDEX,
+)
+from core.phash import MultiIndexHash
+
+logger = logging.getLogger(__name__)
+
+DEDUP_MODES = ("off", "exact", "perceptual")
+
+CONTENT_DIGEST_SIZE = 16
+PERCEPTUAL_HASH_SIZE = 8
+
+
+def new_content_hasher() -> hashlib.blake2b:
+    """Hasher for upload bytes, fed chunk by chunk while streaming."""
+    return hashlib.blake2b(digest_size=CONTENT_DIGEST_SIZE)
+
+
+def hash_file(path: Path, chunk_size: int = 1024 * 1024) -> bytes:
+    """Content digest of a file already on disk (blocking)."""
+    hasher = new_content_hasher()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            hasher.update(chunk)
+    return hasher.digest()
+
+
+class HashIndex:
+    """Append-only persistent set of fixed-size digests."""
+
+    def __init__(self, path: Path, digest_size: int = CONTENT_DIGEST_SIZE):
+        self.path = path
+        self.digest_size = digest_size
+        self._digests: set[bytes] = set()
+        # Appends and removals run on I/O executor threads
+        self._file_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return digest in self._digests
+
+    def load(self) -> None:
+        """Read every complete record from disk (blocking)."""
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            data = b""
+
+        size = self.digest_size
+        usable = len(data) - len(data) % size
+        self._digests = set()
+        for offset in range(0, usable, size):
+            self._remember(data[offset:offset + size])
+        logger.info(f"Loaded {len(self._digests)} hashes from {self.path}")
+
+    def claim(self, digest: bytes) -> bool:
+        """
+        Mark digest as seen, in memory.
+
+        Args:
+            digest: Digest of the new upload
+
+        Returns:
+            False if the digest was already known (a duplicate)
+        """
+        if digest in self._digests:
+            return False
+        self._remember(digest)
+        return True
+
+    def release(self, digest: bytes) -> None:
+        """Undo a claim whose upload failed before it was persisted."""
+        self._forget(digest)
+
+    def append(self, digest: bytes) -> None:
+        """Persist a claimed digest (blocking; run on the I/O executor)."""
+        with self._file_lock, open(self.path, 'ab') as f:
+            f.write(digest)
+
+    def remove(self, digest: bytes) -> None:
+        """
+        Forget a persisted digest (blocking; run on the I/O executor).
+
+        The file is rewritten without it. This only happens when a photo
+        fails processing, so the cost of a rewrite is acceptable.
+
+        Args:
+            digest: Digest of the failed photo
+        """
+        self._forget(digest)
+        with self._file_lock:
+            try:
+                data = self.path.read_bytes()
+            except FileNotFoundError:
+                return
+            size = self.digest_size
+            records = [data[offset:offset + size] for offset in range(0, len(data) - len(data) % size, size)]
+            kept = [record for record in records if record != digest]
+            if len(kept) == len(records):
+                return
+            temp_path = self.path.with_suffix(".tmp")
+            temp_path.write_bytes(b"".join(kept))
+            os.replace(temp_path, self.path)
+
+    def _remember(self, digest: bytes) -> None:
+        self._digests.add(digest)
+
+    def _forget(self, digest: bytes) -> None:
+        self._digests.discard(digest)
+
+
+class PerceptualIndex(HashIndex):
+    """dHash values of processed photos, searchable by Hamming distance."""
+
+    def __init__(self, path: Path):
+        super().__init__(path, PERCEPTUAL_HASH_SIZE)
+        self._hashes = MultiIndexHash()
+
+    def find_near(self, value: int, max_distance: int = PERCEPTUAL_DUPLICATE_DISTANCE) -> Optional[int]:
+        """
+        Find a known hash within max_distance bits of value.
+
+        Args:
+            value: dHash of the new photo
+            max_distance: Largest Hamming distance that counts as a copy
+
+        Returns:
+            The matching hash, or None
+        """
+        match = self._hashes.nearest(value, max_distance)
+        return int(match[1], 16) if match else None
+
+    @staticmethod
+    def encode(value: int) -> bytes:
+        """Record bytes for a dHash value."""
+        return value.to_bytes(PERCEPTUAL_HASH_SIZE, 'big')
+
+    def _remember(self, digest: bytes) -> None:
+        self._hashes.add(digest.hex(), int.from_bytes(digest, 'big'))
+        super()._remember(digest)
+
+    def _forget(self, digest: bytes) -> None:
+        self._hashes.remove(digest.hex())
+        super()._forget(digest)
+
+    def load(self) -> None:
+        self._hashes = MultiIndexHash()
+        super().load()
+
+
+# Shared indexes, loaded at startup according to DEDUP_MODE
+content_index = HashIndex(CONTENT_HASH_INDEX)
+perceptual_index = PerceptualIndex(PERCEPTUAL_HASH_INDEX)
+
+
+def load_dedup_indexes(mode: str = DEDUP_MODE) -> None:
+    """
+    Load the indexes the configured mode needs (blocking).
+
+    Args:
+        mode: One of DEDUP_MODES
+
+    Raises:
+        ValueError: If mode is unknown
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown DEDUP_MODE: {mode!r} (expected one of {DEDUP_MODES})")
+    if mode != "off":
+        content_index.load()
+    if mode == "perceptual":
+        perceptual_index.load()
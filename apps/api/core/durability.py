@@ -0,0 +1,170 @@
+"""
+Fsync policy for uploaded files.
+
+Renaming a finished upload into raw_images makes it visible to the
+processor, but on a Raspberry Pi the data may still sit in the page cache
+when the power is pulled. FSYNC_POLICY chooses the trade-off:
+
+- ``none``: rely on the OS writeback (fastest, a few seconds at risk)
+- ``file``: fsync the file and its directory before the upload succeeds
+- ``batch``: fsync everything uploaded in the last
+  FSYNC_BATCH_INTERVAL_SECONDS in one background pass
+
+Processor outputs are written under a hidden temporary name and renamed
+into place (``write_atomically``), so a half-written photo is never listed
+or served: UUID-named files are cached by browsers as immutable.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from core.config import FSYNC_BATCH_INTERVAL_SECONDS, FSYNC_POLICY
+from core.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("none", "file", "batch")
+
+
+def fsync_path(path: Path) -> None:
+    """
+    Flush a file or directory to stable storage.
+
+    Args:
+        path: File or directory to fsync
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def write_atomically(output_path: Path, write: Callable[[Path], None]) -> None:
+    """
+    Produce output_path in one rename, never as a partial file.
+
+    write is given a hidden ``.<name>.<uuid>.tmp`` path in the same
+    directory, whose suffix no reader lists; it is renamed over output_path
+    once write returns and deleted if write raises.
+
+    Args:
+        output_path: Final path of the file
+        write: Callable writing the complete file to the path it is given
+    """
+    temp_path = output_path.with_name(f".{output_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        write(temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def sync_paths(paths: list[Path]) -> int:
+    """
+    Fsync files and, once each, their parent directories.
+
+    Files that no longer exist (already taken by the processor) are skipped.
+
+    Args:
+        paths: Files to flush
+
+    Returns:
+        Number of files flushed
+    """
+    synced = 0
+    directories = set()
+    for path in paths:
+        try:
+            fsync_path(path)
+        except FileNotFoundError:
+            continue
+        synced += 1
+        directories.add(path.parent)
+
+    for directory in directories:
+        fsync_path(directory)
+    return synced
+
+
+class FsyncBatcher:
+    """Collects uploaded paths and fsyncs them together."""
+
+    def __init__(self, interval: float = FSYNC_BATCH_INTERVAL_SECONDS):
+        self.interval = interval
+        self.flushes = 0
+        self.files_synced = 0
+        self._pending: list[Path] = []
+
+    @property
+    def pending(self) -> int:
+        """Number of files waiting for the next flush."""
+        return len(self._pending)
+
+    def add(self, path: Path) -> None:
+        """Schedule path for the next flush."""
+        self._pending.append(path)
+
+    async def flush(self) -> int:
+        """
+        Fsync every pending path on the I/O executor.
+
+        Returns:
+            Number of files flushed
+        """
+        if not self._pending:
+            return 0
+
+        paths, self._pending = self._pending, []
+        synced = await run_io(sync_paths, paths)
+        self.flushes += 1
+        self.files_synced += synced
+        return synced
+
+    async def run(self) -> None:
+        """Flush every ``interval`` seconds until cancelled."""
+        logger.info(f"Batched fsync every {self.interval:g}s")
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error(f"Batched fsync failed: {e}")
+
+    def stats(self) -> dict:
+        """Counters for /api/metrics."""
+        return {
+            "policy": FSYNC_POLICY,
+            "pending": self.pending,
+            "flushes": self.flushes,
+            "filesSynced": self.files_synced,
+        }
+
+
+# Shared batcher, run by the app lifespan when FSYNC_POLICY is "batch"
+fsync_batcher = FsyncBatcher()
+
+
+async def commit_upload(path: Path, policy: str = FSYNC_POLICY) -> None:
+    """
+    Apply the fsync policy to an upload that was just renamed into place.
+
+    The file's own data must already be flushed under the "file" policy
+    (see ``stream_upload_to_disk``); this takes care of the directory entry.
+
+    Args:
+        path: Final upload path
+        policy: One of FSYNC_POLICIES
+
+    Raises:
+        ValueError: If policy is unknown
+    """
+    if policy == "file":
+        await run_io(fsync_path, path.parent)
+    elif policy == "batch":
+        fsync_batcher.add(path)
+    elif policy != "none":
+        raise ValueError(f"Unknown fsync policy: {policy!r} (expected one of {FSYNC_POLICIES})")
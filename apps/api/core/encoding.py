@@ -0,0 +1,230 @@
+"""
+Display encoding policy.
+
+Decides how each display rendition is encoded: its format, quality and
+whether it is lossless. Displays only ever download renditions, so this is
+what sets the bytes served per photo; the full-size display image is kept
+as the export original and is not touched by the policy.
+
+- Photos are encoded lossy (WebP by default, or the forced DISPLAY_FORMAT)
+- Screenshots and graphics (PNGs with few distinct colours) are encoded as
+  lossless WebP, which is both smaller and sharper than lossy for flat
+  colour and text
+- The display rendition (the largest one, sized for the target screen) must
+  fit DISPLAY_BYTE_BUDGET: when it does not, the highest quality down to
+  DISPLAY_MIN_QUALITY that fits is found by binary search (a handful of
+  extra encodes, only for photos that need it)
+
+Encoder effort is fixed at settings measured to be several times faster
+than the library defaults for nearly the same size (benchmarks/
+bench_encode_policy.py compares formats, encode time and bytes).
+"""
+import io
+import logging
+from dataclasses import dataclass, replace
+
+from PIL import Image
+
+from core.config import (
+    AVIF_QUALITY,
+    DISPLAY_BYTE_BUDGET,
+    DISPLAY_FORMAT,
+    DISPLAY_MIN_QUALITY,
+    RENDITION_QUALITY,
+)
+
+logger = logging.getLogger("image_processor")
+
+# Rendition formats and their file suffix
+ENCODE_FORMATS = {"JPEG": ".jpg", "WEBP": ".webp", "AVIF": ".avif"}
+
+# Encoder effort: WebP method 2 and AVIF speed 8 encode a 1920px photo in
+# about a third (WebP) and a sixth (AVIF) of the time of the defaults, for
+# a few percent more bytes. Lossless WebP "quality" is its effort.
+WEBP_METHOD = 2
+AVIF_SPEED = 8
+LOSSLESS_EFFORT = 25
+
+# A PNG is a graphic when a nearest-neighbour sample of it has at most
+# GRAPHIC_MAX_COLORS colours (photos saved as PNG have thousands)
+GRAPHIC_SAMPLE_SIZE = (128, 128)
+GRAPHIC_MAX_COLORS = 1024
+
+
+@dataclass(frozen=True)
+class Encoding:
+    """How one rendition is encoded."""
+    format: str
+    quality: int
+    lossless: bool = False
+
+    @property
+    def suffix(self) -> str:
+        """File suffix for this format."""
+        return ENCODE_FORMATS[self.format]
+
+    def save_options(self) -> dict:
+        """Keyword arguments for ``Image.save``."""
+        if self.lossless:
+            return {"lossless": True, "quality": LOSSLESS_EFFORT, "method": WEBP_METHOD}
+        if self.format == "WEBP":
+            return {"quality": self.quality, "method": WEBP_METHOD}
+        if self.format == "AVIF":
+            return {"quality": self.quality, "speed": AVIF_SPEED}
+        return {"quality": self.quality}
+
+
+def is_graphic(image: Image.Image, source_format: str) -> bool:
+    """
+    Whether an image is a screenshot or graphic rather than a photo.
+
+    Args:
+        image: Decoded image
+        source_format: Pillow format of the upload ("JPEG", "PNG", "HEIF")
+
+    Returns:
+        True for PNGs with few distinct colours
+    """
+    if source_format != "PNG":
+        return False
+    sample = image.resize(GRAPHIC_SAMPLE_SIZE, Image.Resampling.NEAREST)
+    return sample.getcolors(GRAPHIC_MAX_COLORS) is not None
+
+
+class EncodePolicy:
+    """Chooses and applies the encoding of display renditions."""
+
+    def __init__(
+        self,
+        display_format: str = DISPLAY_FORMAT,
+        quality: int = RENDITION_QUALITY,
+        avif_quality: int = AVIF_QUALITY,
+        byte_budget: int = DISPLAY_BYTE_BUDGET,
+        min_quality: int = DISPLAY_MIN_QUALITY,
+    ):
+        """
+        Args:
+            display_format: "AUTO" or one of ENCODE_FORMATS
+            quality: Highest quality for JPEG and WebP renditions
+            avif_quality: Highest quality for AVIF renditions (AVIF's scale
+                          reaches a given fidelity at lower numbers)
+            byte_budget: Maximum bytes of the display rendition (0: none)
+            min_quality: Lowest quality the budget search may go to
+
+        Raises:
+            ValueError: If display_format is unknown
+        """
+        if display_format != "AUTO" and display_format not in ENCODE_FORMATS:
+            raise ValueError(
+                f"Unknown DISPLAY_FORMAT: {display_format!r} "
+                f"(expected 'AUTO' or one of {tuple(ENCODE_FORMATS)})"
+            )
+        self.display_format = display_format
+        self.quality = quality
+        self.avif_quality = avif_quality
+        self.byte_budget = byte_budget
+        self.min_quality = min_quality
+
+    def choose(self, image: Image.Image, source_format: str) -> Encoding:
+        """
+        Choose the encoding of a photo's renditions.
+
+        Args:
+            image: Decoded, upright RGB image
+            source_format: Pillow format of the upload
+
+        Returns:
+            Encoding at the highest quality for its format
+        """
+        encode_format = "WEBP" if self.display_format == "AUTO" else self.display_format
+        quality = self.avif_quality if encode_format == "AVIF" else self.quality
+        lossless = encode_format == "WEBP" and is_graphic(image, source_format)
+        return Encoding(encode_format, quality, lossless)
+
+    @staticmethod
+    def encode(image: Image.Image, encoding: Encoding) -> bytes:
+        """Encode an image in memory."""
+        buffer = io.BytesIO()
+        image.save(buffer, format=encoding.format, **encoding.save_options())
+        return buffer.getvalue()
+
+    def encode_within_budget(self, image: Image.Image, encoding: Encoding) -> tuple[bytes, Encoding]:
+        """
+        Encode an image, lowering quality until it fits the byte budget.
+
+        A lossless encoding over budget is retried lossy. The result at
+        min_quality is returned even if it is still over budget.
+
+        Args:
+            image: Image to encode (the display rendition)
+            encoding: Encoding chosen for the photo
+
+        Returns:
+            (encoded bytes, encoding actually used)
+        """
+        data = self.encode(image, encoding)
+        if not self.byte_budget or len(data) <= self.byte_budget:
+            return data, encoding
+
+        if encoding.lossless:
+            encoding = replace(encoding, lossless=False)
+            data = self.encode(image, encoding)
+            if len(data) <= self.byte_budget:
+                return data, encoding
+
+        # Highest quality in [min_quality, quality - 1] that fits
+        best = None
+        low, high = self.min_quality, encoding.quality - 1
+        while low <= high:
+            candidate = replace(encoding, quality=(low + high) // 2)
+            candidate_data = self.encode(image, candidate)
+            if len(candidate_data) <= self.byte_budget:
+                best = (candidate_data, candidate)
+                low = candidate.quality + 1
+            else:
+                high = candidate.quality - 1
+
+        if best is None:
+            floor = replace(encoding, quality=self.min_quality)
+            logger.warning(
+                f"Display rendition exceeds the {self.byte_budget} byte budget "
+                f"even at quality {self.min_quality}"
+            )
+            return self.encode(image, floor), floor
+        return best
+
+
+class EncodingStats:
+    """Bytes uploaded versus bytes served to displays, for /api/metrics."""
+
+    def __init__(self):
+        self.photos = 0
+        self.source_bytes = 0
+        self.display_bytes = 0
+
+    def record(self, source_bytes: int, display_bytes: int) -> None:
+        """Count one processed photo."""
+        self.photos += 1
+        self.source_bytes += source_bytes
+        self.display_bytes += display_bytes
+
+    def stats(self) -> dict:
+        """Counters for /api/metrics."""
+        return {
+            "photos": self.photos,
+            "sourceBytes": self.source_bytes,
+            "displayBytes": self.display_bytes,
+            "savedRatio": savings_ratio(self.source_bytes, self.display_bytes),
+        }
+
+
+def savings_ratio(source_bytes: int, display_bytes: int) -> float:
+    """Fraction of the upload's bytes not served to displays."""
+    if not source_bytes:
+        return 0.0
+    return round(1 - display_bytes / source_bytes, 4)
+
+
+# Built from configuration at import: an unknown DISPLAY_FORMAT fails startup
+encode_policy = EncodePolicy()
+encoding_stats = EncodingStats()
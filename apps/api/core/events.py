@@ -0,0 +1,132 @@
+"""
+Fan-out broadcaster for server-sent events.
+
+One shared broadcaster encodes each event once and hands the same bytes to
+every subscriber's bounded queue. Publishing never waits on a client: a
+subscriber whose buffer is full is considered slow, its backlog is dropped
+and replaced by a single ``resync`` event telling it to catch up through
+the /api/photos delta feed.
+"""
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from core.config import EVENT_BUFFER_SIZE
+
+logger = logging.getLogger(__name__)
+
+RESYNC_EVENT = "resync"
+
+
+def format_sse(event: str, data: dict, event_id: Optional[str] = None) -> bytes:
+    """
+    Encode an event in the text/event-stream wire format.
+
+    Args:
+        event: Event type (the EventSource listener name)
+        data: JSON-serializable payload
+        event_id: Optional event ID (sent back by browsers as Last-Event-ID)
+
+    Returns:
+        Encoded SSE frame
+    """
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class Subscription:
+    """A single client's bounded event buffer."""
+
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=buffer_size)
+        self.resyncs = 0
+
+    async def get(self) -> bytes:
+        """Wait for the next encoded event."""
+        return await self.queue.get()
+
+
+class EventBroadcaster:
+    """Publishes events to all current subscribers without blocking."""
+
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.published = 0
+        self.resyncs = 0
+        self._subscriptions: set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        """Number of connected subscribers."""
+        return len(self._subscriptions)
+
+    def subscribe(self) -> Subscription:
+        """Register a new subscriber (call from the event loop)."""
+        self._loop = asyncio.get_running_loop()
+        subscription = Subscription(self.buffer_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Remove a subscriber, e.g. when its connection closes."""
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: str, data: dict, event_id: Optional[str] = None) -> None:
+        """
+        Send an event to every subscriber.
+
+        Safe to call from worker threads: the fan-out is then scheduled on
+        the event loop that owns the subscriber queues.
+
+        Args:
+            event: Event type
+            data: JSON-serializable payload
+            event_id: Optional event ID
+        """
+        if not self._subscriptions:
+            return
+
+        frame = format_sse(event, data, event_id)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._fan_out, frame)
+            return
+
+        self._fan_out(frame)
+
+    def stats(self) -> dict:
+        """Counters for /api/metrics."""
+        return {
+            "subscribers": self.subscriber_count,
+            "published": self.published,
+            "resyncs": self.resyncs,
+            "bufferSize": self.buffer_size,
+        }
+
+    def _fan_out(self, frame: bytes) -> None:
+        self.published += 1
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._resync(subscription)
+
+    def _resync(self, subscription: Subscription) -> None:
+        """Slow-client policy: drop the backlog, keep a single resync event."""
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(format_sse(RESYNC_EVENT, {"reason": "slow_client"}))
+        subscription.resyncs += 1
+        self.resyncs += 1
+        logger.warning("Event subscriber fell behind; dropped backlog and sent resync")
+
+
+# Shared broadcaster used by the /api/events endpoint
+broadcaster = EventBroadcaster()
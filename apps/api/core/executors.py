@@ -0,0 +1,128 @@
+"""
+Executor backends for blocking work.
+
+CPU-heavy image work (decode, EXIF transpose, encode) runs through
+``run_cpu``. Depending on PROCESSOR_EXECUTOR it uses a thread pool or a
+pool of long-lived worker processes. In process mode only paths and small
+result dictionaries cross the process boundary, never pixel data, so
+functions passed to ``run_cpu`` must be importable module-level callables.
+
+Blocking file-system calls (writes, renames, fsync, unlink) run through
+``run_io`` on a separate thread pool, so they neither stall the event loop
+nor queue behind image decodes.
+"""
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from core.config import IO_WORKERS, PROCESSING_WORKERS, PROCESSOR_EXECUTOR
+
+logger = logging.getLogger("image_processor")
+
+EXECUTOR_MODES = ("thread", "process")
+
+_cpu_executor: Optional[Executor] = None
+_cpu_executor_mode: Optional[str] = None
+_io_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure_cpu_executor(mode: str = PROCESSOR_EXECUTOR, workers: int = PROCESSING_WORKERS) -> Executor:
+    """
+    Create (or replace) the executor used for CPU-bound image work.
+
+    Args:
+        mode: "thread" or "process"
+        workers: Number of threads or worker processes
+
+    Returns:
+        The new executor
+
+    Raises:
+        ValueError: If mode is not one of EXECUTOR_MODES
+    """
+    global _cpu_executor, _cpu_executor_mode
+
+    if mode not in EXECUTOR_MODES:
+        raise ValueError(f"Unknown executor mode: {mode!r} (expected one of {EXECUTOR_MODES})")
+
+    shutdown_executors()
+
+    if mode == "process":
+        # spawn: never fork a process that is running an event loop and threads
+        _cpu_executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    else:
+        _cpu_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="photo-cpu")
+
+    _cpu_executor_mode = mode
+    logger.info(f"CPU executor configured - mode: {mode}, workers: {workers}")
+    return _cpu_executor
+
+
+def get_cpu_executor() -> Executor:
+    """Return the CPU executor, creating it from configuration on first use."""
+    if _cpu_executor is None:
+        return configure_cpu_executor()
+    return _cpu_executor
+
+
+def cpu_executor_mode() -> Optional[str]:
+    """Mode of the current CPU executor, or None if not created yet."""
+    return _cpu_executor_mode
+
+
+async def run_cpu(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a CPU-bound callable on the CPU executor without blocking the loop.
+
+    Args:
+        func: Module-level callable (must be picklable in process mode)
+        *args: Positional arguments (must be picklable in process mode)
+
+    Returns:
+        The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), func, *args)
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Return the I/O thread pool, creating it on first use."""
+    global _io_executor
+
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="photo-io")
+    return _io_executor
+
+
+async def run_io(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    Run a blocking file-system call on the I/O thread pool.
+
+    Args:
+        func: Callable to run (use functools.partial for keyword arguments)
+        *args: Positional arguments
+
+    Returns:
+        The callable's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), func, *args)
+
+
+def shutdown_executors() -> None:
+    """Shut down executors created by this module (called on app shutdown)."""
+    global _cpu_executor, _cpu_executor_mode, _io_executor
+
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=True, cancel_futures=True)
+        _cpu_executor = None
+        _cpu_executor_mode = None
+
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=True)
+        _io_executor = None
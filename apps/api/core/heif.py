@@ -0,0 +1,82 @@
+"""
+Lazy HEIC/HEIF support.
+
+Pillow cannot open HEIC (the iPhone default) on its own. The optional
+pillow-heif package adds an opener, but importing it loads libheif and its
+codecs, so it is only imported the first time a HEIC photo is decoded, in
+the process that decodes it (the CPU executor may be a pool of worker
+processes, each registering the opener on its own first HEIC).
+
+Without pillow-heif, HEIC uploads are still accepted (validation reads
+their dimensions without decoding) but fail processing with
+HeifUnavailableError, without a decode attempt. The app warns at startup
+when it is missing (install the "heif" extra).
+"""
+import importlib.util
+import logging
+from pathlib import Path
+from typing import Optional
+
+from core.config import HEIF_DISPLAY_FORMAT
+
+logger = logging.getLogger("image_processor")
+
+HEIF_SUFFIXES = {".heic", ".heif"}
+
+# Display formats a HEIC can be transcoded to, with their file suffix
+HEIF_DISPLAY_FORMATS = {"JPEG": ".jpg", "WEBP": ".webp"}
+
+_opener_registered: Optional[bool] = None
+
+
+class HeifUnavailableError(Exception):
+    """Raised when a HEIC photo must be decoded but pillow-heif is missing."""
+
+
+def is_heif(path: Path) -> bool:
+    """Whether a raw upload is HEIC/HEIF (uploads are validated to match their extension)."""
+    return path.suffix.lower() in HEIF_SUFFIXES
+
+
+def heif_display_suffix(display_format: str = HEIF_DISPLAY_FORMAT) -> str:
+    """
+    File suffix of display images transcoded from HEIC.
+
+    Raises:
+        ValueError: If display_format is not one of HEIF_DISPLAY_FORMATS
+    """
+    try:
+        return HEIF_DISPLAY_FORMATS[display_format]
+    except KeyError:
+        raise ValueError(
+            f"Unknown HEIF_DISPLAY_FORMAT: {display_format!r} "
+            f"(expected one of {tuple(HEIF_DISPLAY_FORMATS)})"
+        ) from None
+
+
+def heif_available() -> bool:
+    """Whether pillow-heif is installed, checked without importing it."""
+    return importlib.util.find_spec("pillow_heif") is not None
+
+
+def ensure_heif_opener() -> None:
+    """
+    Register pillow-heif's Pillow opener on first use in this process.
+
+    Raises:
+        HeifUnavailableError: If pillow-heif is not installed
+    """
+    global _opener_registered
+
+    if _opener_registered is None:
+        try:
+            import pillow_heif
+        except ImportError:
+            logger.warning("pillow-heif is not installed: HEIC photos cannot be decoded")
+            _opener_registered = False
+        else:
+            pillow_heif.register_heif_opener()
+            _opener_registered = True
+
+    if not _opener_registered:
+        raise HeifUnavailableError("HEIC decoding needs the pillow-heif package")
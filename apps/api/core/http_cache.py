@@ -0,0 +1,72 @@
+"""
+HTTP conditional request helpers.
+
+Small utilities for ETag generation and If-None-Match evaluation, shared by
+endpoints that answer unchanged resources with 304 Not Modified, and the
+Cache-Control policies used across the app.
+"""
+import hashlib
+import re
+from typing import Optional
+
+# Content that can never change under its URL (UUID-named processor output,
+# content-hash versioned UI assets): cache for a year, never revalidate
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Everything else: browsers may keep a copy but must revalidate before use
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# <uuid>.<ext> display images and renditions/<uuid>/<file>
+_UUID = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+_UUID_ASSET_PATTERN = re.compile(rf"^(?:{_UUID}\.[A-Za-z0-9]+|renditions/{_UUID}/[^/]+)$")
+
+
+def make_etag(content: bytes) -> str:
+    """
+    Build a strong ETag from response content.
+
+    Args:
+        content: Response body
+
+    Returns:
+        Quoted ETag value
+    """
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against the current ETag.
+
+    Uses weak comparison (a ``W/`` prefix is ignored), as required for
+    If-None-Match, and supports lists and ``*``.
+
+    Args:
+        if_none_match: Raw If-None-Match header value, or None
+        etag: Current quoted ETag
+
+    Returns:
+        True if the client's cached copy is current
+    """
+    if not if_none_match:
+        return False
+
+    current = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == current:
+            return True
+    return False
+
+
+def is_uuid_asset(path: str) -> bool:
+    """
+    Check whether a path under /images is immutable processor output.
+
+    Args:
+        path: Path relative to display_images
+
+    Returns:
+        True for UUID-named display images and their renditions
+    """
+    return _UUID_ASSET_PATTERN.match(path) is not None
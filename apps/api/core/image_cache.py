@@ -0,0 +1,150 @@
+"""
+Bounded in-memory LRU cache of image file contents.
+
+Every carousel display requests the same photo within seconds of the
+others; caching the bytes of recently served files means slow storage is
+read once per photo instead of once per display. Entries are keyed by path
+relative to display_images and validated against the file's mtime and size
+on every lookup, so a rewritten file is never served stale. The processor's
+deletions are pushed in through ``invalidate``/``invalidate_prefix`` so
+their memory is released immediately.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+from core.config import IMAGE_CACHE_BYTES, IMAGE_CACHE_MAX_FILE_BYTES
+from core.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedFile:
+    """Contents of a file and the stat fields they were read at."""
+    body: bytes
+    mtime_ns: int
+    size: int
+
+
+class ImageCache:
+    """LRU byte cache with a total memory budget."""
+
+    def __init__(self, max_bytes: int = IMAGE_CACHE_BYTES, max_file_bytes: int = IMAGE_CACHE_MAX_FILE_BYTES):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = min(max_file_bytes, max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+        self._entries: OrderedDict[str, CachedFile] = OrderedDict()
+        self._size = 0
+        self._loading: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Bytes currently cached."""
+        return self._size
+
+    def cacheable(self, stat_result: os.stat_result) -> bool:
+        """True if a file of this size may be cached."""
+        return stat_result.st_size <= self.max_file_bytes
+
+    async def get_or_load(self, key: str, path: Path, stat_result: os.stat_result) -> bytes:
+        """
+        Return a file's contents, from memory when the cached copy is current.
+
+        Concurrent misses for the same key share a single disk read.
+
+        Args:
+            key: Cache key (path relative to the served directory)
+            path: File to read on a miss
+            stat_result: Fresh stat of path, used to validate the entry
+
+        Returns:
+            File contents
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry.mtime_ns == stat_result.st_mtime_ns and entry.size == stat_result.st_size:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.bytes_saved += entry.size
+            return entry.body
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            body = await asyncio.shield(pending)
+            self.hits += 1
+            self.bytes_saved += len(body)
+            return body
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            body = await run_io(path.read_bytes)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved in case there are none
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+
+        future.set_result(body)
+        self._store(key, CachedFile(body, stat_result.st_mtime_ns, len(body)))
+        return body
+
+    def invalidate(self, key: str) -> None:
+        """Drop a single entry, if cached."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Drop every entry whose key starts with prefix (e.g. a renditions directory)."""
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            self.invalidate(key)
+
+    def clear(self) -> None:
+        """Drop everything."""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> dict:
+        """Counters for /api/metrics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "budgetBytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRatio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytesSaved": self.bytes_saved,
+            "evictions": self.evictions,
+        }
+
+    def _store(self, key: str, entry: CachedFile) -> None:
+        if entry.size > self.max_file_bytes:
+            return
+        self.invalidate(key)
+        self._entries[key] = entry
+        self._size += entry.size
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+            self.evictions += 1
+
+
+# Shared cache behind the /images mount
+image_cache = ImageCache()
@@ -0,0 +1,240 @@
+"""
+Write-ahead journal of photo processing, for exactly-once display output.
+
+The processor writes a photo's display image and renditions first and
+deletes the raw upload second. A power cut between the two used to leave
+both, and on reboot the upload was processed again under a fresh UUID: the
+photo appeared twice. Every step is now journaled in an append-only file
+under IMAGE_DATA_ROOT, one JSON line per transition:
+
+- ``received``: the upload was committed into raw_images
+- ``processing``: a display name was chosen (fsynced before any output)
+- ``written``: display image and renditions are complete and fsynced
+  (fsynced before the raw upload is deleted)
+- ``committed``: the raw upload is gone; ``failed``: moved to failed_images
+
+At startup ``recover`` replays the journal: partial outputs of photos caught
+in "processing" are deleted and their uploads are processed again under the
+same display name, and photos caught in "written" only need their raw file
+deleted. The journal is then compacted to the uploads still pending, so
+recovery only touches those entries, never the whole display_images
+directory. A torn last line from a crash mid-append is ignored.
+"""
+import json
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from core.config import (
+    DISPLAY_IMAGES_DIR,
+    JOURNAL_COMPACT_RECORDS,
+    PROCESSING_JOURNAL,
+    RAW_IMAGES_DIR,
+    RENDITIONS_DIRNAME,
+)
+from core.durability import fsync_path
+
+logger = logging.getLogger(__name__)
+
+RECEIVED = "received"
+PROCESSING = "processing"
+WRITTEN = "written"
+COMMITTED = "committed"
+FAILED = "failed"
+JOURNAL_STATES = (RECEIVED, PROCESSING, WRITTEN, COMMITTED, FAILED)
+FINAL_STATES = {COMMITTED, FAILED}
+
+
+@dataclass
+class JournalEntry:
+    """Last journaled state of an upload that is not final yet."""
+    state: str
+    display: Optional[str] = None
+
+
+class ProcessingJournal:
+    """Append-only journal of per-upload processing states."""
+
+    def __init__(
+        self,
+        path: Path,
+        raw_dir: Path = RAW_IMAGES_DIR,
+        display_dir: Path = DISPLAY_IMAGES_DIR,
+        compact_after: int = JOURNAL_COMPACT_RECORDS,
+    ):
+        self.path = path
+        self.raw_dir = raw_dir
+        self.display_dir = display_dir
+        self.compact_after = compact_after
+        self.records = 0
+        self.compactions = 0
+        self._entries: dict[str, JournalEntry] = {}
+        self._since_compaction = 0
+        # Records are appended from I/O executor threads
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """Number of uploads not committed or failed yet."""
+        return len(self._entries)
+
+    def display_name(self, raw_name: str) -> Optional[str]:
+        """
+        Display file name already chosen for an upload, if it was interrupted.
+
+        Args:
+            raw_name: File name in raw_images
+
+        Returns:
+            The name journaled with "processing", or None for a first attempt
+        """
+        with self._lock:
+            entry = self._entries.get(raw_name)
+        if entry is None or entry.state != PROCESSING:
+            return None
+        return entry.display
+
+    def record(self, raw_name: str, state: str, display: Optional[str] = None, sync: bool = False) -> None:
+        """
+        Append a state transition (blocking; run on the I/O executor).
+
+        Args:
+            raw_name: File name in raw_images
+            state: One of JOURNAL_STATES
+            display: Display file name, for "processing"
+            sync: Fsync the journal before returning
+
+        Raises:
+            ValueError: If state is unknown
+        """
+        if state not in JOURNAL_STATES:
+            raise ValueError(f"Unknown journal state: {state!r} (expected one of {JOURNAL_STATES})")
+
+        with self._lock:
+            with open(self.path, "ab") as f:
+                f.write(self._encode(raw_name, state, display))
+                if sync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._apply(raw_name, state, display)
+            self.records += 1
+            self._since_compaction += 1
+            if self._since_compaction >= self.compact_after:
+                self._compact()
+
+    def load(self) -> None:
+        """Replay the journal file into memory (blocking)."""
+        try:
+            lines = self.path.read_bytes().splitlines()
+        except FileNotFoundError:
+            lines = []
+
+        with self._lock:
+            self._entries = {}
+            for line in lines:
+                try:
+                    record = json.loads(line)
+                    raw_name, state = record["raw"], record["state"]
+                except (ValueError, KeyError, TypeError):
+                    continue  # torn append
+                if state in JOURNAL_STATES:
+                    self._apply(raw_name, state, record.get("display"))
+        logger.info(f"Replayed {len(lines)} journal records: {len(self._entries)} uploads pending")
+
+    def recover(self) -> dict:
+        """
+        Finish or roll back uploads interrupted by a crash (blocking).
+
+        Returns:
+            Counts of uploads to process again ("reprocess"), finished
+            without processing ("finished") and gone from raw_images
+            ("dropped")
+        """
+        self.load()
+        counts = {"reprocess": 0, "finished": 0, "dropped": 0}
+
+        with self._lock:
+            for raw_name, entry in list(self._entries.items()):
+                raw_path = self.raw_dir / raw_name
+                if entry.state == WRITTEN:
+                    # Outputs are durable: only the raw upload is left over
+                    raw_path.unlink(missing_ok=True)
+                    del self._entries[raw_name]
+                    counts["finished"] += 1
+                    continue
+
+                if entry.state == PROCESSING and entry.display:
+                    self._remove_partial_output(entry.display)
+                if raw_path.exists():
+                    counts["reprocess"] += 1
+                else:
+                    del self._entries[raw_name]
+                    counts["dropped"] += 1
+
+            self._compact()
+
+        if any(counts.values()):
+            logger.info(
+                f"Journal recovery: {counts['reprocess']} to reprocess, "
+                f"{counts['finished']} finished, {counts['dropped']} dropped"
+            )
+        return counts
+
+    def stats(self) -> dict:
+        """Counters for /api/metrics."""
+        return {
+            "pending": len(self._entries),
+            "records": self.records,
+            "compactions": self.compactions,
+        }
+
+    @staticmethod
+    def _encode(raw_name: str, state: str, display: Optional[str]) -> bytes:
+        record = {"raw": raw_name, "state": state}
+        if display is not None:
+            record["display"] = display
+        return (json.dumps(record) + "\n").encode()
+
+    def _apply(self, raw_name: str, state: str, display: Optional[str]) -> None:
+        if state in FINAL_STATES:
+            self._entries.pop(raw_name, None)
+            return
+        previous = self._entries.get(raw_name)
+        if state == RECEIVED and previous is not None:
+            return  # the processor picked the upload up before it was journaled
+        if display is None and previous is not None:
+            display = previous.display
+        self._entries[raw_name] = JournalEntry(state, display)
+
+    def _remove_partial_output(self, display: str) -> None:
+        (self.display_dir / display).unlink(missing_ok=True)
+        for temp_path in self.display_dir.glob(f".{display}.*.tmp"):
+            temp_path.unlink(missing_ok=True)
+        shutil.rmtree(self.display_dir / RENDITIONS_DIRNAME / Path(display).stem, ignore_errors=True)
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the pending entries (lock held)."""
+        # Raw deletions of dropped entries must be durable before their
+        # records are: a resurrected upload without a record is processed
+        # again under a new name.
+        if self.raw_dir.exists():
+            fsync_path(self.raw_dir)
+
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            for raw_name, entry in self._entries.items():
+                f.write(self._encode(raw_name, entry.state, entry.display))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        fsync_path(self.path.parent)
+
+        self.compactions += 1
+        self._since_compaction = 0
+
+
+# Shared journal, recovered at startup
+processing_journal = ProcessingJournal(PROCESSING_JOURNAL)
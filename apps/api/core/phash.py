@@ -0,0 +1,158 @@
+"""
+Perceptual hashing of photos.
+
+dHash: the image is reduced to a 9x8 grayscale thumbnail and each bit
+records whether a pixel is brighter than its right-hand neighbour. Copies
+that were re-encoded, resized or had their metadata stripped produce the
+same or a nearly identical 64-bit hash; the Hamming distance between two
+hashes measures how different the pictures look.
+
+``MultiIndexHash`` finds all hashes within a distance of a query without
+comparing against every stored hash: each hash is split into four 16-bit
+chunks, and any hash within distance d must match the query to within
+d // 4 bits in at least one chunk (pigeonhole), so only a few hash-table
+buckets are probed.
+"""
+from collections import defaultdict
+from functools import lru_cache
+from itertools import combinations
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from core.heif import ensure_heif_opener, is_heif
+
+DHASH_SIZE = 8
+
+MIH_CHUNKS = 4
+MIH_CHUNK_BITS = 16
+MIH_CHUNK_MASK = (1 << MIH_CHUNK_BITS) - 1
+
+
+def dhash(image_path: Path) -> int:
+    """
+    Compute the 64-bit difference hash of an image.
+
+    JPEGs are decoded at reduced scale (``Image.draft``), so hashing costs
+    a fraction of a full decode. EXIF orientation is applied first so a
+    rotated re-encode hashes like its original. HEIC photos are decoded in
+    full with pillow-heif, which is loaded on first use.
+
+    Args:
+        image_path: Image to hash
+
+    Returns:
+        Hash as an unsigned 64-bit integer
+
+    Raises:
+        HeifUnavailableError: For a HEIC photo without pillow-heif installed
+    """
+    if is_heif(image_path):
+        ensure_heif_opener()
+    with Image.open(image_path) as image:
+        image.draft('L', (DHASH_SIZE * 8, DHASH_SIZE * 8))
+        return dhash_image(ImageOps.exif_transpose(image))
+
+
+def dhash_image(image: Image.Image) -> int:
+    """
+    Compute the 64-bit difference hash of an already decoded image.
+
+    Args:
+        image: Upright image in any mode
+
+    Returns:
+        Hash as an unsigned 64-bit integer
+    """
+    small = image.convert('L').resize((DHASH_SIZE + 1, DHASH_SIZE), Image.Resampling.BOX)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(DHASH_SIZE):
+        offset = row * (DHASH_SIZE + 1)
+        for col in range(DHASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return (a ^ b).bit_count()
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(radius: int) -> tuple[int, ...]:
+    """XOR masks of every chunk value within radius bits (including 0)."""
+    masks = []
+    for bits in range(radius + 1):
+        for positions in combinations(range(MIH_CHUNK_BITS), bits):
+            mask = 0
+            for position in positions:
+                mask |= 1 << position
+            masks.append(mask)
+    return tuple(masks)
+
+
+def _chunks(value: int) -> list[int]:
+    return [(value >> (i * MIH_CHUNK_BITS)) & MIH_CHUNK_MASK for i in range(MIH_CHUNKS)]
+
+
+class MultiIndexHash:
+    """Keyed 64-bit hashes with fast Hamming-radius search."""
+
+    def __init__(self):
+        self._values: dict[str, int] = {}
+        self._tables: list[defaultdict[int, set[str]]] = [defaultdict(set) for _ in range(MIH_CHUNKS)]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def add(self, key: str, value: int) -> None:
+        """Store value under key (replacing any previous value)."""
+        self.remove(key)
+        self._values[key] = value
+        for table, chunk in zip(self._tables, _chunks(value)):
+            table[chunk].add(key)
+
+    def remove(self, key: str) -> None:
+        """Forget key, if present."""
+        value = self._values.pop(key, None)
+        if value is None:
+            return
+        for table, chunk in zip(self._tables, _chunks(value)):
+            bucket = table[chunk]
+            bucket.discard(key)
+            if not bucket:
+                del table[chunk]
+
+    def search(self, value: int, max_distance: int) -> list[tuple[int, str]]:
+        """
+        Find every stored hash within max_distance bits of value.
+
+        Args:
+            value: Query hash
+            max_distance: Largest Hamming distance to return
+
+        Returns:
+            (distance, key) pairs, nearest first
+        """
+        masks = _flip_masks(max_distance // MIH_CHUNKS)
+        candidates = set()
+        for table, chunk in zip(self._tables, _chunks(value)):
+            for mask in masks:
+                bucket = table.get(chunk ^ mask)
+                if bucket:
+                    candidates.update(bucket)
+
+        matches = []
+        for key in candidates:
+            distance = hamming_distance(value, self._values[key])
+            if distance <= max_distance:
+                matches.append((distance, key))
+        matches.sort()
+        return matches
+
+    def nearest(self, value: int, max_distance: int) -> Optional[tuple[int, str]]:
+        """Closest (distance, key) within max_distance, or None."""
+        matches = self.search(value, max_distance)
+        return matches[0] if matches else None
@@ -0,0 +1,358 @@
+"""
+In-memory index of processed photos in display_images.
+
+The directory is scanned once; afterwards the processor registers each
+photo as it writes it, and readers only pay for a single ``stat()`` of the
+directory to notice changes made behind the processor's back (an operator
+deleting a photo, for example). Unchanged polls are O(1).
+
+Every addition gets a monotonically increasing sequence number and every
+removal leaves a tombstone, so clients can ask for what changed since a
+cursor instead of refetching the whole list.
+
+Photos are also grouped into clusters of near-duplicates (burst shots) by
+the perceptual hash the processor stores in each photo's manifest. A photo
+joins the cluster of its nearest earlier neighbour within CLUSTER_DISTANCE
+bits, otherwise it starts a new cluster named after itself. Cluster IDs
+never change once assigned, so they are safe to hand out in the delta feed.
+"""
+import bisect
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Optional
+
+from core.config import CLUSTER_DISTANCE, RENDITION_MANIFEST, RENDITIONS_DIRNAME
+from core.phash import MultiIndexHash
+
+logger = logging.getLogger(__name__)
+
+DISPLAY_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic', '.webp'}
+
+# Removals remembered for delta clients; older cursors get a full reset
+MAX_TOMBSTONES = 1000
+
+
+@dataclass
+class PhotoRecord:
+    """A processed photo known to the index."""
+    filename: str
+    mtime: float
+    renditions: dict = field(default_factory=dict)
+    seq: int = 0
+    dhash: Optional[int] = None
+    cluster_id: Optional[str] = None
+
+    @property
+    def photo_id(self) -> str:
+        """Stable photo ID: the processor's UUID filename without extension."""
+        return Path(self.filename).stem
+
+
+def read_photo_manifest(display_dir: Path, photo_id: str) -> dict:
+    """
+    Read the manifest the processor wrote for a photo.
+
+    Args:
+        display_dir: display_images directory
+        photo_id: Photo ID (display filename stem)
+
+    Returns:
+        Manifest with "renditions" (name to file/width/height/bytes) and
+        "dhash" (hex string); empty if there is none
+    """
+    manifest_path = display_dir / RENDITIONS_DIRNAME / photo_id / RENDITION_MANIFEST
+    try:
+        return json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def parse_dhash(value: Optional[str]) -> Optional[int]:
+    """Decode a manifest's hex dHash; None if missing or malformed."""
+    try:
+        return int(value, 16) if value else None
+    except ValueError:
+        return None
+
+
+class PhotoIndex:
+    """
+    Ordered in-memory view of display_images.
+
+    ``version`` increases on every change, so callers can cache anything
+    derived from the photo list and rebuild it only when the version moves.
+
+    ``sequence`` is the highest sequence number handed out so far; together
+    with ``epoch`` (regenerated whenever the index is rebuilt) it forms the
+    cursor of the delta feed.
+
+    Listeners registered with ``add_listener`` are called synchronously as
+    ``listener(change, record)`` where change is "added" or "removed", or
+    with ("reset", None) after a full rebuild.
+    """
+
+    def __init__(self):
+        self.directory: Optional[Path] = None
+        self.version = 0
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self._records: dict[str, PhotoRecord] = {}
+        self._ordered: Optional[list[PhotoRecord]] = None
+        self._by_seq: list[PhotoRecord] = []
+        self._tombstones: deque[tuple[int, str]] = deque()
+        self._tombstone_floor = 0
+        self._dir_mtime_ns: Optional[int] = None
+        self._hashes = MultiIndexHash()
+        self._listeners: list[Callable[[str, Optional[PhotoRecord]], None]] = []
+        self._loading = False
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def load(self, directory: Path) -> None:
+        """
+        (Re)build the index from a full scan of directory.
+
+        Args:
+            directory: display_images directory to index
+        """
+        self.directory = directory
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self._records = {}
+        self._by_seq = []
+        self._hashes = MultiIndexHash()
+        self._tombstones.clear()
+        self._tombstone_floor = 0
+        self._dir_mtime_ns = None
+        self._changed()
+        self._loading = True
+        try:
+            self.refresh(directory)
+        finally:
+            self._loading = False
+        self._notify("reset", None)
+        logger.info(f"Photo index loaded {len(self._records)} photos from {directory}")
+
+    def refresh(self, directory: Path) -> bool:
+        """
+        Bring the index up to date with directory, cheaply.
+
+        Costs one ``stat()`` when nothing changed. Otherwise lists the
+        directory and only stats files it has not seen before.
+
+        Args:
+            directory: display_images directory (a different directory
+                       triggers a full reload)
+
+        Returns:
+            True if the photo set changed
+        """
+        if directory != self.directory:
+            self.load(directory)
+            return True
+
+        try:
+            dir_mtime_ns = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._records:
+                for filename in list(self._records):
+                    self._delete(filename)
+                self._changed()
+                return True
+            return False
+
+        if dir_mtime_ns == self._dir_mtime_ns:
+            return False
+        self._dir_mtime_ns = dir_mtime_ns
+
+        present = set()
+        new_records = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if Path(entry.name).suffix.lower() not in DISPLAY_IMAGE_EXTENSIONS:
+                    continue
+                if not entry.is_file():
+                    continue
+                present.add(entry.name)
+                if entry.name not in self._records:
+                    manifest = read_photo_manifest(directory, Path(entry.name).stem)
+                    new_records.append(PhotoRecord(
+                        filename=entry.name,
+                        mtime=entry.stat().st_mtime,
+                        renditions=manifest.get("renditions", {}),
+                        dhash=parse_dhash(manifest.get("dhash")),
+                    ))
+
+        removed = set(self._records) - present
+        for filename in removed:
+            self._delete(filename)
+
+        # Chronological sequence numbers for photos found by scanning
+        for record in sorted(new_records, key=lambda r: (r.mtime, r.filename)):
+            self._insert(record)
+
+        changed = bool(new_records or removed)
+        if changed:
+            self._changed()
+        return changed
+
+    def add(
+        self,
+        path: Path,
+        renditions: Optional[dict] = None,
+        dhash: Optional[int] = None,
+    ) -> Optional[PhotoRecord]:
+        """
+        Register a photo the processor just wrote.
+
+        A photo a concurrent ``refresh()`` already picked up is updated in
+        place: it keeps its sequence number and cluster, and delta clients
+        see neither a removal nor a second addition.
+
+        Args:
+            path: Display image path
+            renditions: Rendition metadata as returned by the processor
+            dhash: Perceptual hash used for clustering, if known
+
+        Returns:
+            The new or updated record, or None if path is outside the
+            indexed directory
+        """
+        if self.directory is None or path.parent != self.directory:
+            return None
+
+        existing = self._records.get(path.name)
+        if existing is not None:
+            self._update(existing, path.stat().st_mtime, renditions or {}, dhash)
+            self._changed()
+            return existing
+
+        record = PhotoRecord(
+            filename=path.name,
+            mtime=path.stat().st_mtime,
+            renditions=renditions or {},
+            dhash=dhash,
+        )
+        self._insert(record)
+        self._changed()
+        return record
+
+    def remove(self, filename: str) -> bool:
+        """
+        Drop a photo from the index.
+
+        Args:
+            filename: Display image filename
+
+        Returns:
+            True if the photo was indexed
+        """
+        if filename not in self._records:
+            return False
+        self._delete(filename)
+        self._changed()
+        return True
+
+    def add_listener(self, listener: Callable[[str, Optional[PhotoRecord]], None]) -> None:
+        """
+        Call listener on every addition, removal and rebuild.
+
+        Args:
+            listener: Callable taking (change, record); registering the
+                      same callable twice has no effect
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def records(self) -> list[PhotoRecord]:
+        """Photos sorted by modification time (oldest first)."""
+        if self._ordered is None:
+            self._ordered = sorted(self._records.values(), key=lambda r: (r.mtime, r.filename))
+        return self._ordered
+
+    def changes_since(self, since: int, limit: int) -> tuple[list[PhotoRecord], list[str], int, bool]:
+        """
+        Photos added and IDs removed after sequence number ``since``.
+
+        Args:
+            since: Last sequence number the client has seen
+            limit: Maximum number of added photos to return
+
+        Returns:
+            Tuple of (added records in sequence order, removed photo IDs,
+            sequence number to resume from, whether more additions remain)
+        """
+        start = bisect.bisect_right(self._by_seq, since, key=lambda r: r.seq)
+        added = self._by_seq[start:start + limit]
+        has_more = start + limit < len(self._by_seq)
+        cursor = added[-1].seq if has_more else self.sequence
+
+        removed = [photo_id for seq, photo_id in self._tombstones if since < seq <= cursor]
+        return added, removed, cursor, has_more
+
+    def is_cursor_valid(self, since: int) -> bool:
+        """True if removals after ``since`` are still remembered."""
+        return self._tombstone_floor <= since <= self.sequence
+
+    def _assign_cluster(self, record: PhotoRecord) -> None:
+        record.cluster_id = record.photo_id
+        if record.dhash is None:
+            return
+
+        nearest = self._hashes.nearest(record.dhash, CLUSTER_DISTANCE)
+        if nearest is not None:
+            record.cluster_id = self._records[nearest[1]].cluster_id
+        self._hashes.add(record.filename, record.dhash)
+
+    def _insert(self, record: PhotoRecord) -> None:
+        self.sequence += 1
+        record.seq = self.sequence
+        self._assign_cluster(record)
+        self._records[record.filename] = record
+        self._by_seq.append(record)
+        if not self._loading:
+            self._notify("added", record)
+
+    def _update(self, record: PhotoRecord, mtime: float, renditions: dict, dhash: Optional[int]) -> None:
+        record.mtime = mtime
+        record.renditions = renditions
+        if dhash != record.dhash:
+            # Cluster IDs are never reassigned; only later photos see the new hash
+            self._hashes.remove(record.filename)
+            if dhash is not None:
+                self._hashes.add(record.filename, dhash)
+            record.dhash = dhash
+
+    def _delete(self, filename: str) -> None:
+        record = self._records.pop(filename)
+        self._hashes.remove(filename)
+        index = bisect.bisect_left(self._by_seq, record.seq, key=lambda r: r.seq)
+        del self._by_seq[index]
+
+        self.sequence += 1
+        self._tombstones.append((self.sequence, record.photo_id))
+        if len(self._tombstones) > MAX_TOMBSTONES:
+            self._tombstone_floor = self._tombstones.popleft()[0]
+        if not self._loading:
+            self._notify("removed", record)
+
+    def _notify(self, change: str, record: Optional[PhotoRecord]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(change, record)
+            except Exception as e:
+                logger.error(f"Photo index listener failed on {change}: {e}")
+
+    def _changed(self) -> None:
+        self.version += 1
+        self._ordered = None
+
+
+# Shared index: loaded at startup, updated by the processor, read by /api/photos
+photo_index = PhotoIndex()
@@ -0,0 +1,214 @@
+"""
+In-process photo processing pipeline.
+
+A bounded asyncio work queue drained by a pool of worker tasks. Uploads
+hand their saved paths straight to the queue, so the processor no longer
+has to rediscover each file by scanning raw_images. A full queue is the
+backpressure signal used by the upload endpoint.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("image_processor")
+
+
+@dataclass
+class WorkerStats:
+    """Running counters for a single pipeline worker."""
+    processed: int = 0
+    failed: int = 0
+    skipped: int = 0
+    busy_seconds: float = 0.0
+    current: Optional[str] = None
+    current_since: Optional[float] = None
+
+
+class ProcessingPipeline:
+    """
+    Bounded queue of image paths processed by a fixed pool of workers.
+
+    Paths are de-duplicated by filename while queued or in flight, so the
+    upload handoff, the file watcher and the reconciliation sweep can all
+    submit the same file without it being processed twice.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Path], Awaitable[Optional[bool]]],
+        workers: int,
+        maxsize: int,
+    ):
+        """
+        Args:
+            handler: Coroutine function processing a single image path;
+                     returns True if processed, False if it failed, or None
+                     if there was nothing to do (counted as skipped)
+            workers: Number of worker tasks draining the queue
+            maxsize: Maximum number of queued (not yet started) paths
+        """
+        self.handler = handler
+        self.workers = workers
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._pending: set[str] = set()
+        self._worker_tasks: list[asyncio.Task] = []
+        self._worker_stats: list[WorkerStats] = []
+        self._started_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        """True while worker tasks are draining the queue."""
+        return bool(self._worker_tasks)
+
+    @property
+    def depth(self) -> int:
+        """Number of paths waiting in the queue."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def is_full(self) -> bool:
+        """True when no more paths can be queued without waiting."""
+        return self._queue is not None and self._queue.full()
+
+    def is_pending(self, image_path: Path) -> bool:
+        """True if the path is queued or currently being processed."""
+        return image_path.name in self._pending
+
+    async def start(self) -> None:
+        """Create the queue and start the worker tasks."""
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._pending.clear()
+        self._worker_stats = [WorkerStats() for _ in range(self.workers)]
+        self._started_at = time.monotonic()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(stats), name=f"photo-worker-{i}")
+            for i, stats in enumerate(self._worker_stats)
+        ]
+        logger.info(f"Processing pipeline started - {self.workers} workers, queue size {self.maxsize}")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks. Unfinished files stay in raw_images."""
+        tasks, self._worker_tasks = self._worker_tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        self._queue = None
+        self._pending.clear()
+        logger.info("Processing pipeline stopped")
+
+    def submit(self, image_path: Path) -> bool:
+        """
+        Queue a path without waiting.
+
+        Args:
+            image_path: Path to image in raw_images directory
+
+        Returns:
+            True if queued; False if the pipeline is not running, the path
+            is already pending, or the queue is full
+        """
+        if not self.running or self.is_pending(image_path):
+            return False
+
+        try:
+            self._queue.put_nowait(image_path)
+        except asyncio.QueueFull:
+            return False
+
+        self._pending.add(image_path.name)
+        return True
+
+    async def enqueue(self, image_path: Path) -> bool:
+        """
+        Queue a path, waiting for free space if the queue is full.
+
+        Args:
+            image_path: Path to image in raw_images directory
+
+        Returns:
+            True if queued; False if not running or already pending
+        """
+        if not self.running or self.is_pending(image_path):
+            return False
+
+        # Claim the name before waiting so concurrent submitters skip it
+        self._pending.add(image_path.name)
+        try:
+            await self._queue.put(image_path)
+        except BaseException:
+            self._pending.discard(image_path.name)
+            raise
+        return True
+
+    async def join(self) -> None:
+        """Wait until every queued path has been processed."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of queue depth and per-worker utilisation.
+
+        Utilisation is the fraction of time since start() each worker spent
+        processing (including the file it is working on right now).
+
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        now = time.monotonic()
+        uptime = now - self._started_at if self.running else 0.0
+
+        workers = []
+        for index, stats in enumerate(self._worker_stats if self.running else []):
+            busy = stats.busy_seconds
+            if stats.current_since is not None:
+                busy += now - stats.current_since
+            workers.append({
+                "worker": index,
+                "processed": stats.processed,
+                "failed": stats.failed,
+                "skipped": stats.skipped,
+                "current": stats.current,
+                "utilisation": round(busy / uptime, 3) if uptime > 0 else 0.0,
+            })
+
+        return {
+            "running": self.running,
+            "queueDepth": self.depth,
+            "queueCapacity": self.maxsize,
+            "inFlight": sum(1 for w in workers if w["current"] is not None),
+            "uptimeSeconds": round(uptime, 1),
+            "workers": workers,
+        }
+
+    async def _worker(self, stats: WorkerStats) -> None:
+        """Take the next queued path as soon as the previous one is done."""
+        queue = self._queue
+        while True:
+            image_path = await queue.get()
+            stats.current = image_path.name
+            stats.current_since = time.monotonic()
+            try:
+                outcome = await self.handler(image_path)
+                if outcome is None:
+                    stats.skipped += 1
+                elif outcome:
+                    stats.processed += 1
+                else:
+                    stats.failed += 1
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"Worker failed on {image_path.name}: {type(e).__name__} - {e}")
+            finally:
+                stats.busy_seconds += time.monotonic() - stats.current_since
+                stats.current = None
+                stats.current_since = None
+                self._pending.discard(image_path.name)
+                queue.task_done()
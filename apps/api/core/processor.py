@@ -1,28 +1,63 @@
 """
 Photo Processing Pipeline Module.
 
-This module monitors the raw_images directory and processes uploaded photos:
+This module watches the raw_images directory and processes uploaded photos:
 - Generates UUID v4 filenames for deduplication
 - Corrects EXIF orientation metadata
 - Moves processed images to display_images directory
+- Generates downscaled renditions (screen, thumbnail, placeholder),
+  encoded by the display encoding policy (WebP/AVIF, byte budget)
+- Transcodes HEIC photos to JPEG/WebP in a single, time-bounded decode
 - Handles errors by moving failed images to failed_images directory
+- Journals every step so a crash never leaves a photo displayed twice
 
 Follows the backend architecture pattern defined in architecture/section-11.
 """
 import asyncio
+import io
+import json
 import logging
+import math
+import os
+import shutil
 import time
 import uuid
 from pathlib import Path
 from typing import Optional
 
+import piexif
 from PIL import Image, ImageOps, UnidentifiedImageError
+from watchfiles import Change, awatch
 
 from core.config import (
+    DEDUP_MODE,
     RAW_IMAGES_DIR,
     DISPLAY_IMAGES_DIR,
+    EXPORT_JPEG_QUALITY,
     FAILED_IMAGES_DIR,
+    HEIF_DECODE_TIMEOUT_SECONDS,
+    HEIF_DISPLAY_FORMAT,
+    HEIF_DISPLAY_QUALITY,
+    JPEG_FAST_PATH,
+    ORIENTATION_MODE,
+    PROCESSING_QUEUE_SIZE,
+    PROCESSING_WORKERS,
+    PROCESSOR_WATCH_MODE,
+    RECONCILE_INTERVAL_SECONDS,
+    RENDITION_MANIFEST,
+    RENDITIONS,
+    RENDITIONS_DIRNAME,
+    STRIP_DISPLAY_METADATA,
 )
+from core.dedup import content_index, hash_file, perceptual_index
+from core.durability import fsync_path, sync_paths, write_atomically
+from core.encoding import encode_policy, encoding_stats, savings_ratio
+from core.executors import run_cpu, run_io
+from core.heif import ensure_heif_opener, heif_display_suffix, is_heif
+from core.journal import COMMITTED, FAILED, PROCESSING, WRITTEN, processing_journal
+from core.photo_index import parse_dhash, photo_index
+from core.phash import dhash, dhash_image
+from core.pipeline import ProcessingPipeline
 
 # Configure logger for processor module
 logger = logging.getLogger("image_processor")
@@ -40,11 +75,14 @@ handler.setFormatter(formatter)
 logger.addHandler(handler)
 
 # Constants
-MAX_CONCURRENT_PROCESSING = 5
+MAX_CONCURRENT_PROCESSING = PROCESSING_WORKERS
 MONITORING_INTERVAL_SECONDS = 10
-
-# Track files currently being processed to prevent duplicate processing
-_processing_files: set[str] = set()
+RAW_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.heic'}
+EXIF_ORIENTATION_TAG = 0x0112
+# Orientations 5-8 involve a 90 degree turn: displayed width/height swap
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+# The largest rendition is the one displays show
+DISPLAY_RENDITION = max(RENDITIONS, key=RENDITIONS.get)
 
 
 class PhotoProcessor:
@@ -110,155 +148,626 @@ class PhotoProcessor:
             return image, False
 
     @staticmethod
-    async def process_single_image(image_path: Path) -> bool:
+    def copy_jpeg_losslessly(image_path: Path, output_path: Path, orientation: int) -> None:
         """
-        Process a single image through the complete pipeline.
+        Copy JPEG bytes to output_path without decoding or re-encoding pixels.
 
-        Steps:
-        1. Generate UUID filename
-        2. Open image and correct EXIF orientation
-        3. Save to display_images directory
-        4. Delete original from raw_images
-        5. On error: move to failed_images
+        With STRIP_DISPLAY_METADATA the EXIF segment is dropped (keeping only
+        the orientation tag when it is not 1); otherwise the file is
+        hard-linked, falling back to a plain copy across filesystems.
+
+        Args:
+            image_path: Path to JPEG in raw_images directory
+            output_path: Destination path in display_images directory
+            orientation: EXIF orientation value to keep (1 = upright)
+        """
+        if not STRIP_DISPLAY_METADATA:
+            def link_or_copy(temp_path: Path) -> None:
+                try:
+                    os.link(image_path, temp_path)
+                except OSError:
+                    shutil.copyfile(image_path, temp_path)
+
+            write_atomically(output_path, link_or_copy)
+            return
+
+        stripped = io.BytesIO()
+        piexif.remove(image_path.read_bytes(), stripped)
+
+        if orientation != 1:
+            exif_bytes = piexif.dump({"0th": {piexif.ImageIFD.Orientation: orientation}})
+            oriented = io.BytesIO()
+            piexif.insert(exif_bytes, stripped.getvalue(), oriented)
+            stripped = oriented
+
+        write_atomically(output_path, lambda temp_path: temp_path.write_bytes(stripped.getvalue()))
+
+    @staticmethod
+    def render_display_image(image_path: Path, output_path: Path) -> dict:
+        """
+        Produce the display image for a raw upload at output_path.
+
+        JPEGs that need no pixel changes take a lossless fast path: only the
+        header and EXIF orientation tag are read, and the original bytes are
+        copied. Everything else is decoded, orientation-corrected and
+        re-encoded.
+
+        This is the CPU-heavy stage of the pipeline. It runs on the CPU
+        executor, possibly in a worker process, so it only takes paths and
+        returns a small metadata dictionary (no pixel data).
 
         Args:
             image_path: Path to image in raw_images directory
+            output_path: Destination path in display_images directory
 
         Returns:
-            True on success, False on failure
+            Dictionary with format, displayed width/height, was_corrected
+            and method ("lossless" or "reencode")
         """
-        start_time = time.time()
-        original_filename = image_path.name
+        # Open image (lazy: parses the header only, no pixel decode yet)
+        image = Image.open(image_path)
+
+        if JPEG_FAST_PATH and image.format == 'JPEG':
+            orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+            if orientation == 1 or ORIENTATION_MODE == "exif":
+                width, height = image.size
+                image.close()
+                if orientation in TRANSPOSED_ORIENTATIONS:
+                    width, height = height, width
+
+                PhotoProcessor.copy_jpeg_losslessly(image_path, output_path, orientation)
+                return {
+                    "format": "JPEG",
+                    "width": width,
+                    "height": height,
+                    "was_corrected": False,
+                    "method": "lossless",
+                }
+
+        # Correct orientation
+        corrected_image, was_corrected = PhotoProcessor.correct_image_orientation(image)
+
+        # Preserve original format
+        # Extract format from extension or image format
+        image_format = image.format or image_path.suffix[1:].upper()
+        if image_format == 'JPG':
+            image_format = 'JPEG'
+
+        # JPEG (rotated pixels) is saved near-losslessly: this is the export copy
+        options = {"quality": EXPORT_JPEG_QUALITY} if image_format == 'JPEG' else {}
+        write_atomically(
+            output_path, lambda temp_path: corrected_image.save(temp_path, format=image_format, **options)
+        )
+
+        return {
+            "format": image_format,
+            "width": corrected_image.width,
+            "height": corrected_image.height,
+            "was_corrected": was_corrected,
+            "method": "reencode",
+        }
 
-        try:
-            # Mark file as being processed
-            _processing_files.add(original_filename)
+    @staticmethod
+    def generate_renditions(image_path: Path, rendition_dir: Path) -> dict:
+        """
+        Generate the configured RENDITIONS of an image into rendition_dir.
 
-            logger.info(f"Processing: {original_filename}")
+        JPEGs are decoded with ``Image.draft`` so libjpeg scales down by
+        1/2, 1/4 or 1/8 during decode; each smaller rendition is then derived
+        from the previous one. Renditions are always upright (orientation is
+        applied to the pixels) and encoded as chosen by the encode policy.
+        The photo's perceptual hash (dHash, used to cluster burst shots) is
+        taken from the same decoded pixels. A manifest.json with the file
+        names, dimensions, encodings and hash is written last.
+
+        Args:
+            image_path: Path to the source image
+            rendition_dir: Directory for this photo's renditions
+
+        Returns:
+            Manifest: "renditions" mapping rendition name to file, width,
+            height, bytes, format, quality and lossless, "dhash" as a
+            16-digit hex string and "sourceBytes" (size of the upload)
+        """
+        with Image.open(image_path) as image:
+            source_format = image.format
+            largest = max(RENDITIONS.values())
+            ratio = min(1.0, largest / max(image.size))
+            image.draft('RGB', (math.ceil(image.width * ratio), math.ceil(image.height * ratio)))
 
-            # Generate UUID filename
-            uuid_filename, _ = PhotoProcessor.generate_uuid_filename(original_filename)
+            current = ImageOps.exif_transpose(image)
 
-            # Run blocking I/O operations in thread pool to avoid blocking event loop
-            def process_image():
-                # Open image
-                image = Image.open(image_path)
+        return PhotoProcessor.write_renditions(
+            current, rendition_dir, source_format, image_path.stat().st_size
+        )
 
-                # Correct orientation
-                corrected_image, was_corrected = PhotoProcessor.correct_image_orientation(image)
+    @staticmethod
+    def write_renditions(
+        current: Image.Image, rendition_dir: Path, source_format: str, source_bytes: int
+    ) -> dict:
+        """
+        Write the configured RENDITIONS of a decoded, upright image.
 
-                if was_corrected:
-                    logger.info(f"Applied EXIF orientation correction to {uuid_filename}")
+        The encoding is chosen once per photo; only the display (largest)
+        rendition is held to the byte budget.
 
-                # Save to display_images directory with UUID filename
-                output_path = DISPLAY_IMAGES_DIR / uuid_filename
+        Args:
+            current: Decoded image (resized in place)
+            rendition_dir: Directory for this photo's renditions
+            source_format: Pillow format of the upload
+            source_bytes: Size of the upload, recorded for savings reports
 
-                # Preserve original format
-                # Extract format from extension or image format
-                image_format = image.format or Path(original_filename).suffix[1:].upper()
-                if image_format == 'JPG':
-                    image_format = 'JPEG'
+        Returns:
+            Manifest, as for generate_renditions
+        """
+        rendition_dir.mkdir(parents=True, exist_ok=True)
+        sizes = sorted(RENDITIONS.items(), key=lambda item: item[1], reverse=True)
+
+        if current.mode in ('RGBA', 'LA') or 'transparency' in current.info:
+            # Flatten transparency onto the carousel's black background
+            rgba = current.convert('RGBA')
+            current = Image.new('RGB', rgba.size, (0, 0, 0))
+            current.paste(rgba, mask=rgba.getchannel('A'))
+        elif current.mode != 'RGB':
+            current = current.convert('RGB')
+
+        image_hash = f"{dhash_image(current):016x}"
+        chosen = encode_policy.choose(current, source_format)
+
+        renditions = {}
+        for name, size in sizes:
+            current.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if name == DISPLAY_RENDITION:
+                data, encoding = encode_policy.encode_within_budget(current, chosen)
+            else:
+                data, encoding = encode_policy.encode(current, chosen), chosen
+            filename = f"{name}{encoding.suffix}"
+            write_atomically(rendition_dir / filename, lambda temp_path: temp_path.write_bytes(data))
+            renditions[name] = {
+                "file": filename,
+                "width": current.width,
+                "height": current.height,
+                "bytes": len(data),
+                "format": encoding.format,
+                "quality": encoding.quality,
+                "lossless": encoding.lossless,
+            }
+
+        manifest_path = rendition_dir / RENDITION_MANIFEST
+        temp_manifest = manifest_path.with_suffix(".tmp")
+        manifest = {"renditions": renditions, "dhash": image_hash, "sourceBytes": source_bytes}
+        temp_manifest.write_text(json.dumps(manifest))
+        os.replace(temp_manifest, manifest_path)
+
+        return manifest
 
-                corrected_image.save(output_path, format=image_format)
+    @staticmethod
+    def transcode_heif(image_path: Path, output_path: Path, rendition_dir: Path) -> tuple[dict, dict]:
+        """
+        Decode a HEIC photo once into its display image and renditions.
 
-                return output_path
+        HEIC has no reduced-scale decode, so the full-size pixels are decoded
+        a single time and shared: the display image is encoded as
+        HEIF_DISPLAY_FORMAT, then the renditions are downscaled from the same
+        image. pillow-heif applies the HEIC's rotation while decoding.
 
-            # Execute in thread pool
-            output_path = await asyncio.to_thread(process_image)
+        Args:
+            image_path: Path to the HEIC in raw_images
+            output_path: Destination of the display image
+            rendition_dir: Directory for this photo's renditions
+
+        Returns:
+            (manifest, result) as returned by generate_renditions and
+            render_display_image, with method "transcode"
+
+        Raises:
+            HeifUnavailableError: If pillow-heif is not installed (nothing
+                                  is decoded)
+        """
+        ensure_heif_opener()
+
+        with Image.open(image_path) as image:
+            current = ImageOps.exif_transpose(image)
+        if current.mode != 'RGB':
+            current = current.convert('RGB')
+
+        write_atomically(
+            output_path,
+            lambda temp_path: current.save(temp_path, format=HEIF_DISPLAY_FORMAT, quality=HEIF_DISPLAY_QUALITY),
+        )
+        result = {
+            "format": HEIF_DISPLAY_FORMAT,
+            "width": current.width,
+            "height": current.height,
+            "was_corrected": False,
+            "method": "transcode",
+        }
+        manifest = PhotoProcessor.write_renditions(
+            current, rendition_dir, "HEIF", image_path.stat().st_size
+        )
+        return manifest, result
+
+    @staticmethod
+    async def _transcode_heif_bounded(image_path: Path, output_path: Path, rendition_dir: Path) -> tuple[dict, dict]:
+        """
+        Run transcode_heif on the CPU executor, waiting at most HEIF_DECODE_TIMEOUT_SECONDS.
+
+        A running decode cannot be interrupted: on timeout the photo fails
+        and whatever the worker writes when it finally returns is deleted.
+
+        Raises:
+            TimeoutError: If the decode takes too long
+        """
+        task = asyncio.ensure_future(
+            run_cpu(PhotoProcessor.transcode_heif, image_path, output_path, rendition_dir)
+        )
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), HEIF_DECODE_TIMEOUT_SECONDS)
+        except TimeoutError:
+            def discard_late_output(finished: asyncio.Future) -> None:
+                if not finished.cancelled():
+                    finished.exception()  # retrieved: the photo has already failed
+                asyncio.ensure_future(run_io(PhotoProcessor._remove_outputs, output_path, rendition_dir))
+
+            task.add_done_callback(discard_late_output)
+            raise TimeoutError(f"HEIC decode exceeded {HEIF_DECODE_TIMEOUT_SECONDS}s") from None
+
+    @staticmethod
+    def _remove_outputs(output_path: Path, rendition_dir: Path) -> None:
+        output_path.unlink(missing_ok=True)
+        shutil.rmtree(rendition_dir, ignore_errors=True)
+
+    @staticmethod
+    async def process_single_image(image_path: Path) -> bool:
+        """
+        Process a single image through the complete pipeline.
+
+        Steps:
+        1. Generate UUID filename (or reuse the one journaled by an
+           interrupted attempt) and journal "processing"
+        2. In perceptual dedup mode: skip near-duplicates of earlier photos
+        3. Generate downscaled renditions
+        4. Open image and correct EXIF orientation
+        5. Save to display_images directory
+           (HEIC: steps 3-5 are one time-bounded decode and transcode, and
+           the near-duplicate check of step 2 uses the dHash it computed)
+        6. Fsync the outputs and journal "written"
+        7. Delete original from raw_images and journal "committed"
+        8. On error: move to failed_images and journal "failed"
+
+        Args:
+            image_path: Path to image in raw_images directory
+
+        Returns:
+            True on success, False on failure
+        """
+        start_time = time.time()
+        original_filename = image_path.name
+        rendition_dir = None
+        perceptual_record = None
+
+        try:
+            logger.info(f"Processing: {original_filename}")
+
+            # Generate UUID filename, unless a crash interrupted an earlier
+            # attempt: reusing its name keeps exactly one display copy
+            retried_filename = processing_journal.display_name(original_filename)
+            uuid_filename = retried_filename or PhotoProcessor.generate_uuid_filename(original_filename)[0]
+
+            # Save to display_images directory with UUID filename
+            output_path = DISPLAY_IMAGES_DIR / uuid_filename
+            if is_heif(image_path):
+                # Browsers other than Safari cannot show HEIC
+                output_path = output_path.with_suffix(heif_display_suffix(HEIF_DISPLAY_FORMAT))
+            await PhotoProcessor._journal(original_filename, PROCESSING, output_path.name, sync=True)
+
+            # Skip re-encoded copies of photos already on the carousel (a
+            # retried photo's hash was claimed by its first attempt). HEICs
+            # are checked after their bounded decode: hashing one first
+            # would be a second, unbounded full decode.
+            if DEDUP_MODE == "perceptual" and not is_heif(image_path):
+                perceptual_record = await PhotoProcessor._claim_perceptual_hash(
+                    await run_cpu(dhash, image_path), retried_filename is not None
+                )
+                if perceptual_record is None:
+                    await PhotoProcessor._skip_near_duplicate(image_path, original_filename)
+                    return True
+
+            # Renditions first: once the display image exists the photo is
+            # listed by /api/photos, and its renditions must be ready by then
+            rendition_dir = DISPLAY_IMAGES_DIR / RENDITIONS_DIRNAME / output_path.stem
+            if is_heif(image_path):
+                manifest, result = await PhotoProcessor._transcode_heif_bounded(
+                    image_path, output_path, rendition_dir
+                )
+                if DEDUP_MODE == "perceptual":
+                    perceptual_record = await PhotoProcessor._claim_perceptual_hash(
+                        parse_dhash(manifest["dhash"]), retried_filename is not None
+                    )
+                    if perceptual_record is None:
+                        await run_io(PhotoProcessor._remove_outputs, output_path, rendition_dir)
+                        await PhotoProcessor._skip_near_duplicate(image_path, original_filename)
+                        return True
+            else:
+                manifest = await run_cpu(PhotoProcessor.generate_renditions, image_path, rendition_dir)
+
+                # Decode/transpose/encode on the CPU executor (thread or process pool)
+                result = await run_cpu(
+                    PhotoProcessor.render_display_image,
+                    image_path,
+                    output_path,
+                )
+
+            if result["was_corrected"]:
+                logger.info(f"Applied EXIF orientation correction to {uuid_filename}")
+
+            # Outputs must survive a power cut before the raw upload may go
+            await run_io(PhotoProcessor._sync_outputs, output_path, rendition_dir)
+            await PhotoProcessor._journal(original_filename, WRITTEN, sync=True)
+
+            # Make the photo visible to /api/photos without a directory rescan
+            photo_index.add(output_path, manifest["renditions"], parse_dhash(manifest["dhash"]))
+            PhotoProcessor._report_savings(uuid_filename, manifest)
 
             # Delete original file from raw_images
-            image_path.unlink()
+            await run_io(image_path.unlink)
+            await PhotoProcessor._journal(original_filename, COMMITTED)
 
             # Calculate processing duration
             duration_ms = int((time.time() - start_time) * 1000)
-            logger.info(f"Successfully processed {original_filename} in {duration_ms}ms")
+            logger.info(
+                f"Successfully processed {original_filename} in {duration_ms}ms "
+                f"({result['method']})"
+            )
 
             return True
 
         except UnidentifiedImageError as e:
             logger.error(f"Corrupted image: {original_filename} - {e}")
-            await PhotoProcessor._move_to_failed(image_path, original_filename)
+            await PhotoProcessor._move_to_failed(image_path, original_filename, rendition_dir, perceptual_record)
             return False
 
         except Exception as e:
             logger.error(f"Unexpected error processing {original_filename}: {type(e).__name__} - {e}")
-            await PhotoProcessor._move_to_failed(image_path, original_filename)
+            await PhotoProcessor._move_to_failed(image_path, original_filename, rendition_dir, perceptual_record)
             return False
 
-        finally:
-            # Remove from processing set
-            _processing_files.discard(original_filename)
+    @staticmethod
+    def _sync_outputs(output_path: Path, rendition_dir: Path) -> None:
+        """Fsync a photo's display image, renditions and their directories (blocking)."""
+        files = [output_path]
+        if rendition_dir.is_dir():
+            files.extend(rendition_dir.iterdir())
+            fsync_path(rendition_dir.parent)
+        sync_paths(files)
+
+    @staticmethod
+    async def _journal(raw_name: str, state: str, display: Optional[str] = None, sync: bool = False) -> None:
+        """
+        Journal a processing step (see core.journal).
+
+        A journal that cannot be written only costs crash safety, so the
+        error is logged and processing goes on.
+        """
+        try:
+            await run_io(processing_journal.record, raw_name, state, display, sync)
+        except OSError as e:
+            logger.error(f"Failed to journal {state} for {raw_name}: {e}")
+
+    @staticmethod
+    def _report_savings(uuid_filename: str, manifest: dict) -> None:
+        """Log and count the bytes displays download instead of the upload."""
+        display = manifest["renditions"].get(DISPLAY_RENDITION)
+        if display is None:
+            return
+        source_bytes = manifest["sourceBytes"]
+        encoding_stats.record(source_bytes, display["bytes"])
+        encoding = "lossless" if display["lossless"] else f"q{display['quality']}"
+        logger.info(
+            f"Display rendition of {uuid_filename}: {display['format']} {encoding}, "
+            f"{display['bytes'] / 1024:.0f} KB from a {source_bytes / 1e6:.2f} MB upload "
+            f"({savings_ratio(source_bytes, display['bytes']):.0%} smaller)"
+        )
 
     @staticmethod
-    async def _move_to_failed(image_path: Path, original_filename: str) -> None:
+    async def _claim_perceptual_hash(value: int, retried: bool) -> Optional[bytes]:
         """
-        Move failed image to failed_images directory.
+        Record an image's dHash unless it matches a photo already processed.
+
+        Args:
+            value: The image's dHash
+            retried: The photo's first attempt was interrupted after
+                     claiming the hash (it is not checked again)
+
+        Returns:
+            The index record, to release if processing fails, or None if the
+            image is a near-duplicate and should be skipped
+        """
+        record = perceptual_index.encode(value)
+        if retried:
+            return record
+        if perceptual_index.find_near(value) is not None:
+            return None
+
+        perceptual_index.claim(record)
+        await run_io(perceptual_index.append, record)
+        return record
+
+    @staticmethod
+    async def _skip_near_duplicate(image_path: Path, original_filename: str) -> None:
+        await run_io(image_path.unlink)
+        await PhotoProcessor._journal(original_filename, COMMITTED)
+        logger.info(f"Skipped near-duplicate of an earlier photo: {original_filename}")
+
+    @staticmethod
+    async def _forget_hashes(image_path: Path, perceptual_record: Optional[bytes] = None) -> None:
+        """
+        Remove a failed photo's de-duplication hashes.
+
+        Otherwise the guest's retry of the same photo would be answered as a
+        duplicate, and the photo would never reach the carousel.
+
+        Args:
+            image_path: Failed image, still in raw_images
+            perceptual_record: dHash record claimed for the photo, if any
+        """
+        if DEDUP_MODE == "off":
+            return
+        try:
+            digest = await run_io(hash_file, image_path)
+            if digest in content_index:
+                await run_io(content_index.remove, digest)
+        except OSError as e:
+            logger.error(f"Failed to release content hash of {image_path.name}: {e}")
+
+        # Nothing is decoded again: a HEIC may have failed by timing out
+        if perceptual_record is not None and perceptual_record in perceptual_index:
+            try:
+                await run_io(perceptual_index.remove, perceptual_record)
+            except OSError as e:
+                logger.error(f"Failed to release perceptual hash of {image_path.name}: {e}")
+
+    @staticmethod
+    async def _move_to_failed(
+        image_path: Path,
+        original_filename: str,
+        rendition_dir: Optional[Path] = None,
+        perceptual_record: Optional[bytes] = None,
+    ) -> None:
+        """
+        Move failed image to failed_images directory, releasing its hashes.
 
         Args:
             image_path: Path to failed image
             original_filename: Original filename for logging
+            rendition_dir: Partially generated renditions to remove, if any
+            perceptual_record: dHash record claimed for the photo, if any
         """
+        if rendition_dir is not None:
+            await run_io(shutil.rmtree, rendition_dir, True)
+        if image_path.exists():
+            await PhotoProcessor._forget_hashes(image_path, perceptual_record)
+
         try:
             if image_path.exists():
                 failed_path = FAILED_IMAGES_DIR / original_filename
-                await asyncio.to_thread(image_path.rename, failed_path)
+                await run_io(image_path.rename, failed_path)
                 logger.info(f"Moved failed image {original_filename} to failed_images/")
+                await PhotoProcessor._journal(original_filename, FAILED)
         except Exception as e:
             logger.error(f"Failed to move {original_filename} to failed_images/: {e}")
 
 
 async def process_batch(image_files: list[Path]) -> list[bool]:
     """
-    Process multiple images concurrently with limit.
+    Process multiple images with at most MAX_CONCURRENT_PROCESSING in flight.
 
-    Processes up to MAX_CONCURRENT_PROCESSING images at once.
+    Unlike a fixed slice, every file is processed: as soon as one finishes
+    the next one starts, so a slow image never holds back the rest.
 
     Args:
         image_files: List of image file paths to process
 
     Returns:
-        List of success/failure booleans for each file
+        List of success/failure booleans for each file, in input order
     """
-    # Limit to MAX_CONCURRENT_PROCESSING files
-    files_to_process = image_files[:MAX_CONCURRENT_PROCESSING]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_PROCESSING)
 
-    # Create tasks for concurrent processing
-    tasks = [PhotoProcessor.process_single_image(img) for img in files_to_process]
+    async def process_when_free(image_path: Path) -> bool:
+        async with semaphore:
+            return await PhotoProcessor.process_single_image(image_path)
 
     # Gather results, capturing exceptions
-    results = await asyncio.gather(*tasks, return_exceptions=True)
+    results = await asyncio.gather(
+        *(process_when_free(img) for img in image_files),
+        return_exceptions=True
+    )
 
     # Convert exceptions to False
     return [r if isinstance(r, bool) else False for r in results]
 
 
-async def monitor_raw_images() -> None:
+def is_raw_image(path: Path) -> bool:
+    """
+    Check whether a path is a complete upload the processor should pick up.
+
+    In-progress uploads use a ``.part`` suffix and are therefore ignored.
+
+    Args:
+        path: Path inside raw_images
+
+    Returns:
+        True if the file has an accepted image extension
     """
-    Monitor raw_images directory every 10 seconds for new files.
+    return path.suffix.lower() in RAW_IMAGE_EXTENSIONS
+
 
-    Background task that continuously monitors for new images and
-    processes them through the photo processing pipeline.
+def find_raw_images() -> list[Path]:
+    """
+    List unprocessed images in raw_images with a single directory scan.
+
+    Returns:
+        Image paths sorted by name (upload timestamp prefix = arrival order)
+    """
+    return sorted(
+        (f for f in RAW_IMAGES_DIR.iterdir() if f.is_file() and is_raw_image(f)),
+        key=lambda f: f.name
+    )
+
+
+async def _process_queued_image(image_path: Path) -> Optional[bool]:
+    """
+    Pipeline handler: process a queued image unless it is already gone.
+
+    The watcher and the sweep routinely announce files another submission
+    has processed in the meantime; those are skipped, not failures.
+    """
+    if not image_path.exists():
+        return None
+    return await PhotoProcessor.process_single_image(image_path)
+
+
+# Shared pipeline fed by upload_photo, the file watcher and the sweep
+pipeline = ProcessingPipeline(
+    _process_queued_image,
+    workers=PROCESSING_WORKERS,
+    maxsize=PROCESSING_QUEUE_SIZE,
+)
+
+
+async def monitor_raw_images(interval: float = MONITORING_INTERVAL_SECONDS) -> None:
+    """
+    Poll raw_images directory for new files every ``interval`` seconds.
+
+    Background task that queues every unprocessed image on the processing
+    pipeline. The first pass re-enqueues anything left over from before a
+    restart; in watch mode later passes are only a slow reconciliation sweep
+    for anything the watcher and upload handoff missed. Each pass also
+    refreshes the photo index, so photos deleted from display_images by
+    hand are announced to event subscribers even when no display polls.
 
     This function runs indefinitely until cancelled by FastAPI shutdown.
+
+    Args:
+        interval: Seconds to sleep between directory scans
     """
-    logger.info("Photo processor started - monitoring raw_images/")
+    logger.info(f"Photo processor polling raw_images/ every {interval:g}s")
 
     while True:
         try:
-            # Find new image files
-            image_files = []
-            for pattern in ['*.jpg', '*.jpeg', '*.png', '*.heic']:
-                image_files.extend(RAW_IMAGES_DIR.glob(pattern))
-
-            # Filter out files currently being processed
-            new_files = [f for f in image_files if f.name not in _processing_files]
+            # Find new image files, skipping those already queued or in flight
+            new_files = [f for f in find_raw_images() if not pipeline.is_pending(f)]
 
             if new_files:
                 logger.info(f"Monitoring raw_images/ - Found {len(new_files)} new files")
-                await process_batch(new_files)
+                for image_file in new_files:
+                    # Waits for queue space: the sweep is throttled, not dropped
+                    await pipeline.enqueue(image_file)
+
+            if photo_index.directory == DISPLAY_IMAGES_DIR:
+                photo_index.refresh(DISPLAY_IMAGES_DIR)
 
-            # Poll every 10 seconds
-            await asyncio.sleep(MONITORING_INTERVAL_SECONDS)
+            await asyncio.sleep(interval)
 
         except asyncio.CancelledError:
             logger.info("Photo processor shutdown requested")
@@ -267,4 +776,60 @@ async def monitor_raw_images() -> None:
         except Exception as e:
             logger.error(f"Error in monitoring loop: {e}")
             # Continue monitoring even on error
-            await asyncio.sleep(MONITORING_INTERVAL_SECONDS)
+            await asyncio.sleep(interval)
+
+
+async def watch_raw_images() -> None:
+    """
+    Process new uploads as soon as they land in raw_images.
+
+    Uses inotify (through watchfiles) instead of polling. Uploads are renamed
+    into place once complete, so an added/modified event for an image path
+    means the file is ready.
+
+    This function runs indefinitely until cancelled by FastAPI shutdown.
+    """
+    logger.info("Photo processor started - watching raw_images/")
+
+    def watch_filter(change: Change, path: str) -> bool:
+        return change != Change.deleted and is_raw_image(Path(path))
+
+    try:
+        async for changes in awatch(RAW_IMAGES_DIR, watch_filter=watch_filter, recursive=False):
+            for _, path in sorted(changes, key=lambda c: c[1]):
+                image_path = Path(path)
+                if image_path.exists():
+                    await pipeline.enqueue(image_path)
+
+    except asyncio.CancelledError:
+        logger.info("Photo watcher shutdown requested")
+        raise
+
+
+async def run_processor(mode: str = PROCESSOR_WATCH_MODE) -> None:
+    """
+    Run the processing pipeline and its file discovery in the configured mode.
+
+    Args:
+        mode: "watch" for event-driven processing with a reconciliation sweep
+              every RECONCILE_INTERVAL_SECONDS, "poll" for plain polling
+    """
+    await pipeline.start()
+
+    sweep_task = None
+    try:
+        if mode == "poll":
+            await monitor_raw_images(MONITORING_INTERVAL_SECONDS)
+            return
+
+        sweep_task = asyncio.create_task(monitor_raw_images(RECONCILE_INTERVAL_SECONDS))
+        try:
+            await watch_raw_images()
+        except Exception as e:
+            logger.error(f"File watcher failed, falling back to polling: {e}")
+            sweep_task.cancel()
+            await monitor_raw_images(MONITORING_INTERVAL_SECONDS)
+    finally:
+        if sweep_task is not None:
+            sweep_task.cancel()
+        await pipeline.stop()
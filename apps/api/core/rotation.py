@@ -0,0 +1,87 @@
+"""
+Carousel rotation order.
+
+The server decides what every display shows next: the rotation is one
+representative per near-duplicate cluster (its earliest photo), in
+chronological order, wrapping around at the end. Displays ask for the
+photos that follow the one they are showing and prefetch them, so the next
+image is downloaded and decoded before its crossfade starts.
+
+The order is derived from the photo index and rebuilt only when the index
+version changes.
+"""
+from typing import Optional
+
+from core.photo_index import PhotoIndex, PhotoRecord, photo_index
+
+
+class Rotation:
+    """Rotation order over a PhotoIndex, cached per index version."""
+
+    def __init__(self, index: PhotoIndex = photo_index):
+        self.index = index
+        self._version: Optional[int] = None
+        self._order: list[PhotoRecord] = []
+        self._positions: dict[str, int] = {}
+        self._clusters: dict[str, str] = {}
+
+    def order(self) -> list[PhotoRecord]:
+        """
+        Photos in rotation order.
+
+        Returns:
+            One photo per cluster (the earliest), oldest first
+        """
+        if self._version != self.index.version:
+            order = []
+            positions = {}
+            clusters = {}
+            for record in self.index.records():
+                cluster_id = record.cluster_id or record.photo_id
+                clusters[record.photo_id] = cluster_id
+                if cluster_id not in positions:
+                    positions[cluster_id] = len(order)
+                    order.append(record)
+            self._order, self._positions, self._clusters = order, positions, clusters
+            self._version = self.index.version
+        return self._order
+
+    def position(self, photo_id: str) -> Optional[int]:
+        """
+        Position in the rotation of a photo or of its cluster.
+
+        Args:
+            photo_id: Photo ID; a burst member maps to its representative
+
+        Returns:
+            Index into order(), or None if the photo is not indexed
+        """
+        self.order()
+        cluster_id = self._clusters.get(photo_id)
+        return None if cluster_id is None else self._positions[cluster_id]
+
+    def upcoming(self, after: Optional[str], count: int) -> list[PhotoRecord]:
+        """
+        The next photos to show after the one currently displayed.
+
+        Args:
+            after: ID of the photo on screen; None or an unknown (e.g.
+                   deleted) photo starts from the beginning of the rotation
+            count: Maximum number of photos to return
+
+        Returns:
+            Up to count photos in the order they will be shown, wrapping
+            around; never repeats a photo within one window
+        """
+        order = self.order()
+        if not order:
+            return []
+
+        current = self.position(after) if after else None
+        start = 0 if current is None else current + 1
+        count = min(count, len(order))
+        return [order[(start + offset) % len(order)] for offset in range(count)]
+
+
+# Shared rotation over the shared photo index
+rotation = Rotation()
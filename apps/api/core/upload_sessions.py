@@ -0,0 +1,218 @@
+"""
+Resumable upload sessions.
+
+A session is a directory ``raw_images/.sessions/<id>/`` holding the bytes
+received so far (``data.part``) and ``meta.json`` with the original
+filename, the declared size and, once completed, the upload result. The
+data file's length is the session offset: whatever reached the disk before
+a guest walked out of Wi-Fi range is kept, and the client resumes from
+there. Nothing is tracked in memory, so sessions also survive a restart.
+
+The processor never looks inside ``.sessions`` (it only lists image
+files directly in raw_images). Completion renames the data file into
+raw_images, which is atomic because both live on the same filesystem.
+
+Before the data file is moved or dropped, the upload's fate is recorded in
+``meta.json`` (``handoff``: the raw_images path and the result). A crash
+after the move leaves a session without data but with that record, so a
+retried completion can finish the handoff instead of failing forever.
+
+Sessions whose files have not been touched for ``ttl`` seconds are removed
+by ``expire()``; a completed session is kept until then so a client that
+lost the completion response can ask again and get the same answer.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from core.config import UPLOAD_SESSION_TTL_SECONDS, UPLOAD_SESSIONS_DIR
+from core.durability import fsync_path
+from core.executors import run_io
+
+logger = logging.getLogger(__name__)
+
+SESSION_DATA = "data.part"
+SESSION_META = "meta.json"
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class UploadSession:
+    """State of one resumable upload."""
+    id: str
+    filename: str
+    size: int
+    offset: int
+    updated: float
+    result: Optional[dict] = None
+    handoff: Optional[dict] = None
+
+    @property
+    def complete(self) -> bool:
+        """True once all declared bytes have been received."""
+        return self.offset >= self.size
+
+
+class UploadSessionStore:
+    """Resumable upload sessions stored on disk (all methods blocking)."""
+
+    def __init__(self, root: Path = UPLOAD_SESSIONS_DIR, ttl: float = UPLOAD_SESSION_TTL_SECONDS):
+        self.root = root
+        self.ttl = ttl
+
+    def create(self, filename: str, size: int) -> UploadSession:
+        """
+        Start a new session.
+
+        Args:
+            filename: Filename sent by the client
+            size: Total number of bytes the client will send
+
+        Returns:
+            The new session, at offset 0
+        """
+        session_id = uuid.uuid4().hex
+        directory = self.root / session_id
+        directory.mkdir(parents=True)
+        (directory / SESSION_DATA).touch()
+        self._write_meta(directory, {"filename": filename, "size": size})
+        return self.get(session_id)
+
+    def get(self, session_id: str) -> Optional[UploadSession]:
+        """
+        Look up a session.
+
+        Args:
+            session_id: Session ID from the client
+
+        Returns:
+            The session, or None if the ID is malformed, unknown or expired
+        """
+        if not SESSION_ID_PATTERN.match(session_id):
+            return None
+
+        directory = self.root / session_id
+        try:
+            meta = json.loads((directory / SESSION_META).read_text())
+            meta_mtime = (directory / SESSION_META).stat().st_mtime
+        except (OSError, ValueError):
+            return None
+
+        try:
+            data_stat = (directory / SESSION_DATA).stat()
+            offset, updated = data_stat.st_size, max(meta_mtime, data_stat.st_mtime)
+        except FileNotFoundError:
+            # Completed: the data was handed to the processor
+            offset, updated = meta["size"], meta_mtime
+
+        if time.time() - updated > self.ttl:
+            return None
+
+        return UploadSession(
+            id=session_id,
+            filename=meta["filename"],
+            size=meta["size"],
+            offset=offset,
+            updated=updated,
+            result=meta.get("result"),
+            handoff=meta.get("handoff"),
+        )
+
+    def data_path(self, session: UploadSession) -> Path:
+        """Path of the bytes received so far."""
+        return self.root / session.id / SESSION_DATA
+
+    def mark_handing_off(self, session: UploadSession, raw_path: Optional[Path], result: dict) -> None:
+        """
+        Durably record where a session's data is about to go.
+
+        Args:
+            session: Completed session
+            raw_path: Destination in raw_images, or None if the data is
+                      dropped (a duplicate)
+            result: Response to return once the handoff is done
+        """
+        handoff = {"path": str(raw_path) if raw_path is not None else None, "result": result}
+        self._write_meta(
+            self.root / session.id,
+            {"filename": session.filename, "size": session.size, "handoff": handoff},
+            sync=True,
+        )
+        session.handoff = handoff
+
+    def mark_completed(self, session: UploadSession, result: dict) -> None:
+        """
+        Record the upload result after the data has been handed off.
+
+        Args:
+            session: Completed session
+            result: Response returned to the client, replayed on retries
+        """
+        self._write_meta(
+            self.root / session.id,
+            {"filename": session.filename, "size": session.size, "result": result},
+        )
+        session.result = result
+
+    def delete(self, session: UploadSession) -> None:
+        """Remove a session and any bytes it holds."""
+        shutil.rmtree(self.root / session.id, ignore_errors=True)
+
+    def expire(self) -> int:
+        """
+        Remove sessions idle for longer than the TTL.
+
+        Returns:
+            Number of sessions removed
+        """
+        try:
+            entries = list(os.scandir(self.root))
+        except FileNotFoundError:
+            return 0
+
+        removed = 0
+        now = time.time()
+        for entry in entries:
+            # The directory mtime guards sessions still being created
+            if (
+                entry.is_dir()
+                and self.get(entry.name) is None
+                and now - entry.stat().st_mtime > self.ttl
+            ):
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.info(f"Expired {removed} stale upload sessions")
+        return removed
+
+    async def run_expiry(self) -> None:
+        """Expire stale sessions every quarter TTL until cancelled."""
+        interval = max(self.ttl / 4, 1)
+        while True:
+            try:
+                await run_io(self.expire)
+            except OSError as e:
+                logger.error(f"Upload session expiry failed: {e}")
+            await asyncio.sleep(interval)
+
+    @staticmethod
+    def _write_meta(directory: Path, meta: dict, sync: bool = False) -> None:
+        temp_path = directory / (SESSION_META + ".tmp")
+        temp_path.write_text(json.dumps(meta))
+        if sync:
+            fsync_path(temp_path)
+        os.replace(temp_path, directory / SESSION_META)
+        if sync:
+            fsync_path(directory)
+
+
+# Shared store used by the resumable upload endpoints
+upload_sessions = UploadSessionStore()
@@ -0,0 +1,256 @@
+"""
+Upload validation by header sniffing.
+
+The upload endpoints used to accept anything with a .jpg/.jpeg/.png/.heic
+extension; garbage only failed inside the processor, after a full decode
+attempt. UploadValidator instead looks at the first bytes of the body as it
+streams in:
+
+- The file signature (magic bytes) must be JPEG, PNG or HEIC, and must match
+  the format the extension claims.
+- The header is parsed without decoding pixels (Pillow's lazy
+  ``Image.open`` for JPEG and PNG, the ``ispe`` box for HEIC) to read the
+  dimensions, and images over UPLOAD_MAX_PIXELS (decompression bombs) are
+  refused.
+
+Only the first UPLOAD_HEADER_MAX_BYTES are buffered; everything after the
+header is passed through untouched.
+"""
+import io
+import struct
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from PIL import Image
+
+from core.config import UPLOAD_HEADER_MAX_BYTES, UPLOAD_MAX_PIXELS
+
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"hevm", b"hevs", b"mif1", b"msf1"}
+SIGNATURE_BYTES = 16
+
+EXTENSION_FORMATS = {".jpg": "JPEG", ".jpeg": "JPEG", ".png": "PNG", ".heic": "HEIF"}
+
+
+class InvalidImageError(Exception):
+    """
+    Raised when an upload is not an acceptable image.
+
+    Attributes:
+        reason: "format" (not JPEG/PNG/HEIC), "mismatch" (content does not
+                match the extension), "truncated" (ended before the header
+                was complete), "header" (no readable header) or
+                "dimensions" (too many pixels)
+    """
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    """What the header says about an upload."""
+    format: str
+    width: int
+    height: int
+
+
+def sniff_format(data: bytes) -> Optional[str]:
+    """
+    Identify an image format from its first bytes.
+
+    Args:
+        data: At least the first SIGNATURE_BYTES of the file
+
+    Returns:
+        "JPEG", "PNG", "HEIF" or None if the signature is not recognized
+    """
+    if data.startswith(JPEG_SIGNATURE):
+        return "JPEG"
+    if data.startswith(PNG_SIGNATURE):
+        return "PNG"
+    if data[4:8] == b"ftyp" and data[8:12] in HEIF_BRANDS:
+        return "HEIF"
+    return None
+
+
+def _boxes(data: bytes, start: int, end: int) -> Iterator[tuple[bytes, int, int]]:
+    """ISO-BMFF boxes in data[start:end] as (type, body start, box end)."""
+    while start + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, start)
+        header = 8
+        if size == 1:
+            if start + 16 > end:
+                return
+            size = struct.unpack_from(">Q", data, start + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - start
+        if size < header:
+            return
+        yield box_type, start + header, start + size
+        start += size
+
+
+def _find_box(data: bytes, start: int, end: int, box_type: bytes) -> Optional[tuple[int, int]]:
+    """Body range of the first complete box of a type, or None."""
+    for found_type, body, box_end in _boxes(data, start, end):
+        if found_type == box_type:
+            return (body, box_end) if box_end <= len(data) else None
+    return None
+
+
+def _heif_dimensions(data: bytes) -> Optional[tuple[int, int]]:
+    """Largest image size declared by the ``ispe`` properties of a HEIF header."""
+    meta = _find_box(data, 0, len(data), b"meta")
+    if meta is None:
+        return None
+    # meta is a full box: 4 bytes of version and flags precede its children
+    iprp = _find_box(data, meta[0] + 4, meta[1], b"iprp")
+    ipco = iprp and _find_box(data, iprp[0], iprp[1], b"ipco")
+    if ipco is None:
+        return None
+    sizes = [
+        struct.unpack_from(">II", data, body + 4)
+        for box_type, body, box_end in _boxes(data, ipco[0], ipco[1])
+        if box_type == b"ispe" and box_end - body >= 12
+    ]
+    return max(sizes, key=lambda size: size[0] * size[1]) if sizes else None
+
+
+def read_dimensions(image_format: str, data: bytes) -> Optional[tuple[int, int]]:
+    """
+    Read image dimensions from a file's leading bytes without decoding pixels.
+
+    Args:
+        image_format: Format from sniff_format
+        data: Leading bytes of the file
+
+    Returns:
+        (width, height), or None if data does not hold a complete header
+
+    Raises:
+        InvalidImageError: If Pillow refuses the header as a decompression bomb
+    """
+    if image_format == "HEIF":
+        return _heif_dimensions(data)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(data), formats=[image_format]) as image:
+                return image.size
+    except Image.DecompressionBombError as e:
+        raise InvalidImageError("dimensions", str(e)) from e
+    except Exception:
+        # Header incomplete or corrupt; the caller decides which
+        return None
+
+
+class UploadValidator:
+    """Validates an upload from the chunks of its body as they arrive."""
+
+    def __init__(
+        self,
+        filename: str,
+        max_pixels: int = UPLOAD_MAX_PIXELS,
+        max_header_bytes: int = UPLOAD_HEADER_MAX_BYTES,
+    ):
+        """
+        Args:
+            filename: Filename sent by the client (its extension names the
+                      expected format)
+            max_pixels: Largest accepted width x height
+            max_header_bytes: How far into the file the header must end
+        """
+        self.expected_format = EXTENSION_FORMATS.get(Path(filename).suffix.lower())
+        self.max_pixels = max_pixels
+        self.max_header_bytes = max_header_bytes
+        self.info: Optional[ImageInfo] = None
+        self._buffer = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Inspect the next chunk of the body.
+
+        Cheap once the header has been accepted: later chunks are ignored.
+
+        Args:
+            chunk: Next bytes of the upload
+
+        Raises:
+            InvalidImageError: As soon as the bytes seen so far are enough
+                               to reject the upload
+        """
+        if self.info is not None:
+            return
+        self._buffer += chunk[:self.max_header_bytes - len(self._buffer)]
+        if len(self._buffer) >= SIGNATURE_BYTES:
+            self._check(final=False)
+
+    def finish(self) -> ImageInfo:
+        """
+        Conclude validation once the whole body has been fed.
+
+        Returns:
+            Format and dimensions of the upload
+
+        Raises:
+            InvalidImageError: If the upload ended before a valid header
+        """
+        if self.info is None:
+            self._check(final=True)
+        return self.info
+
+    def _check(self, final: bool) -> None:
+        data = bytes(self._buffer)
+        image_format = sniff_format(data)
+        if image_format is None:
+            if final and len(data) < SIGNATURE_BYTES:
+                raise InvalidImageError("truncated", "File ended before its header")
+            raise InvalidImageError("format", "File is not a JPEG, PNG or HEIC image")
+        if self.expected_format is not None and image_format != self.expected_format:
+            raise InvalidImageError(
+                "mismatch", f"File content is {image_format}, not {self.expected_format}"
+            )
+
+        size = read_dimensions(image_format, data)
+        if size is None:
+            if len(data) >= self.max_header_bytes:
+                raise InvalidImageError("header", f"No readable {image_format} header")
+            if final:
+                raise InvalidImageError("truncated", "File ended before its header")
+            return
+
+        width, height = size
+        if width <= 0 or height <= 0:
+            raise InvalidImageError("header", f"Invalid dimensions {width}x{height}")
+        if width * height > self.max_pixels:
+            raise InvalidImageError(
+                "dimensions", f"{width}x{height} exceeds {self.max_pixels} pixels"
+            )
+        self.info = ImageInfo(image_format, width, height)
+
+
+def validate_file(path: Path, filename: str) -> ImageInfo:
+    """
+    Validate a file already on disk (blocking; reads only the header bytes).
+
+    Args:
+        path: File to check
+        filename: Filename sent by the client
+
+    Returns:
+        Format and dimensions of the file
+
+    Raises:
+        InvalidImageError: If the file is not an acceptable image
+        OSError: If the file cannot be read
+    """
+    validator = UploadValidator(filename)
+    with open(path, "rb") as f:
+        validator.feed(f.read(validator.max_header_bytes))
+    return validator.finish()
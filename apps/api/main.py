@@ -3,18 +3,32 @@ FastAPI application for Image Share.
 
 Provides endpoints for photo upload, display, and health checking.
 """
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Optional
 
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Header
 
+from api.admission import UploadAdmissionMiddleware
+from api.assets import VersionedStaticFiles, versioned_page_response
+from api.events import router as events_router
+from api.images import CachedStaticFiles
+from api.metrics import router as metrics_router
 from api.photos import router as photos_router
+from api.resumable import router as resumable_router
 from api.upload import router as upload_router
-from core.config import DISPLAY_IMAGES_DIR, FAILED_IMAGES_DIR, RAW_IMAGES_DIR
+from core.config import DISPLAY_IMAGES_DIR, FAILED_IMAGES_DIR, FSYNC_POLICY, RAW_IMAGES_DIR
+from core.dedup import load_dedup_indexes
+from core.durability import FSYNC_POLICIES, fsync_batcher
+from core.executors import shutdown_executors
+from core.heif import heif_available, heif_display_suffix
+from core.journal import processing_journal
+from core.photo_index import photo_index
+from core.processor import run_processor
+from core.upload_sessions import upload_sessions
 
 # Configure logging
 logging.basicConfig(
@@ -30,17 +44,58 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for FastAPI application.
 
     Handles startup and shutdown tasks:
+    - Warns when pillow-heif is missing and HEIC photos cannot be displayed
     - Creates required image directories on startup
+    - Replays the processing journal, finishing or rolling back photos
+      interrupted by a crash
+    - Loads the in-memory photo index and upload de-duplication indexes
+    - Starts the photo processor background task
+    - Starts the batched fsync task when FSYNC_POLICY is "batch"
+    - Starts expiry of abandoned resumable upload sessions
+    - Stops background tasks, flushes pending fsyncs and shuts down
+      executors on shutdown
     """
+    if FSYNC_POLICY not in FSYNC_POLICIES:
+        raise ValueError(f"Unknown FSYNC_POLICY: {FSYNC_POLICY!r} (expected one of {FSYNC_POLICIES})")
+    heif_display_suffix()  # raises on an unknown HEIF_DISPLAY_FORMAT
+    if not heif_available():
+        logger.warning(
+            "pillow-heif is not installed: HEIC photos (the iPhone default) will be "
+            "moved to failed_images. Install the \"heif\" extra to display them."
+        )
+
     # Startup: Create image directories
     for directory in [RAW_IMAGES_DIR, DISPLAY_IMAGES_DIR, FAILED_IMAGES_DIR]:
         directory.mkdir(parents=True, exist_ok=True)
         logger.info(f"Ensured directory exists: {directory}")
 
+    # Startup: Before indexing, so partial outputs of interrupted photos are gone
+    await asyncio.to_thread(processing_journal.recover)
+
+    # Startup: Index existing display images once
+    await asyncio.to_thread(photo_index.load, DISPLAY_IMAGES_DIR)
+    await asyncio.to_thread(load_dedup_indexes)
+
+    # Startup: Start photo processor
+    background_tasks = [
+        asyncio.create_task(run_processor()),
+        asyncio.create_task(upload_sessions.run_expiry()),
+    ]
+    if FSYNC_POLICY == "batch":
+        background_tasks.append(asyncio.create_task(fsync_batcher.run()))
+
     yield
 
-    # Shutdown: cleanup tasks (if needed in future)
+    # Shutdown: Stop photo processor, session expiry and fsync batcher
     logger.info("Application shutting down")
+    for task in background_tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await fsync_batcher.flush()
+    shutdown_executors()
 
 
 # Create FastAPI application
@@ -51,28 +106,40 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Shed uploads before their body is read when the Pi is overloaded
+app.add_middleware(UploadAdmissionMiddleware)
+
 # Include routers
 app.include_router(upload_router)
+app.include_router(resumable_router)
 app.include_router(photos_router)
+app.include_router(metrics_router)
+app.include_router(events_router)
 
-# Mount static files for serving display images
-app.mount("/images", StaticFiles(directory=str(DISPLAY_IMAGES_DIR)), name="images")
+# Mount display images, with small files served from the in-memory cache
+app.mount("/images", CachedStaticFiles(directory=str(DISPLAY_IMAGES_DIR)), name="images")
 
 # Mount carousel-ui static files (JS, CSS)
 CAROUSEL_UI_DIR = Path(__file__).parent.parent / "carousel-ui"
-app.mount("/carousel-ui", StaticFiles(directory=str(CAROUSEL_UI_DIR)), name="carousel-ui")
+app.mount("/carousel-ui", VersionedStaticFiles(directory=str(CAROUSEL_UI_DIR)), name="carousel-ui")
 
 
 @app.get("/display", tags=["Carousel"])
-async def serve_carousel():
+async def serve_carousel(if_none_match: Optional[str] = Header(None)):
     """
     Serve the carousel display page.
 
+    Asset URLs in the page carry content-hash versions, so the browser
+    caches the UI bundle as immutable and only revalidates the page.
+
+    Args:
+        if_none_match: ETag of the page the browser already has
+
     Returns:
-        FileResponse: The carousel HTML page
+        HTMLResponse: The carousel HTML page (304 if unchanged)
     """
     carousel_html = CAROUSEL_UI_DIR / "index.html"
-    return FileResponse(carousel_html)
+    return await versioned_page_response(carousel_html, CAROUSEL_UI_DIR, if_none_match)
 
 
 @app.get("/health", tags=["Health"])
@@ -0,0 +1,189 @@
+"""
+Tests for upload admission control.
+
+Tests cover:
+- Per-client token bucket (429 with the wait until the next token)
+- Shedding on in-flight bytes, raw_images backlog and free disk (503)
+- Retry-After on every rejection
+- Budget released when a request ends, including on errors
+- Non-upload routes are never shed
+- Resumable session chunks count toward load but not the rate
+"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.admission import UploadAdmissionMiddleware
+from core.admission import AdmissionController, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def controller(tmp_path, clock):
+    return AdmissionController(
+        raw_dir=tmp_path,
+        max_inflight_bytes=1000,
+        max_backlog=3,
+        min_free_bytes=0,
+        rate=1.0,
+        burst=2,
+        clock=clock,
+    )
+
+
+@pytest.fixture
+def client(controller):
+    app = FastAPI()
+    app.add_middleware(UploadAdmissionMiddleware, controller=controller)
+
+    @app.post("/api/upload")
+    async def upload(request: Request):
+        body = await request.body()
+        if body == b"fail":
+            raise RuntimeError("handler failed")
+        return {"inflight": controller.inflight_bytes}
+
+    @app.patch("/api/upload/sessions/{session_id}")
+    async def append(session_id: str, request: Request):
+        await request.body()
+        return {"inflight": controller.inflight_bytes}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_token_bucket_refills_over_time():
+    """Test a bucket allows a burst, then one token per 1/rate seconds."""
+    bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+
+    assert bucket.take(0.0) == 0
+    assert bucket.take(0.0) == 0
+    assert bucket.take(0.0) == pytest.approx(0.5)
+    assert bucket.take(0.5) == 0
+
+
+def test_client_over_rate_gets_429(client, clock):
+    """Test a client past its burst is told when to come back."""
+    for _ in range(2):
+        assert client.post("/api/upload", content=b"x").status_code == 200
+
+    response = client.post("/api/upload", content=b"x")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == {"detail": {"error": "Too many uploads, please slow down"}}
+
+    clock.now += 1
+    assert client.post("/api/upload", content=b"x").status_code == 200
+
+
+def test_clients_have_separate_buckets(controller):
+    """Test one client running dry does not affect another."""
+    for _ in range(2):
+        assert controller.admit("10.0.0.1", 1)[1] is None
+
+    assert controller.admit("10.0.0.1", 1)[1].status_code == 429
+    assert controller.admit("10.0.0.2", 1)[1] is None
+
+
+def test_session_chunks_skip_rate_but_not_load(client, controller):
+    """Test resuming an upload is never rate limited, but is still shed on load."""
+    for _ in range(2):
+        assert client.post("/api/upload", content=b"x").status_code == 200
+
+    response = client.patch("/api/upload/sessions/abc", content=b"x" * 100)
+    assert response.status_code == 200
+    assert response.json() == {"inflight": 100}
+
+    controller.inflight_bytes, controller.inflight_requests = 900, 1
+    assert client.patch("/api/upload/sessions/abc", content=b"x" * 200).status_code == 503
+
+
+def test_inflight_bytes_shed_with_503(controller):
+    """Test uploads beyond the in-flight byte budget are shed."""
+    controller.burst = 100
+    first, _ = controller.admit("a", 600)
+
+    ticket, rejection = controller.admit("b", 600)
+    assert ticket is None
+    assert (rejection.status_code, rejection.reason) == (503, "inflight")
+    assert rejection.retry_after > 0
+
+    controller.release(first)
+    assert controller.admit("b", 600)[1] is None
+
+
+def test_single_oversized_request_is_not_starved(controller):
+    """Test one request larger than the budget is admitted when nothing is in flight."""
+    assert controller.admit("a", 5000)[1] is None
+
+
+def test_backlog_shed_with_503(client, controller, tmp_path, clock):
+    """Test uploads are shed while raw_images holds too many unprocessed photos."""
+    for i in range(3):
+        (tmp_path / f"{i}.jpg").write_bytes(b"x")
+    (tmp_path / "4.jpg.part").write_bytes(b"x")
+
+    response = client.post("/api/upload", content=b"x")
+    assert response.status_code == 503
+    assert "retry-after" in response.headers
+    assert controller.backlog == 3
+
+    (tmp_path / "0.jpg").unlink()
+    clock.now += controller.sample_interval
+    assert client.post("/api/upload", content=b"x").status_code == 200
+
+
+def test_low_disk_shed_with_503(controller):
+    """Test uploads are shed when they would leave too little free space."""
+    controller.sample()
+    controller.min_free_bytes = controller.free_bytes - 100
+
+    ticket, rejection = controller.admit("a", 200)
+    assert (rejection.status_code, rejection.reason) == (503, "disk")
+
+
+def test_backlog_sampled_once_per_interval(client, controller, tmp_path, clock):
+    """Test a burst of requests scans raw_images only once."""
+    controller.burst = 100
+    client.post("/api/upload", content=b"x")
+    (tmp_path / "new.jpg").write_bytes(b"x")
+    client.post("/api/upload", content=b"x")
+    assert controller.backlog == 0
+
+    clock.now += controller.sample_interval
+    client.post("/api/upload", content=b"x")
+    assert controller.backlog == 1
+
+
+def test_budget_released_after_response_and_error(client, controller):
+    """Test in-flight bytes are counted during the request and released after."""
+    response = client.post("/api/upload", content=b"12345")
+    assert response.json() == {"inflight": 5}
+    assert controller.inflight_bytes == 0
+
+    assert client.post("/api/upload", content=b"fail").status_code == 500
+    assert (controller.inflight_bytes, controller.inflight_requests) == (0, 0)
+
+
+def test_other_routes_are_never_shed(client, controller):
+    """Test /health stays available while uploads are being shed."""
+    controller.max_backlog = 0
+
+    assert client.post("/api/upload", content=b"x").status_code == 503
+    assert client.get("/health").status_code == 200
+    assert controller.stats()["rejected"] == {"backlog": 1}
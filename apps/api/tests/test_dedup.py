@@ -0,0 +1,165 @@
+"""
+Unit tests for upload de-duplication indexes and perceptual hashing.
+
+Tests cover:
+- Persistence and reload of the content-hash index
+- Torn records from an interrupted append
+- Claim/release semantics, and removal of persisted digests
+- dHash stability across re-encoding and resizing
+- Near-duplicate lookup by Hamming distance
+- Multi-index hashing agrees with a linear scan
+"""
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from core.dedup import HashIndex, PerceptualIndex, load_dedup_indexes, new_content_hasher
+from core.phash import MultiIndexHash, dhash, hamming_distance
+
+
+def _pattern_image(seed: int, size=(640, 480)) -> Image.Image:
+    """A deterministic image with enough structure to hash."""
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, color='white')
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+        x1, y1 = x0 + rng.randrange(40, 200), y0 + rng.randrange(40, 200)
+        draw.rectangle((x0, y0, x1, y1), fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image
+
+
+def test_hash_index_persists_and_reloads(tmp_path):
+    """Test appended digests are found after a reload."""
+    index = HashIndex(tmp_path / "hashes.bin")
+    index.load()
+    digests = []
+    for i in range(3):
+        hasher = new_content_hasher()
+        hasher.update(f"photo {i}".encode())
+        digests.append(hasher.digest())
+        assert index.claim(digests[-1]) is True
+        index.append(digests[-1])
+
+    reloaded = HashIndex(tmp_path / "hashes.bin")
+    reloaded.load()
+    assert len(reloaded) == 3
+    assert all(digest in reloaded for digest in digests)
+    assert (tmp_path / "hashes.bin").stat().st_size == 3 * 16
+
+
+def test_hash_index_ignores_torn_record(tmp_path):
+    """Test a partial trailing record (crash mid-append) is dropped."""
+    path = tmp_path / "hashes.bin"
+    path.write_bytes(b"a" * 16 + b"b" * 7)
+
+    index = HashIndex(path)
+    index.load()
+
+    assert len(index) == 1
+    assert b"a" * 16 in index
+
+
+def test_claim_and_release(tmp_path):
+    """Test a digest can only be claimed once until released."""
+    index = HashIndex(tmp_path / "hashes.bin")
+    digest = b"x" * 16
+
+    assert index.claim(digest) is True
+    assert index.claim(digest) is False
+    index.release(digest)
+    assert index.claim(digest) is True
+
+
+def test_hash_index_remove(tmp_path):
+    """Test a removed digest is gone from memory and from the file."""
+    index = HashIndex(tmp_path / "hashes.bin")
+    for digest in (b"a" * 16, b"b" * 16, b"c" * 16):
+        index.claim(digest)
+        index.append(digest)
+
+    index.remove(b"b" * 16)
+    index.remove(b"z" * 16)  # never indexed: no-op
+
+    assert b"b" * 16 not in index
+    assert index.claim(b"b" * 16) is True
+    assert (tmp_path / "hashes.bin").read_bytes() == b"a" * 16 + b"c" * 16
+
+
+def test_load_rejects_unknown_mode():
+    """Test a misconfigured DEDUP_MODE fails loudly."""
+    with pytest.raises(ValueError):
+        load_dedup_indexes("fuzzy")
+
+
+def test_dhash_survives_reencoding(tmp_path):
+    """Test a resized, recompressed copy hashes within a few bits."""
+    original = tmp_path / "original.jpg"
+    copy = tmp_path / "copy.jpg"
+    _pattern_image(1).save(original, format='JPEG', quality=95)
+    _pattern_image(1).resize((320, 240)).save(copy, format='JPEG', quality=60)
+
+    assert hamming_distance(dhash(original), dhash(copy)) <= 4
+
+
+def test_dhash_separates_different_photos(tmp_path):
+    """Test unrelated images are far apart."""
+    first = tmp_path / "first.png"
+    second = tmp_path / "second.png"
+    _pattern_image(1).save(first)
+    _pattern_image(2).save(second)
+
+    assert hamming_distance(dhash(first), dhash(second)) > 10
+
+
+def test_perceptual_index_find_near(tmp_path):
+    """Test lookup by Hamming distance, also after a reload."""
+    index = PerceptualIndex(tmp_path / "perceptual.bin")
+    value = 0b1011 << 40
+    index.claim(index.encode(value))
+    index.append(index.encode(value))
+
+    assert index.find_near(value ^ 0b111, max_distance=4) == value
+    assert index.find_near(value ^ 0b11111, max_distance=4) is None
+
+    reloaded = PerceptualIndex(tmp_path / "perceptual.bin")
+    reloaded.load()
+    assert reloaded.find_near(value ^ 0b1, max_distance=1) == value
+
+
+@pytest.mark.parametrize("max_distance", [0, 3, 8, 12])
+def test_multi_index_hash_matches_linear_scan(max_distance):
+    """Test radius search returns exactly what a full scan would."""
+    rng = random.Random(max_distance)
+    index = MultiIndexHash()
+    values = {}
+    for i in range(2000):
+        if i % 4 == 0 and values:
+            # Plant near neighbours so small radii have hits
+            base = rng.choice(list(values.values()))
+            value = base ^ sum(1 << rng.randrange(64) for _ in range(rng.randrange(6)))
+        else:
+            value = rng.getrandbits(64)
+        values[f"k{i}"] = value
+        index.add(f"k{i}", value)
+
+    for _ in range(20):
+        query = rng.choice(list(values.values())) ^ (1 << rng.randrange(64))
+        expected = sorted(
+            (hamming_distance(query, value), key)
+            for key, value in values.items()
+            if hamming_distance(query, value) <= max_distance
+        )
+        assert index.search(query, max_distance) == expected
+
+
+def test_multi_index_hash_remove():
+    """Test removed keys are no longer found."""
+    index = MultiIndexHash()
+    index.add("a", 42)
+    index.add("b", 43)
+    index.remove("a")
+
+    assert index.search(42, 2) == [(1, "b")]
+    assert len(index) == 1
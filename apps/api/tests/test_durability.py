@@ -0,0 +1,95 @@
+"""
+Unit tests for the upload fsync policy.
+
+Tests cover:
+- Syncing files and their directories
+- Files taken by the processor before a batch flush
+- Batched fsync bookkeeping
+- Policy dispatch in commit_upload
+- Atomic writes of processor outputs
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from core.durability import FsyncBatcher, commit_upload, fsync_batcher, sync_paths, write_atomically
+
+
+def test_sync_paths_skips_missing_files(tmp_path):
+    """Test files already moved away are skipped, not an error."""
+    present = tmp_path / "a.jpg"
+    present.write_bytes(b"data")
+
+    assert sync_paths([present, tmp_path / "gone.jpg"]) == 1
+
+
+def test_sync_paths_syncs_each_directory_once(tmp_path, monkeypatch):
+    """Test one directory fsync covers every file in it."""
+    fsync = MagicMock()
+    monkeypatch.setattr("os.fsync", fsync)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(b"data")
+        paths.append(path)
+
+    assert sync_paths(paths) == 3
+    assert fsync.call_count == 4
+
+
+@pytest.mark.asyncio
+async def test_batcher_flushes_pending_paths(tmp_path):
+    """Test a flush syncs everything added since the last one."""
+    batcher = FsyncBatcher(interval=60)
+    for i in range(5):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(b"data")
+        batcher.add(path)
+
+    assert batcher.pending == 5
+    assert await batcher.flush() == 5
+    assert batcher.pending == 0
+    assert await batcher.flush() == 0
+    assert batcher.stats()["flushes"] == 1
+    assert batcher.stats()["filesSynced"] == 5
+
+
+@pytest.mark.asyncio
+async def test_commit_upload_policies(tmp_path, monkeypatch):
+    """Test each policy's effect on a finished upload."""
+    fsync = MagicMock()
+    monkeypatch.setattr("os.fsync", fsync)
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(b"data")
+
+    await commit_upload(path, "none")
+    assert fsync.call_count == 0
+
+    await commit_upload(path, "file")
+    assert fsync.call_count == 1  # directory entry
+
+    pending = fsync_batcher.pending
+    await commit_upload(path, "batch")
+    assert fsync_batcher.pending == pending + 1
+    await fsync_batcher.flush()
+
+    with pytest.raises(ValueError):
+        await commit_upload(path, "sometimes")
+
+
+def test_write_atomically_leaves_nothing_on_failure(tmp_path):
+    """Test a failed write leaves neither the output nor its temporary file."""
+    output = tmp_path / "photo.jpg"
+
+    def fail_midway(temp_path):
+        assert temp_path.parent == tmp_path and temp_path.suffix == ".tmp"
+        temp_path.write_bytes(b"partial")
+        raise OSError("No space left on device")
+
+    with pytest.raises(OSError):
+        write_atomically(output, fail_midway)
+
+    assert list(tmp_path.iterdir()) == []
+    write_atomically(output, lambda temp_path: temp_path.write_bytes(b"complete"))
+    assert [path.name for path in tmp_path.iterdir()] == ["photo.jpg"]
+    assert output.read_bytes() == b"complete"
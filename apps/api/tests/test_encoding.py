@@ -0,0 +1,137 @@
+"""
+Tests for the display encoding policy.
+
+Tests cover:
+- Photos are encoded lossy WebP, screenshots/graphics lossless WebP
+- Forced formats and rejection of unknown ones
+- The byte budget search picks the highest quality that fits
+- Renditions record their encoding and the upload size; the display
+  rendition is held to the budget, and savings are counted per photo
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from PIL import Image, ImageDraw
+
+from core.encoding import EncodePolicy, Encoding, EncodingStats, is_graphic
+from core.processor import PhotoProcessor
+
+
+def photo(size=(640, 480)) -> Image.Image:
+    """Noisy RGB image that compresses like a photo."""
+    return Image.merge("RGB", [Image.effect_noise(size, sigma) for sigma in (20, 30, 40)])
+
+
+def screenshot(size=(640, 480)) -> Image.Image:
+    """Flat-colour image with a few shapes, like a UI screenshot."""
+    image = Image.new("RGB", size, (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, size[0], 60), fill=(30, 90, 200))
+    for y in range(100, size[1], 40):
+        draw.rectangle((20, y, size[0] - 20, y + 20), fill=(200, 200, 200))
+    return image
+
+
+def test_photo_is_lossy_and_screenshot_lossless():
+    """Test the AUTO policy keeps lossless encoding for graphics only."""
+    policy = EncodePolicy("AUTO", quality=85)
+
+    assert policy.choose(photo(), "JPEG") == Encoding("WEBP", 85)
+    assert policy.choose(photo(), "PNG") == Encoding("WEBP", 85)
+    assert policy.choose(screenshot(), "PNG") == Encoding("WEBP", 85, lossless=True)
+    assert not is_graphic(screenshot(), "JPEG")
+
+
+@pytest.mark.parametrize("display_format, suffix", [("JPEG", ".jpg"), ("AVIF", ".avif")])
+def test_forced_format(display_format, suffix):
+    """Test a forced format is used for photos and graphics alike."""
+    policy = EncodePolicy(display_format, quality=85, avif_quality=60)
+
+    encoding = policy.choose(screenshot(), "PNG")
+    data = policy.encode(screenshot(), encoding)
+
+    assert encoding.format == display_format and not encoding.lossless
+    assert encoding.suffix == suffix
+    assert encoding.quality == (60 if display_format == "AVIF" else 85)
+    assert data[:16].find(b"ftypavif" if display_format == "AVIF" else b"\xff\xd8") >= 0
+
+
+def test_unknown_format_rejected():
+    """Test a typo in DISPLAY_FORMAT fails instead of falling back silently."""
+    with pytest.raises(ValueError, match="DISPLAY_FORMAT"):
+        EncodePolicy("GIF")
+
+
+def test_budget_search_picks_highest_fitting_quality():
+    """Test an over-budget image gets the highest quality under the budget."""
+    image = photo()
+    unbounded = EncodePolicy("WEBP", quality=90, byte_budget=0)
+    full = unbounded.encode(image, Encoding("WEBP", 90))
+    budget = len(full) // 2
+    policy = EncodePolicy("WEBP", quality=90, byte_budget=budget, min_quality=10)
+
+    data, encoding = policy.encode_within_budget(image, Encoding("WEBP", 90))
+
+    assert len(data) <= budget
+    assert 10 <= encoding.quality < 90
+    one_higher = unbounded.encode(image, Encoding("WEBP", encoding.quality + 1))
+    assert len(one_higher) > budget
+
+
+def test_budget_floor_is_min_quality():
+    """Test an image that cannot fit still stops at the minimum quality."""
+    policy = EncodePolicy("WEBP", quality=85, byte_budget=100, min_quality=40)
+
+    data, encoding = policy.encode_within_budget(photo(), Encoding("WEBP", 85))
+
+    assert encoding.quality == 40
+    assert len(data) > 100
+
+
+def test_large_screenshot_display_rendition_fits_budget(tmp_path):
+    """Test a multi-megabyte PNG is served as a small display rendition."""
+    source = tmp_path / "screenshot.png"
+    image = screenshot((1170, 2532))
+    image.paste(photo((1000, 1600)), (85, 400))  # a photo inside the screenshot
+    image.save(source, format="PNG", compress_level=0)
+    budget = 200 * 1024
+    rendition_dir = tmp_path / "r"
+
+    with patch("core.processor.encode_policy", EncodePolicy("AUTO", byte_budget=budget)):
+        manifest = PhotoProcessor.generate_renditions(source, rendition_dir)
+
+    screen = manifest["renditions"]["screen"]
+    assert screen["file"] == "screen.webp"
+    assert screen["bytes"] == (rendition_dir / "screen.webp").stat().st_size <= budget
+    assert manifest["sourceBytes"] == source.stat().st_size > 5 * budget
+    assert json.loads((rendition_dir / "manifest.json").read_text()) == manifest
+
+
+@pytest.mark.asyncio
+async def test_processing_counts_savings(tmp_path):
+    """Test each processed photo adds its upload and display bytes to the stats."""
+    raw_dir, display_dir = tmp_path / "raw", tmp_path / "display"
+    raw_dir.mkdir()
+    display_dir.mkdir()
+    source = raw_dir / "photo.jpg"
+    photo((2400, 1600)).save(source, format="JPEG", quality=95)
+    source_bytes = source.stat().st_size
+    stats = EncodingStats()
+
+    with patch("core.processor.RAW_IMAGES_DIR", raw_dir), \
+            patch("core.processor.DISPLAY_IMAGES_DIR", display_dir), \
+            patch("core.processor.encoding_stats", stats):
+        assert await PhotoProcessor.process_single_image(source) is True
+
+    (manifest_path,) = display_dir.glob("renditions/*/manifest.json")
+    screen = json.loads(manifest_path.read_text())["renditions"]["screen"]
+    assert stats.stats() == {
+        "photos": 1,
+        "sourceBytes": source_bytes,
+        "displayBytes": screen["bytes"],
+        "savedRatio": round(1 - screen["bytes"] / source_bytes, 4),
+    }
+    # The full-size original is kept for export
+    (original,) = display_dir.glob("*.jpg")
+    assert original.stat().st_size == source_bytes
@@ -0,0 +1,141 @@
+"""
+Unit tests for photo event streaming.
+
+Tests cover:
+- SSE frame encoding
+- Fan-out to every subscriber
+- Slow-client policy (backlog dropped, single resync event)
+- Photo index changes published as photo_added/photo_removed
+- Event stream generator (retry hint, heartbeat, unsubscribe)
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from api.events import HEARTBEAT_FRAME, sse_frames
+from core.events import EventBroadcaster, broadcaster, format_sse
+from core.photo_index import photo_index
+
+
+def parse_frame(frame: bytes) -> tuple[str, dict]:
+    """Return (event type, decoded data) of an SSE frame."""
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return fields["event"], json.loads(fields["data"])
+
+
+def test_format_sse():
+    """Test the wire format of an event."""
+    frame = format_sse("photo_added", {"id": "abc"}, event_id="e.1")
+    assert frame == b'event: photo_added\nid: e.1\ndata: {"id":"abc"}\n\n'
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_to_all_subscribers():
+    """Test every subscriber receives the same event."""
+    events = EventBroadcaster(buffer_size=10)
+    subscriptions = [events.subscribe() for _ in range(5)]
+
+    events.publish("photo_added", {"id": "abc"})
+
+    for subscription in subscriptions:
+        assert parse_frame(await subscription.get()) == ("photo_added", {"id": "abc"})
+    assert events.stats()["published"] == 1
+
+
+@pytest.mark.asyncio
+async def test_publish_without_subscribers_is_noop():
+    """Test publishing with nobody listening does nothing."""
+    events = EventBroadcaster(buffer_size=10)
+    events.publish("photo_added", {"id": "abc"})
+    assert events.stats()["published"] == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_gets_resync():
+    """Test a full buffer is replaced by a single resync event."""
+    events = EventBroadcaster(buffer_size=3)
+    slow = events.subscribe()
+    fast = events.subscribe()
+
+    for i in range(3):
+        events.publish("photo_added", {"id": str(i)})
+        await fast.get()
+
+    # Slow subscriber's buffer is full; the next event overflows it
+    events.publish("photo_added", {"id": "overflow"})
+
+    assert slow.queue.qsize() == 1
+    assert parse_frame(await slow.get())[0] == "resync"
+    assert slow.resyncs == 1
+    assert events.stats()["resyncs"] == 1
+
+    # Other subscribers are unaffected
+    assert parse_frame(await fast.get()) == ("photo_added", {"id": "overflow"})
+
+
+@pytest.mark.asyncio
+async def test_publish_from_worker_thread():
+    """Test events published off the event loop still reach subscribers."""
+    events = EventBroadcaster(buffer_size=10)
+    subscription = events.subscribe()
+
+    thread = threading.Thread(target=events.publish, args=("photo_added", {"id": "t"}))
+    thread.start()
+    thread.join()
+
+    frame = await asyncio.wait_for(subscription.get(), timeout=1)
+    assert parse_frame(frame) == ("photo_added", {"id": "t"})
+
+
+@pytest.mark.asyncio
+async def test_index_changes_are_published(tmp_path):
+    """Test adding and removing indexed photos emits events with cursors."""
+    photo_index.load(tmp_path)
+    subscription = broadcaster.subscribe()
+    try:
+        photo_path = tmp_path / "0123abcd.jpg"
+        photo_path.write_bytes(b"fake")
+        photo_index.add(photo_path)
+
+        event, data = parse_frame(await subscription.get())
+        assert event == "photo_added"
+        assert data["photo"]["id"] == "0123abcd"
+        assert data["photo"]["url"] == "/images/0123abcd.jpg"
+        assert data["cursor"] == f"{photo_index.epoch}.1"
+
+        photo_index.remove(photo_path.name)
+
+        event, data = parse_frame(await subscription.get())
+        assert event == "photo_removed"
+        assert data == {"id": "0123abcd", "cursor": f"{photo_index.epoch}.2"}
+
+        # Rebuilding the index tells clients to resync
+        photo_index.load(tmp_path)
+        assert parse_frame(await subscription.get())[0] == "resync"
+    finally:
+        broadcaster.unsubscribe(subscription)
+
+
+@pytest.mark.asyncio
+async def test_sse_frames_stream():
+    """Test the stream sends a retry hint, events and heartbeats."""
+    events = EventBroadcaster(buffer_size=10)
+    stream = sse_frames(events, heartbeat=0.01)
+
+    assert (await anext(stream)).startswith(b"retry: ")
+    assert events.subscriber_count == 1
+
+    # Idle stream sends keep-alive comments
+    assert await anext(stream) == HEARTBEAT_FRAME
+
+    events.publish("photo_removed", {"id": "x"})
+    frame = await anext(stream)
+    while frame == HEARTBEAT_FRAME:
+        frame = await anext(stream)
+    assert parse_frame(frame) == ("photo_removed", {"id": "x"})
+
+    # Closing the stream (client disconnect) unsubscribes
+    await stream.aclose()
+    assert events.subscriber_count == 0
@@ -0,0 +1,56 @@
+"""
+Unit tests for the executor backends.
+
+Tests cover:
+- Thread and process modes running the CPU stage
+- Metadata returned across the process boundary
+- Invalid mode handling
+"""
+import pytest
+from PIL import Image
+
+from core import executors
+from core.processor import PhotoProcessor
+
+
+@pytest.fixture(autouse=True)
+def reset_executor():
+    """Shut down any executor created by a test."""
+    yield
+    executors.shutdown_executors()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("mode", ["thread", "process"])
+async def test_render_display_image_in_executor(tmp_path, mode):
+    """Test the CPU stage runs in both modes and returns metadata only."""
+    source = tmp_path / "source.jpg"
+    output = tmp_path / "output.jpg"
+    Image.new('RGB', (120, 80), color='red').save(source, format='JPEG')
+
+    executors.configure_cpu_executor(mode, workers=1)
+    result = await executors.run_cpu(PhotoProcessor.render_display_image, source, output)
+
+    assert executors.cpu_executor_mode() == mode
+    assert (result["format"], result["width"], result["height"]) == ("JPEG", 120, 80)
+    assert isinstance(result["was_corrected"], bool)
+    assert output.exists()
+
+
+@pytest.mark.asyncio
+async def test_process_mode_propagates_decode_errors(tmp_path):
+    """Test decode errors raised in a worker process reach the caller."""
+    from PIL import UnidentifiedImageError
+
+    bad_file = tmp_path / "bad.jpg"
+    bad_file.write_bytes(b"Not an image")
+
+    executors.configure_cpu_executor("process", workers=1)
+    with pytest.raises(UnidentifiedImageError):
+        await executors.run_cpu(PhotoProcessor.render_display_image, bad_file, tmp_path / "out.jpg")
+
+
+def test_unknown_mode_rejected():
+    """Test configuring an unknown executor mode fails clearly."""
+    with pytest.raises(ValueError):
+        executors.configure_cpu_executor("gpu", workers=1)
@@ -0,0 +1,174 @@
+"""
+Tests for HEIC/HEIF processing.
+
+Tests cover:
+- pillow-heif is not imported at startup, and its absence is logged
+- Without pillow-heif, HEIC photos fail without a decode attempt
+- A decode running past HEIF_DECODE_TIMEOUT_SECONDS fails the photo and
+  its late output is discarded, also in perceptual dedup mode (the dHash
+  comes from the bounded decode)
+- With pillow-heif installed: one decode produces a JPEG or WebP display
+  image and the renditions
+"""
+import asyncio
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import core.heif as heif
+from core.dedup import PerceptualIndex
+from core.processor import PhotoProcessor
+from main import app
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    """raw/display/failed directories patched into the processor."""
+    paths = {name: tmp_path / name for name in ("raw", "display", "failed")}
+    for path in paths.values():
+        path.mkdir()
+    with patch('core.processor.RAW_IMAGES_DIR', paths["raw"]), \
+            patch('core.processor.DISPLAY_IMAGES_DIR', paths["display"]), \
+            patch('core.processor.FAILED_IMAGES_DIR', paths["failed"]):
+        yield paths
+
+
+def test_pillow_heif_not_imported_at_startup():
+    """Test importing the app does not load the HEIC decoder."""
+    code = "import sys, main; print('pillow_heif' in sys.modules)"
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=API_DIR, capture_output=True, text=True, check=True
+    ).stdout
+
+    assert output.strip() == "False"
+
+
+def test_startup_warns_without_pillow_heif(monkeypatch, caplog):
+    """Test a missing pillow-heif is reported when the app starts."""
+    monkeypatch.setattr("main.heif_available", lambda: False)
+    with caplog.at_level("WARNING"), TestClient(app):
+        pass
+
+    assert "pillow-heif is not installed" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_heic_without_decoder_fails_without_decoding(dirs, monkeypatch):
+    """Test a missing pillow-heif sends HEICs to failed_images without opening them."""
+    monkeypatch.setattr(heif, "_opener_registered", False)
+    heic_path = dirs["raw"] / "iphone.heic"
+    heic_path.write_bytes(b"\0\0\0\x18ftypheic" + b"\0" * 100)
+
+    with patch('PIL.Image.open') as image_open:
+        result = await PhotoProcessor.process_single_image(heic_path)
+
+    assert result is False
+    image_open.assert_not_called()
+    assert (dirs["failed"] / "iphone.heic").exists()
+    assert not any(path.is_file() for path in dirs["display"].rglob("*"))
+
+
+@pytest.mark.asyncio
+async def test_slow_heic_decode_times_out(dirs, monkeypatch):
+    """Test a decode past the time limit fails the photo and its late output is removed."""
+    def slow_transcode(image_path, output_path, rendition_dir):
+        time.sleep(0.3)
+        output_path.write_bytes(b"late")
+        rendition_dir.mkdir(parents=True)
+        return {"renditions": {}, "dhash": "0" * 16}, {}
+
+    monkeypatch.setattr(PhotoProcessor, "transcode_heif", staticmethod(slow_transcode))
+    monkeypatch.setattr("core.processor.HEIF_DECODE_TIMEOUT_SECONDS", 0.05)
+    heic_path = dirs["raw"] / "slow.heic"
+    heic_path.write_bytes(b"\0\0\0\x18ftypheic" + b"\0" * 100)
+
+    result = await PhotoProcessor.process_single_image(heic_path)
+    assert result is False
+    assert (dirs["failed"] / "slow.heic").exists()
+
+    await asyncio.sleep(0.5)
+    assert list(dirs["display"].glob("*.jpg")) == []
+    assert list(dirs["display"].glob("renditions/*")) == []
+
+
+@pytest.fixture
+def perceptual(tmp_path, monkeypatch):
+    """Perceptual dedup mode, with HEICs never hashed outside the bounded decode."""
+    index = PerceptualIndex(tmp_path / "perceptual_hashes.bin")
+    monkeypatch.setattr("core.processor.DEDUP_MODE", "perceptual")
+    monkeypatch.setattr("core.processor.perceptual_index", index)
+    monkeypatch.setattr("core.processor.dhash", lambda path: pytest.fail("unbounded HEIC decode"))
+    return index
+
+
+@pytest.mark.asyncio
+async def test_slow_heic_times_out_in_perceptual_mode(dirs, monkeypatch, perceptual):
+    """Test perceptual dedup adds no decode outside HEIF_DECODE_TIMEOUT_SECONDS."""
+    def hung_transcode(image_path, output_path, rendition_dir):
+        time.sleep(0.3)
+        return {"renditions": {}, "dhash": "0" * 16}, {}
+
+    monkeypatch.setattr(PhotoProcessor, "transcode_heif", staticmethod(hung_transcode))
+    monkeypatch.setattr("core.processor.HEIF_DECODE_TIMEOUT_SECONDS", 0.05)
+    heic_path = dirs["raw"] / "hung.heic"
+    heic_path.write_bytes(b"\0\0\0\x18ftypheic" + b"\0" * 100)
+
+    start = time.perf_counter()
+    assert await PhotoProcessor.process_single_image(heic_path) is False
+
+    assert time.perf_counter() - start < 0.25
+    assert (dirs["failed"] / "hung.heic").exists()
+    assert len(perceptual) == 0
+    await asyncio.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_heic_uses_transcode_hash(dirs, monkeypatch, perceptual):
+    """Test a HEIC is checked against earlier photos with its transcode's dHash."""
+    def transcode(image_path, output_path, rendition_dir):
+        output_path.write_bytes(b"display")
+        rendition_dir.mkdir(parents=True)
+        return {"renditions": {}, "dhash": "00000000000000ff", "sourceBytes": 100}, {
+            "was_corrected": False, "method": "transcode",
+        }
+
+    monkeypatch.setattr(PhotoProcessor, "transcode_heif", staticmethod(transcode))
+    perceptual.claim(perceptual.encode(0xfe))  # an earlier photo, one bit away
+    heic_path = dirs["raw"] / "burst.heic"
+    heic_path.write_bytes(b"\0\0\0\x18ftypheic" + b"\0" * 100)
+
+    assert await PhotoProcessor.process_single_image(heic_path) is True
+
+    assert not heic_path.exists()
+    assert not any(path.is_file() for path in dirs["display"].rglob("*"))
+    assert len(perceptual) == 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("display_format, suffix", [("JPEG", ".jpg"), ("WEBP", ".webp")])
+async def test_heic_transcoded_for_display(dirs, monkeypatch, display_format, suffix):
+    """Test a HEIC becomes a browser-friendly display image plus renditions."""
+    pillow_heif = pytest.importorskip("pillow_heif")
+    monkeypatch.setattr("core.processor.HEIF_DISPLAY_FORMAT", display_format)
+    heic_path = dirs["raw"] / "iphone.heic"
+    pillow_heif.from_pillow(Image.new("RGB", (800, 600), (30, 140, 200))).save(heic_path, quality=80)
+
+    result = await PhotoProcessor.process_single_image(heic_path)
+
+    assert result is True
+    display_files = list(dirs["display"].glob(f"*{suffix}"))
+    assert len(display_files) == 1
+    with Image.open(display_files[0]) as display:
+        assert display.format == display_format
+        assert display.size == (800, 600)
+    renditions = dirs["display"] / "renditions" / display_files[0].stem
+    assert (renditions / "screen.webp").exists()
+    assert (renditions / "manifest.json").exists()
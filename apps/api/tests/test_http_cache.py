@@ -0,0 +1,42 @@
+"""
+Unit tests for HTTP conditional request helpers.
+
+Endpoint-level caching headers are tested in test_images_cache_headers.py.
+"""
+import pytest
+
+from core.http_cache import etag_matches, is_uuid_asset, make_etag
+
+
+def test_make_etag_is_quoted_and_content_based():
+    """Test ETags are quoted and depend only on content."""
+    etag = make_etag(b"[1, 2]")
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert make_etag(b"[1, 2]") == etag
+    assert make_etag(b"[1, 3]") != etag
+
+
+def test_etag_matches_list_weak_and_wildcard():
+    """Test If-None-Match parsing follows weak comparison rules."""
+    etag = '"abc"'
+
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"zzz", "abc"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"zzz"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('', etag)
+
+
+@pytest.mark.parametrize("path,expected", [
+    ("0b1f3d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f.jpg", True),
+    ("renditions/0b1f3d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f/screen.jpg", True),
+    ("photo1.jpg", False),
+    ("renditions/photo1/screen.jpg", False),
+    ("0b1f3d4e-5a6b-4c7d-8e9f-0a1b2c3d4e5f.jpg/extra", False),
+])
+def test_is_uuid_asset(path, expected):
+    """Test which /images paths count as immutable processor output."""
+    assert is_uuid_asset(path) is expected
@@ -0,0 +1,251 @@
+"""
+Tests for display image serving and the in-memory image cache.
+
+Tests cover:
+- Repeated requests served from memory
+- ETag/Last-Modified identical to an uncached response, and 304s
+- Rewritten files are never served stale
+- LRU eviction within the memory budget
+- Large files, HEAD and Range requests bypass the cache
+- Resumable downloads: Range, If-Range, multipart ranges and 416
+- Zero-copy sendfile when the server supports it
+- Invalidation when the photo index drops a photo
+"""
+import asyncio
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.staticfiles import StaticFiles
+
+from api.images import ZEROCOPY_EXTENSION, CachedStaticFiles, invalidate_photo
+from core.image_cache import ImageCache
+from core.photo_index import PhotoRecord
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    directory = tmp_path / "display_images"
+    (directory / "renditions" / "abc").mkdir(parents=True)
+    (directory / "abc.jpg").write_bytes(b"J" * 1000)
+    (directory / "renditions" / "abc" / "screen.jpg").write_bytes(b"S" * 500)
+    (directory / "big.jpg").write_bytes(b"B" * 5000)
+    return directory
+
+
+@pytest.fixture
+def cache():
+    return ImageCache(max_bytes=2000, max_file_bytes=1500)
+
+
+@pytest.fixture
+def client(image_dir, cache):
+    app = FastAPI()
+    app.mount("/images", CachedStaticFiles(directory=str(image_dir), cache=cache))
+    app.mount("/plain", StaticFiles(directory=str(image_dir)))
+    return TestClient(app)
+
+
+def test_repeat_requests_served_from_memory(client, cache, image_dir):
+    """Test only the first request reads the file."""
+    with patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as read:
+        for _ in range(5):
+            response = client.get("/images/abc.jpg")
+            assert response.status_code == 200
+            assert response.content == b"J" * 1000
+
+    image_reads = [c for c in read.call_args_list if c.args[0].is_relative_to(image_dir)]
+    assert len(image_reads) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (4, 1)
+    assert stats["hitRatio"] == 0.8
+    assert stats["bytesSaved"] == 4000
+
+
+def test_headers_match_uncached_response(client):
+    """Test cached responses carry the same validators as StaticFiles."""
+    plain = client.get("/plain/abc.jpg")
+    client.get("/images/abc.jpg")
+    cached = client.get("/images/abc.jpg")
+
+    for header in ("etag", "last-modified", "content-type", "content-length"):
+        assert cached.headers[header] == plain.headers[header]
+
+
+def test_conditional_request_returns_304(client):
+    """Test If-None-Match with the current ETag is answered with 304."""
+    etag = client.get("/images/renditions/abc/screen.jpg").headers["etag"]
+
+    response = client.get("/images/renditions/abc/screen.jpg", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_rewritten_file_is_reloaded(client, image_dir):
+    """Test a changed file is not served stale from memory."""
+    client.get("/images/abc.jpg")
+    (image_dir / "abc.jpg").write_bytes(b"N" * 800)
+    os.utime(image_dir / "abc.jpg", ns=(10**18, 10**18))
+
+    assert client.get("/images/abc.jpg").content == b"N" * 800
+
+
+def test_lru_eviction_respects_budget(client, cache, image_dir):
+    """Test the least recently used file is evicted to stay within budget."""
+    (image_dir / "other.jpg").write_bytes(b"O" * 900)
+    client.get("/images/abc.jpg")                      # 1000 bytes
+    client.get("/images/renditions/abc/screen.jpg")    # 500 bytes
+    client.get("/images/abc.jpg")                      # abc is now most recent
+    client.get("/images/other.jpg")                    # 900 bytes: evicts screen.jpg
+
+    assert cache.size <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+    misses = cache.misses
+    client.get("/images/abc.jpg")
+    assert cache.misses == misses
+
+
+def test_large_head_and_range_requests_bypass_cache(client, cache):
+    """Test originals over the size limit, HEAD and Range use FileResponse."""
+    assert client.get("/images/big.jpg").content == b"B" * 5000
+    assert client.head("/images/abc.jpg").status_code == 200
+    ranged = client.get("/images/abc.jpg", headers={"Range": "bytes=0-9"})
+
+    assert ranged.status_code == 206
+    assert ranged.content == b"J" * 10
+    assert len(cache) == 0
+
+
+ORIGINAL = bytes(range(256)) * 40
+
+
+def test_interrupted_download_resumes_from_offset(client, image_dir):
+    """Test a client can fetch the rest of a file after a dropped connection."""
+    (image_dir / "original.jpg").write_bytes(ORIGINAL)
+    etag = client.head("/images/original.jpg").headers["etag"]
+
+    response = client.get(
+        "/images/original.jpg", headers={"Range": "bytes=4000-", "If-Range": etag}
+    )
+
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 4000-{len(ORIGINAL) - 1}/{len(ORIGINAL)}"
+    assert response.content == ORIGINAL[4000:]
+
+
+def test_stale_if_range_returns_whole_file(client, image_dir):
+    """Test a resume against a changed file restarts with the full body."""
+    (image_dir / "original.jpg").write_bytes(ORIGINAL)
+
+    response = client.get(
+        "/images/original.jpg", headers={"Range": "bytes=4000-", "If-Range": '"stale"'}
+    )
+
+    assert response.status_code == 200
+    assert response.content == ORIGINAL
+
+
+def test_multiple_and_unsatisfiable_ranges(client, image_dir):
+    """Test multipart ranges and out-of-bounds ranges."""
+    (image_dir / "original.jpg").write_bytes(ORIGINAL)
+
+    multi = client.get("/images/original.jpg", headers={"Range": "bytes=0-9,100-109"})
+    assert multi.status_code == 206
+    assert multi.headers["content-type"].startswith("multipart/byteranges; boundary=")
+    assert "content-range" not in multi.headers
+    assert ORIGINAL[100:110] in multi.content
+
+    unsatisfiable = client.get("/images/original.jpg", headers={"Range": "bytes=20000-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == f"*/{len(ORIGINAL)}"
+
+
+def asgi_get(app, path, headers=(), extensions=None):
+    """Call an ASGI app directly and return the messages it sends."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "extensions": extensions or {},
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == ZEROCOPY_EXTENSION:
+            file = message["file"]
+            file.seek(message["offset"])
+            message = {**message, "data": file.read(message["count"])}
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def test_zerocopy_sendfile_when_server_supports_it(image_dir, cache):
+    """Test the file descriptor is handed to the server instead of read in Python."""
+    (image_dir / "original.jpg").write_bytes(ORIGINAL)
+    app = CachedStaticFiles(directory=str(image_dir), cache=cache)
+    extensions = {ZEROCOPY_EXTENSION: {}}
+
+    start, body = asgi_get(app, "/original.jpg", extensions=extensions)
+    assert start["status"] == 200
+    assert body["type"] == ZEROCOPY_EXTENSION
+    assert (body["offset"], body["count"]) == (0, len(ORIGINAL))
+    assert body["data"] == ORIGINAL
+    assert body["file"].closed
+
+    start, body = asgi_get(
+        app, "/original.jpg", headers=[("Range", "bytes=100-199")], extensions=extensions
+    )
+    assert start["status"] == 206
+    assert (b"content-range", b"bytes 100-199/10240") in start["headers"]
+    assert (body["offset"], body["count"]) == (100, 100)
+    assert body["data"] == ORIGINAL[100:200]
+
+
+def test_chunked_fallback_without_zerocopy(image_dir, cache):
+    """Test servers without the extension get http.response.body chunks."""
+    (image_dir / "original.jpg").write_bytes(ORIGINAL)
+    app = CachedStaticFiles(directory=str(image_dir), cache=cache)
+
+    start, *bodies = asgi_get(app, "/original.jpg")
+
+    assert start["status"] == 200
+    assert all(message["type"] == "http.response.body" for message in bodies)
+    assert b"".join(message["body"] for message in bodies) == ORIGINAL
+
+
+def test_missing_file_and_traversal_are_404(client):
+    """Test StaticFiles path handling is preserved."""
+    assert client.get("/images/missing.jpg").status_code == 404
+    assert client.get("/images/../test_images.py").status_code == 404
+
+
+def test_removed_photo_is_invalidated(client, image_dir):
+    """Test an index removal evicts the photo and its renditions."""
+    from core.image_cache import image_cache
+
+    image_cache.clear()
+    app = FastAPI()
+    app.mount("/images", CachedStaticFiles(directory=str(image_dir)))
+    shared = TestClient(app)
+    shared.get("/images/abc.jpg")
+    shared.get("/images/renditions/abc/screen.jpg")
+    shared.get("/images/big.jpg")
+    assert len(image_cache) == 3
+
+    invalidate_photo("removed", PhotoRecord(filename="abc.jpg", mtime=0))
+
+    assert len(image_cache) == 1
+    assert image_cache.size == 5000
+    image_cache.clear()
@@ -0,0 +1,157 @@
+"""
+Endpoint tests for the caching headers of /images, /carousel-ui and /display.
+
+Tests cover:
+- Immutable Cache-Control for UUID-named photos and renditions
+- Revalidation for everything else
+- Content-hash versioned UI asset URLs
+- Bytes transferred for a 200-photo carousel loop with and without caching
+"""
+import re
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.assets import VersionedStaticFiles
+from api.images import CachedStaticFiles
+from core.http_cache import IMMUTABLE_CACHE_CONTROL
+from core.image_cache import ImageCache
+from main import CAROUSEL_UI_DIR, serve_carousel
+
+PHOTO_COUNT = 200
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: Optional[str]
+    immutable: bool
+
+
+class Browser:
+    """Minimal model of a browser HTTP cache that counts transferred bytes."""
+
+    def __init__(self, client: TestClient, caching: bool):
+        self.client = client
+        self.caching = caching
+        self.cache: dict[str, CachedResponse] = {}
+        self.bytes_transferred = 0
+        self.requests = 0
+
+    def get(self, url: str) -> bytes:
+        entry = self.cache.get(url) if self.caching else None
+        if entry is not None and entry.immutable:
+            return entry.body
+
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        response = self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes_transferred += len(response.content)
+
+        if response.status_code == 304:
+            return entry.body
+        assert response.status_code == 200
+        self.cache[url] = CachedResponse(
+            body=response.content,
+            etag=response.headers.get("etag"),
+            immutable="immutable" in response.headers.get("cache-control", ""),
+        )
+        return response.content
+
+
+@pytest.fixture
+def photo_ids(tmp_path):
+    display_dir = tmp_path / "display_images"
+    ids = [str(uuid.uuid4()) for _ in range(PHOTO_COUNT)]
+    for photo_id in ids:
+        rendition_dir = display_dir / "renditions" / photo_id
+        rendition_dir.mkdir(parents=True)
+        (display_dir / f"{photo_id}.jpg").write_bytes(b"O" * 4000)
+        (rendition_dir / "screen.jpg").write_bytes(b"S" * 2000)
+    return display_dir, ids
+
+
+@pytest.fixture
+def client(photo_ids):
+    display_dir, _ = photo_ids
+    app = FastAPI()
+    app.get("/display")(serve_carousel)
+    app.mount("/images", CachedStaticFiles(directory=str(display_dir), cache=ImageCache()))
+    app.mount("/carousel-ui", VersionedStaticFiles(directory=str(CAROUSEL_UI_DIR)))
+    return TestClient(app)
+
+
+def run_carousel(browser: Browser, photo_ids: list[str]) -> None:
+    """Load the page and its assets, then show every photo once."""
+    page = browser.get("/display").decode()
+    for asset in re.findall(r'(?:src|href)="(/carousel-ui/[^"]+)"', page):
+        browser.get(asset)
+    for photo_id in photo_ids:
+        browser.get(f"/images/renditions/{photo_id}/screen.jpg")
+
+
+def test_carousel_loop_bytes_with_and_without_caching(client, photo_ids):
+    """Test a reload after a full loop transfers (almost) nothing when caching."""
+    _, ids = photo_ids
+    uncached = Browser(client, caching=False)
+    cached = Browser(client, caching=True)
+
+    for browser in (uncached, cached):
+        run_carousel(browser, ids)          # first visit
+        run_carousel(browser, ids)          # reload / kiosk restart
+
+    print(f"\n200-photo loop twice: {uncached.bytes_transferred} bytes in {uncached.requests} requests "
+          f"without caching, {cached.bytes_transferred} bytes in {cached.requests} requests with caching")
+
+    first_visit = uncached.bytes_transferred // 2
+    assert cached.bytes_transferred == first_visit
+    # Second visit: one conditional request for the page (304), nothing else
+    assert cached.requests == uncached.requests // 2 + 1
+
+
+def test_uuid_assets_are_immutable(client, photo_ids):
+    """Test processor output is cached for a year without revalidation."""
+    _, ids = photo_ids
+    for url in (f"/images/{ids[0]}.jpg", f"/images/renditions/{ids[0]}/screen.jpg"):
+        response = client.get(url)
+        assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+    etag = client.get(f"/images/{ids[0]}.jpg").headers["etag"]
+    not_modified = client.get(f"/images/{ids[0]}.jpg", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_other_images_are_revalidated(client, photo_ids):
+    """Test files not named by the processor must be revalidated."""
+    display_dir, _ = photo_ids
+    (display_dir / "manual-upload.jpg").write_bytes(b"M" * 100)
+
+    response = client.get("/images/manual-upload.jpg")
+
+    assert response.headers["cache-control"] == "no-cache"
+
+
+def test_ui_assets_immutable_only_at_current_version(client):
+    """Test a stale or missing ?v= is revalidated rather than pinned."""
+    page = client.get("/display").text
+    script = re.search(r'src="(/carousel-ui/js/CarouselApp\.js\?v=[0-9a-f]+)"', page).group(1)
+
+    assert client.get(script).headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert client.get("/carousel-ui/js/CarouselApp.js?v=stale").headers["cache-control"] == "no-cache"
+    assert client.get("/carousel-ui/js/CarouselApp.js").headers["cache-control"] == "no-cache"
+
+
+def test_display_page_conditional_request(client):
+    """Test the page is revalidated with its ETag."""
+    first = client.get("/display")
+    assert first.headers["cache-control"] == "no-cache"
+
+    second = client.get("/display", headers={"If-None-Match": first.headers["etag"]})
+
+    assert second.status_code == 304
+
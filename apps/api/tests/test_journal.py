@@ -0,0 +1,167 @@
+"""
+Tests for the processing journal.
+
+Tests cover:
+- Replay keeps the last state of pending uploads and ignores a torn append
+- A late "received" record never moves an upload backwards
+- Recovery finishes "written" photos, rolls back "processing" ones and
+  compacts the journal to the pending uploads
+- Power cuts during processing leave exactly one display copy
+"""
+import json
+from unittest.mock import patch
+
+import pytest
+from PIL import Image
+
+from core.journal import COMMITTED, FAILED, PROCESSING, RECEIVED, WRITTEN, ProcessingJournal
+from core.processor import PhotoProcessor
+
+
+class PowerCut(BaseException):
+    """Stops processing mid-way, like pulling the plug (not caught as an error)."""
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    """raw/display/failed directories patched into the processor."""
+    paths = {name: tmp_path / name for name in ("raw", "display", "failed")}
+    for path in paths.values():
+        path.mkdir()
+    with patch('core.processor.RAW_IMAGES_DIR', paths["raw"]), \
+            patch('core.processor.DISPLAY_IMAGES_DIR', paths["display"]), \
+            patch('core.processor.FAILED_IMAGES_DIR', paths["failed"]):
+        yield paths
+
+
+def new_journal(tmp_path, dirs, **kwargs) -> ProcessingJournal:
+    return ProcessingJournal(tmp_path / "journal.log", dirs["raw"], dirs["display"], **kwargs)
+
+
+def journal_lines(journal: ProcessingJournal) -> list[dict]:
+    return [json.loads(line) for line in journal.path.read_text().splitlines()]
+
+
+def display_files(dirs) -> list:
+    return sorted(path.name for path in dirs["display"].iterdir() if path.is_file())
+
+
+def test_replay_keeps_pending_state(tmp_path, dirs):
+    """Test load rebuilds the last state per upload and skips a torn line."""
+    journal = new_journal(tmp_path, dirs)
+    journal.record("a.jpg", RECEIVED)
+    journal.record("a.jpg", PROCESSING, "1111.jpg")
+    journal.record("b.jpg", PROCESSING, "2222.jpg")
+    journal.record("b.jpg", COMMITTED)
+    journal.record("c.jpg", PROCESSING, "3333.jpg")
+    journal.record("c.jpg", FAILED)
+    with open(journal.path, "ab") as f:
+        f.write(b'{"raw": "d.jpg", "sta')
+
+    replayed = new_journal(tmp_path, dirs)
+    replayed.load()
+
+    assert len(replayed) == 1
+    assert replayed.display_name("a.jpg") == "1111.jpg"
+    assert replayed.display_name("b.jpg") is None
+
+
+def test_late_received_does_not_regress(tmp_path, dirs):
+    """Test an upload journaled after the processor took it keeps its display name."""
+    journal = new_journal(tmp_path, dirs)
+    journal.record("a.jpg", PROCESSING, "1111.jpg")
+    journal.record("a.jpg", RECEIVED)
+
+    assert journal.display_name("a.jpg") == "1111.jpg"
+
+
+def test_recover_finishes_and_rolls_back(tmp_path, dirs):
+    """Test recovery per state, touching only the journaled uploads."""
+    journal = new_journal(tmp_path, dirs)
+    for name in ("written.jpg", "processing.jpg", "received.jpg"):
+        (dirs["raw"] / name).write_bytes(b"raw")
+    (dirs["display"] / "done.jpg").write_bytes(b"complete")
+    (dirs["display"] / "half.jpg").write_bytes(b"partial")
+    (dirs["display"] / ".half.jpg.0123abcd.tmp").write_bytes(b"partial")
+    (dirs["display"] / "renditions" / "half").mkdir(parents=True)
+    (dirs["display"] / "unrelated.jpg").write_bytes(b"untouched")
+    journal.record("written.jpg", PROCESSING, "done.jpg")
+    journal.record("written.jpg", WRITTEN)
+    journal.record("processing.jpg", PROCESSING, "half.jpg")
+    journal.record("received.jpg", RECEIVED)
+    journal.record("gone.jpg", RECEIVED)
+
+    recovered = new_journal(tmp_path, dirs)
+    counts = recovered.recover()
+
+    assert counts == {"reprocess": 2, "finished": 1, "dropped": 1}
+    assert sorted(path.name for path in dirs["raw"].iterdir()) == ["processing.jpg", "received.jpg"]
+    assert display_files(dirs) == ["done.jpg", "unrelated.jpg"]
+    assert not (dirs["display"] / "renditions" / "half").exists()
+    assert recovered.display_name("processing.jpg") == "half.jpg"
+    assert journal_lines(recovered) == [
+        {"raw": "processing.jpg", "state": PROCESSING, "display": "half.jpg"},
+        {"raw": "received.jpg", "state": RECEIVED},
+    ]
+
+
+def test_journal_compacts_while_running(tmp_path, dirs):
+    """Test finished uploads are dropped from the file every compact_after records."""
+    journal = new_journal(tmp_path, dirs, compact_after=10)
+    for i in range(20):
+        journal.record(f"{i}.jpg", PROCESSING, f"{i}.jpg")
+        journal.record(f"{i}.jpg", COMMITTED)
+    journal.record("pending.jpg", PROCESSING, "p.jpg")
+
+    assert journal.compactions == 4
+    assert journal_lines(journal) == [{"raw": "pending.jpg", "state": PROCESSING, "display": "p.jpg"}]
+
+
+@pytest.mark.asyncio
+async def test_power_cut_after_write_keeps_one_copy(tmp_path, dirs):
+    """Test a crash between writing the display image and deleting the upload."""
+    journal = new_journal(tmp_path, dirs)
+    raw_path = dirs["raw"] / "photo.jpg"
+    Image.new('RGB', (300, 200), color='red').save(raw_path, format='JPEG')
+
+    with patch('core.processor.processing_journal', journal), \
+            patch('core.processor.photo_index.add', side_effect=PowerCut):
+        with pytest.raises(PowerCut):
+            await PhotoProcessor.process_single_image(raw_path)
+    assert raw_path.exists() and len(display_files(dirs)) == 1
+
+    recovered = new_journal(tmp_path, dirs)
+    assert recovered.recover() == {"reprocess": 0, "finished": 1, "dropped": 0}
+    assert not raw_path.exists()
+    assert len(display_files(dirs)) == 1
+
+
+@pytest.mark.asyncio
+async def test_power_cut_mid_encode_reprocesses_under_same_name(tmp_path, dirs):
+    """Test a crash while encoding is redone into the display name chosen first."""
+    journal = new_journal(tmp_path, dirs)
+    raw_path = dirs["raw"] / "photo.png"
+    Image.new('RGB', (300, 200), color='blue').save(raw_path, format='PNG')
+
+    def crash_mid_write(image_path, output_path):
+        output_path.write_bytes(b"\x89PNG partial")
+        raise PowerCut()
+
+    with patch('core.processor.processing_journal', journal), \
+            patch.object(PhotoProcessor, 'render_display_image', staticmethod(crash_mid_write)):
+        with pytest.raises(PowerCut):
+            await PhotoProcessor.process_single_image(raw_path)
+    (chosen_name,) = display_files(dirs)
+
+    recovered = new_journal(tmp_path, dirs)
+    assert recovered.recover() == {"reprocess": 1, "finished": 0, "dropped": 0}
+    assert display_files(dirs) == []
+
+    with patch('core.processor.processing_journal', recovered):
+        assert await PhotoProcessor.process_single_image(raw_path) is True
+
+    assert display_files(dirs) == [chosen_name]
+    with Image.open(dirs["display"] / chosen_name) as display:
+        assert display.size == (300, 200)
+    assert len(recovered) == 0
+    assert journal_lines(recovered)[-1] == {"raw": "photo.png", "state": COMMITTED}
@@ -71,3 +71,15 @@ def test_display_endpoint_contains_carousel_elements(client):
     # Check for JS and CSS references
     assert "/carousel-ui/js/app.js" in html_content
     assert "/carousel-ui/css/style.css" in html_content
+
+
+def test_metrics_endpoint_reports_processor(client):
+    """Test that /api/metrics exposes processing pipeline stats."""
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+
+    processor = response.json()["processor"]
+    assert processor["running"] is True
+    assert "queueDepth" in processor
+    assert len(processor["workers"]) >= 1
+    assert "subscribers" in response.json()["events"]
@@ -0,0 +1,93 @@
+"""
+Tests for the incremental multipart reader used by batch uploads.
+
+Tests cover:
+- Parts are available before the rest of the body has arrived
+- read(size) bounds, and skipping unread parts
+- Content types without a boundary and bodies cut off inside a part
+"""
+import asyncio
+
+import pytest
+
+from api.multipart import MultipartError, MultipartReader
+
+BOUNDARY = "xyz"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def part(name: str, filename: str, data: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        f'Content-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + data + b"\r\n"
+
+
+END = f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunks(*pieces: bytes, received: list = None):
+    for piece in pieces:
+        if received is not None:
+            received.append(piece)
+        yield piece
+
+
+def test_first_part_readable_before_body_complete():
+    """Test a part's data is handed out while later parts are still in flight."""
+    received = []
+    first, second = part("photos", "a.jpg", b"A" * 100), part("photos", "b.jpg", b"B" * 100)
+
+    async def scenario():
+        reader = MultipartReader(CONTENT_TYPE, chunks(first, second + END, received=received))
+        headers = await reader.next_part()
+        data = await reader.read(50)
+        return headers, data
+
+    headers, data = asyncio.run(scenario())
+
+    assert (headers.name, headers.filename, headers.content_type) == ("photos", "a.jpg", "image/jpeg")
+    assert data == b"A" * 50
+    assert len(received) == 1
+
+
+def test_read_size_and_skipping_parts():
+    """Test reads are bounded by size and unread data is skipped."""
+    body = part("photos", "a.jpg", b"0123456789") + part("photos", "b.jpg", b"xyz") + END
+
+    async def scenario():
+        # Feed a few bytes at a time so parts span many chunks
+        pieces = [body[i:i + 7] for i in range(0, len(body), 7)]
+        reader = MultipartReader(CONTENT_TYPE, chunks(*pieces))
+        await reader.next_part()
+        first = await reader.read(4)
+        second = await reader.next_part()
+        rest = [await reader.read(2), await reader.read(2), await reader.read(2)]
+        return first, second.filename, rest, await reader.next_part()
+
+    first, second_name, rest, end = asyncio.run(scenario())
+
+    assert first == b"0123"
+    assert second_name == "b.jpg"
+    assert rest == [b"xy", b"z", b""]
+    assert end is None
+
+
+def test_rejects_non_multipart_content_type():
+    """Test a missing boundary is reported up front."""
+    with pytest.raises(MultipartError):
+        MultipartReader("application/json", chunks(b"{}"))
+
+
+def test_body_ending_inside_part_is_an_error():
+    """Test a truncated body is reported instead of a silently short file."""
+    body = part("photos", "a.jpg", b"complete")[:-10]
+
+    async def scenario():
+        reader = MultipartReader(CONTENT_TYPE, chunks(body))
+        await reader.next_part()
+        await reader.read()
+
+    with pytest.raises(MultipartError):
+        asyncio.run(scenario())
@@ -0,0 +1,217 @@
+"""
+Unit tests for the in-memory photo index.
+
+Tests cover:
+- Initial load and filtering
+- O(1) unchanged refresh
+- Detection of external additions and deletions
+- Processor registration via add(), in place for photos already indexed
+- Near-duplicate clustering by perceptual hash
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from core.photo_index import PhotoIndex
+
+
+@pytest.fixture
+def display_dir(tmp_path):
+    """Display directory with two photos of known modification times."""
+    directory = tmp_path / "display_images"
+    directory.mkdir()
+    (directory / "b.jpg").write_bytes(b"b")
+    (directory / "a.png").write_bytes(b"a")
+    os.utime(directory / "b.jpg", (1000, 1000))
+    os.utime(directory / "a.png", (2000, 2000))
+    return directory
+
+
+def test_load_indexes_images_only(display_dir):
+    """Test load ignores non-images and subdirectories."""
+    (display_dir / "notes.txt").write_bytes(b"text")
+    (display_dir / "renditions").mkdir()
+
+    index = PhotoIndex()
+    index.load(display_dir)
+
+    assert [r.filename for r in index.records()] == ["b.jpg", "a.png"]
+
+
+def test_unchanged_refresh_does_not_list_directory(display_dir):
+    """Test an unchanged directory costs no listing."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    version = index.version
+
+    with patch("core.photo_index.os.scandir", side_effect=AssertionError("rescanned")):
+        assert index.refresh(display_dir) is False
+
+    assert index.version == version
+
+
+def test_refresh_detects_external_changes(display_dir):
+    """Test photos added or deleted outside the processor are picked up."""
+    index = PhotoIndex()
+    index.load(display_dir)
+
+    (display_dir / "b.jpg").unlink()
+    (display_dir / "c.jpeg").write_bytes(b"c")
+
+    assert index.refresh(display_dir) is True
+    assert sorted(r.filename for r in index.records()) == ["a.png", "c.jpeg"]
+
+
+def test_add_registers_processed_photo(display_dir):
+    """Test processor registration bumps the version and keeps order."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    version = index.version
+
+    new_photo = display_dir / "d.jpg"
+    new_photo.write_bytes(b"d")
+    record = index.add(new_photo, {"thumb": {"file": "thumb.jpg", "width": 1, "height": 1}})
+
+    assert record.renditions["thumb"]["file"] == "thumb.jpg"
+    assert index.version > version
+    assert index.records()[-1].filename == "d.jpg"
+
+
+def test_add_updates_photo_found_by_refresh(display_dir):
+    """Test registering a photo a refresh already indexed changes no sequence."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    new_photo = display_dir / "d.jpg"
+    new_photo.write_bytes(b"d")
+    index.refresh(display_dir)
+    added, _, cursor, _ = index.changes_since(0, limit=10)
+    (found,) = [r for r in added if r.filename == "d.jpg"]
+    events = []
+    index.add_listener(lambda change, record: events.append(change))
+    version = index.version
+
+    record = index.add(new_photo, {"thumb": {"file": "thumb.jpg", "width": 1, "height": 1}}, dhash=0b1011)
+
+    assert record is found
+    assert record.renditions["thumb"]["file"] == "thumb.jpg"
+    assert record.dhash == 0b1011 and record.cluster_id == "d"
+    assert index.sequence == cursor
+    assert index.changes_since(cursor, limit=10) == ([], [], cursor, False)
+    assert events == []
+    assert index.version > version
+    assert len(index) == 3
+
+
+def test_add_ignores_other_directories(display_dir, tmp_path):
+    """Test photos written outside the indexed directory are not registered."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    elsewhere = tmp_path / "x.jpg"
+    elsewhere.write_bytes(b"x")
+
+    assert index.add(elsewhere) is None
+    assert len(index) == 2
+
+
+def test_refresh_with_other_directory_reloads(display_dir, tmp_path):
+    """Test switching directories rebuilds the index."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    other = tmp_path / "other"
+    other.mkdir()
+
+    assert index.refresh(other) is True
+    assert len(index) == 0
+
+
+def test_changes_since_tracks_sequence_and_tombstones(display_dir):
+    """Test additions get increasing sequence numbers and removals leave tombstones."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    added, removed, cursor, has_more = index.changes_since(0, limit=10)
+
+    assert [r.filename for r in added] == ["b.jpg", "a.png"]
+    assert removed == []
+    assert has_more is False
+
+    index.remove("b.jpg")
+    new_photo = display_dir / "c.jpg"
+    new_photo.write_bytes(b"c")
+    index.add(new_photo)
+
+    added, removed, next_cursor, _ = index.changes_since(cursor, limit=10)
+    assert [r.filename for r in added] == ["c.jpg"]
+    assert removed == ["b"]
+    assert next_cursor > cursor
+    assert index.changes_since(next_cursor, limit=10) == ([], [], next_cursor, False)
+
+
+def test_cursor_expires_when_tombstones_are_dropped(display_dir):
+    """Test cursors older than the remembered removals are rejected."""
+    index = PhotoIndex()
+    index.load(display_dir)
+    old_cursor = index.sequence
+
+    with patch("core.photo_index.MAX_TOMBSTONES", 1):
+        index.remove("a.png")
+        index.remove("b.jpg")
+
+    assert index.is_cursor_valid(old_cursor) is False
+    assert index.is_cursor_valid(index.sequence) is True
+
+
+def _write_manifest(display_dir, photo_id, dhash):
+    manifest_dir = display_dir / "renditions" / photo_id
+    manifest_dir.mkdir(parents=True)
+    (manifest_dir / "manifest.json").write_text(f'{{"renditions": {{}}, "dhash": "{dhash:016x}"}}')
+
+
+def test_burst_shots_share_cluster(tmp_path):
+    """Test photos within CLUSTER_DISTANCE join the earliest photo's cluster."""
+    index = PhotoIndex()
+    index.load(tmp_path)
+    burst = 0x0F0F_F0F0_1234_5678
+    for i, value in enumerate([burst, burst ^ 0b1, burst ^ 0b111, ~burst & (2**64 - 1)]):
+        photo = tmp_path / f"p{i}.jpg"
+        photo.write_bytes(b"x")
+        index.add(photo, dhash=value)
+
+    clusters = {r.filename: r.cluster_id for r in index.records()}
+    assert clusters["p0.jpg"] == clusters["p1.jpg"] == clusters["p2.jpg"] == "p0"
+    assert clusters["p3.jpg"] == "p3"
+
+
+def test_photos_without_hash_are_their_own_cluster(display_dir):
+    """Test legacy photos (no manifest) get a singleton cluster."""
+    index = PhotoIndex()
+    index.load(display_dir)
+
+    assert {r.cluster_id for r in index.records()} == {"a", "b"}
+
+
+def test_clusters_rebuilt_from_manifests(display_dir):
+    """Test clustering after a restart matches chronological assignment."""
+    _write_manifest(display_dir, "b", 0xABCD)
+    _write_manifest(display_dir, "a", 0xABCD ^ 0b11)
+
+    index = PhotoIndex()
+    index.load(display_dir)
+
+    # b.jpg is older, so it names the cluster
+    assert [r.cluster_id for r in index.records()] == ["b", "b"]
+    assert index.records()[0].dhash == 0xABCD
+
+
+def test_removed_photo_leaves_cluster_search(tmp_path):
+    """Test a deleted photo no longer attracts new members."""
+    index = PhotoIndex()
+    index.load(tmp_path)
+    first = tmp_path / "first.jpg"
+    first.write_bytes(b"x")
+    index.add(first, dhash=0xFF)
+    index.remove("first.jpg")
+
+    second = tmp_path / "second.jpg"
+    second.write_bytes(b"x")
+    assert index.add(second, dhash=0xFF).cluster_id == "second"
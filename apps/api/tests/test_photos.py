@@ -1,8 +1,12 @@
 """
 Tests for the photos API endpoint.
 """
+import os
+import subprocess
+import sys
 import time
 from pathlib import Path
+from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
@@ -146,3 +150,198 @@ def test_get_photos_ignores_non_images(client, tmp_path, monkeypatch):
     # Verify only image URLs are returned
     urls = [photo["url"] for photo in data]
     assert all(url.split("/")[-1] in ["photo1.jpg", "photo2.png"] for url in urls)
+
+
+def test_get_photos_includes_renditions(client, test_images):
+    """Test that renditions from the processor manifest are advertised."""
+    test_dir, image_files = test_images
+    rendition_dir = test_dir / "renditions" / "photo1"
+    rendition_dir.mkdir(parents=True)
+    (rendition_dir / "manifest.json").write_text(
+        '{"renditions": {"screen": {"file": "screen.jpg", "width": 1920, "height": 1080, "bytes": 1000},'
+        ' "thumb": {"file": "thumb.jpg", "width": 480, "height": 270, "bytes": 100}}}'
+    )
+
+    response = client.get("/api/photos")
+    data = response.json()
+
+    photo = next(p for p in data if p["url"] == "/images/photo1.jpg")
+    assert photo["renditions"]["screen"] == {
+        "url": "/images/renditions/photo1/screen.jpg",
+        "width": 1920,
+        "height": 1080,
+    }
+    assert photo["renditions"]["thumb"]["width"] == 480
+
+    # Photos without renditions still work
+    other = next(p for p in data if p["url"] == "/images/photo2.png")
+    assert other["renditions"] == {}
+
+
+def test_get_photos_includes_cluster_ids(client, test_images):
+    """Test near-duplicate photos share a clusterId and others have their own."""
+    test_dir, image_files = test_images
+    for photo_id, dhash in [("photo1", "00000000ffff0000"), ("photo2", "00000000ffff0001")]:
+        manifest_dir = test_dir / "renditions" / photo_id
+        manifest_dir.mkdir(parents=True)
+        (manifest_dir / "manifest.json").write_text(f'{{"renditions": {{}}, "dhash": "{dhash}"}}')
+
+    data = client.get("/api/photos").json()
+
+    clusters = {p["id"]: p["clusterId"] for p in data}
+    assert clusters == {"photo1": "photo1", "photo2": "photo1", "photo3": "photo3"}
+
+
+def test_get_photos_unchanged_poll_reuses_response(client, test_images):
+    """Test that polling an unchanged photo set does not rebuild the list."""
+    first = client.get("/api/photos")
+
+    with patch("api.photos.build_photo", side_effect=AssertionError("rebuilt")):
+        second = client.get("/api/photos")
+
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_get_photos_sees_new_photo(client, test_images):
+    """Test that a photo added to the directory shows up on the next poll."""
+    test_dir, _ = test_images
+    assert len(client.get("/api/photos").json()) == 3
+
+    (test_dir / "photo4.jpg").write_bytes(b"fake image 4 content")
+
+    assert len(client.get("/api/photos").json()) == 4
+
+
+def test_get_photos_ids_are_stable_filename_stems(client, test_images):
+    """Test that photo IDs derive from filenames and do not change between polls."""
+    first = client.get("/api/photos").json()
+    second = client.get("/api/photos").json()
+
+    assert [p["id"] for p in first] == ["photo1", "photo2", "photo3"]
+    assert [p["id"] for p in second] == [p["id"] for p in first]
+
+
+def test_get_photos_conditional_get_returns_304(client, test_images):
+    """Test that If-None-Match with the current ETag returns 304 with no body."""
+    response = client.get("/api/photos")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/api/photos", headers={"If-None-Match": etag})
+
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+
+
+def test_get_photos_etag_changes_with_photo_set(client, test_images):
+    """Test that the ETag changes once the photo set changes."""
+    test_dir, image_files = test_images
+    etag = client.get("/api/photos").headers["ETag"]
+
+    image_files[0].unlink()
+    response = client.get("/api/photos", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.json()) == 2
+
+
+def test_delta_first_load_pages_through_photos(client, test_images):
+    """Test an empty cursor starts a paginated full load."""
+    first = client.get("/api/photos", params={"since": "", "limit": 2}).json()
+
+    assert first["reset"] is True
+    assert [p["id"] for p in first["photos"]] == ["photo1", "photo2"]
+    assert first["hasMore"] is True
+
+    second = client.get("/api/photos", params={"since": first["cursor"], "limit": 2}).json()
+
+    assert second["reset"] is False
+    assert [p["id"] for p in second["photos"]] == ["photo3"]
+    assert second["hasMore"] is False
+
+
+def test_delta_idle_poll_is_constant_size(client, test_images):
+    """Test polling with the latest cursor returns nothing, regardless of photo count."""
+    test_dir, _ = test_images
+    cursor = client.get("/api/photos", params={"since": ""}).json()["cursor"]
+    idle = client.get("/api/photos", params={"since": cursor})
+
+    for i in range(20):
+        (test_dir / f"extra{i}.jpg").write_bytes(b"x")
+    cursor = client.get("/api/photos", params={"since": cursor}).json()["cursor"]
+    idle_after_growth = client.get("/api/photos", params={"since": cursor})
+
+    assert idle.json()["photos"] == []
+    assert idle.json()["removed"] == []
+    # Only the cursor's digits may differ
+    assert (len(idle_after_growth.content) - len(idle_after_growth.json()["cursor"])
+            == len(idle.content) - len(idle.json()["cursor"]))
+
+
+def test_delta_reports_additions_and_removals(client, test_images):
+    """Test the delta contains new photos and removed IDs since the cursor."""
+    test_dir, image_files = test_images
+    cursor = client.get("/api/photos", params={"since": ""}).json()["cursor"]
+
+    image_files[1].unlink()
+    (test_dir / "photo4.jpg").write_bytes(b"fake image 4 content")
+    delta = client.get("/api/photos", params={"since": cursor}).json()
+
+    assert [p["id"] for p in delta["photos"]] == ["photo4"]
+    assert delta["removed"] == ["photo2"]
+    assert delta["cursor"] != cursor
+
+
+def test_delta_unknown_cursor_resets(client, test_images):
+    """Test a cursor from another index epoch forces a full reload."""
+    delta = client.get("/api/photos", params={"since": "deadbeef.42"}).json()
+
+    assert delta["reset"] is True
+    assert len(delta["photos"]) == 3
+    assert delta["removed"] == []
+
+
+def test_next_photos_prefetch_window(client, test_images):
+    """Test /api/photos/next returns the following photos with display URLs and sizes."""
+    test_dir, image_files = test_images
+    rendition_dir = test_dir / "renditions" / "photo2"
+    rendition_dir.mkdir(parents=True)
+    (rendition_dir / "manifest.json").write_text(
+        '{"renditions": {"screen": {"file": "screen.jpg", "width": 1920, "height": 1080, "bytes": 1000}}}'
+    )
+
+    data = client.get("/api/photos/next", params={"after": "photo1", "count": 2}).json()
+
+    assert data["rotationLength"] == 3
+    assert data["photos"] == [
+        {"id": "photo2", "url": "/images/renditions/photo2/screen.jpg",
+         "bytes": 1000, "width": 1920, "height": 1080},
+        {"id": "photo3", "url": "/images/photo3.jpeg",
+         "bytes": len(b"fake image 3 content"), "width": None, "height": None},
+    ]
+
+
+def test_display_rendition_follows_configured_renditions():
+    """Test the prefetched rendition is the largest one RENDITIONS configures."""
+    code = "import api.photos; print(api.photos.DISPLAY_RENDITION)"
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        env={**os.environ, "RENDITIONS": "small:320,large:2560"},
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.strip() == "large"
+
+
+def test_next_photos_defaults_and_limits(client, test_images):
+    """Test the window starts at the beginning without a current photo and is bounded."""
+    data = client.get("/api/photos/next").json()
+    assert [p["id"] for p in data["photos"]] == ["photo1", "photo2", "photo3"]
+
+    assert client.get("/api/photos/next", params={"count": 0}).status_code == 422
+    assert client.get("/api/photos/next", params={"count": 11}).status_code == 422
@@ -0,0 +1,170 @@
+"""
+Unit tests for the processing pipeline.
+
+Tests cover:
+- Worker pool draining the queue
+- De-duplication of pending paths
+- Backpressure when the queue is full
+- Processed, failed and skipped counters
+- Start/stop lifecycle
+"""
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from core.pipeline import ProcessingPipeline
+
+
+@pytest.mark.asyncio
+async def test_workers_drain_queue():
+    """Test that every submitted path is handled once."""
+    handled = []
+
+    async def handler(path: Path) -> bool:
+        await asyncio.sleep(0.01)
+        handled.append(path.name)
+        return True
+
+    pipeline = ProcessingPipeline(handler, workers=3, maxsize=20)
+    await pipeline.start()
+    for i in range(10):
+        assert pipeline.submit(Path(f"/raw/{i}.jpg")) is True
+
+    await pipeline.join()
+    await pipeline.stop()
+
+    assert sorted(handled) == sorted(f"{i}.jpg" for i in range(10))
+
+
+@pytest.mark.asyncio
+async def test_submit_rejects_pending_duplicate():
+    """Test the same filename is not queued twice while pending."""
+    release = asyncio.Event()
+
+    async def handler(path: Path) -> bool:
+        await release.wait()
+        return True
+
+    pipeline = ProcessingPipeline(handler, workers=1, maxsize=5)
+    await pipeline.start()
+
+    assert pipeline.submit(Path("/raw/a.jpg")) is True
+    assert pipeline.submit(Path("/raw/a.jpg")) is False
+    assert await pipeline.enqueue(Path("/raw/a.jpg")) is False
+
+    release.set()
+    await pipeline.join()
+
+    # Once processed the name may be queued again
+    assert pipeline.submit(Path("/raw/a.jpg")) is True
+    await pipeline.join()
+    await pipeline.stop()
+
+
+@pytest.mark.asyncio
+async def test_submit_reports_full_queue():
+    """Test non-blocking submit fails once the bounded queue is full."""
+    release = asyncio.Event()
+
+    async def handler(path: Path) -> bool:
+        await release.wait()
+        return True
+
+    pipeline = ProcessingPipeline(handler, workers=1, maxsize=2)
+    await pipeline.start()
+
+    assert pipeline.submit(Path("/raw/0.jpg")) is True
+    await asyncio.sleep(0)  # worker takes the first path off the queue
+    assert pipeline.submit(Path("/raw/1.jpg")) is True
+    assert pipeline.submit(Path("/raw/2.jpg")) is True
+    assert pipeline.is_full()
+    assert pipeline.submit(Path("/raw/3.jpg")) is False
+    assert not pipeline.is_pending(Path("/raw/3.jpg"))
+
+    release.set()
+    await pipeline.join()
+    await pipeline.stop()
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_do_not_stop_workers():
+    """Test a failing handler does not kill its worker."""
+    handled = []
+
+    async def handler(path: Path) -> bool:
+        if path.name == "bad.jpg":
+            raise RuntimeError("boom")
+        handled.append(path.name)
+        return True
+
+    pipeline = ProcessingPipeline(handler, workers=1, maxsize=5)
+    await pipeline.start()
+    pipeline.submit(Path("/raw/bad.jpg"))
+    pipeline.submit(Path("/raw/good.jpg"))
+
+    await pipeline.join()
+    await pipeline.stop()
+
+    assert handled == ["good.jpg"]
+
+
+def test_submit_before_start_is_ignored():
+    """Test submit is a no-op while the pipeline is not running."""
+    async def handler(path: Path) -> bool:
+        return True
+
+    pipeline = ProcessingPipeline(handler, workers=1, maxsize=5)
+
+    assert pipeline.running is False
+    assert pipeline.submit(Path("/raw/a.jpg")) is False
+
+
+@pytest.mark.asyncio
+async def test_stats_report_queue_depth_and_utilisation():
+    """Test stats expose queue depth and per-worker counters."""
+    release = asyncio.Event()
+
+    async def handler(path: Path) -> bool:
+        await release.wait()
+        return path.name != "bad.jpg"
+
+    pipeline = ProcessingPipeline(handler, workers=2, maxsize=10)
+    await pipeline.start()
+    for name in ["a.jpg", "bad.jpg", "c.jpg"]:
+        pipeline.submit(Path(f"/raw/{name}"))
+    await asyncio.sleep(0.05)
+
+    stats = pipeline.stats()
+    assert stats["running"] is True
+    assert stats["queueDepth"] == 1
+    assert stats["inFlight"] == 2
+    assert {w["current"] for w in stats["workers"]} == {"a.jpg", "bad.jpg"}
+    assert all(w["utilisation"] > 0.5 for w in stats["workers"])
+
+    release.set()
+    await pipeline.join()
+    stats = pipeline.stats()
+    await pipeline.stop()
+
+    assert stats["queueDepth"] == 0
+    assert sum(w["processed"] for w in stats["workers"]) == 2
+    assert sum(w["failed"] for w in stats["workers"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_handler_without_work_counts_as_skipped():
+    """Test a handler returning None is neither processed nor failed."""
+    async def handler(path: Path) -> Optional[bool]:
+        return None if path.name == "gone.jpg" else True
+
+    pipeline = ProcessingPipeline(handler, workers=1, maxsize=5)
+    await pipeline.start()
+    pipeline.submit(Path("/raw/gone.jpg"))
+    pipeline.submit(Path("/raw/a.jpg"))
+    await pipeline.join()
+    (worker,) = pipeline.stats()["workers"]
+    await pipeline.stop()
+
+    assert (worker["processed"], worker["failed"], worker["skipped"]) == (1, 0, 1)
@@ -4,7 +4,7 @@ Unit tests for photo processor module.
 Tests cover:
 - UUID generation uniqueness and format
 - EXIF orientation parsing and transformation
-- File operations (move, delete, save)
+- File operations (move, delete, save), outputs only visible once complete
 - Error handling for corrupted images
 - Logging verification
 """
@@ -18,8 +18,11 @@ from PIL import Image, UnidentifiedImageError
 
 from core.processor import (
     PhotoProcessor,
+    find_raw_images,
     process_batch,
     monitor_raw_images,
+    pipeline,
+    run_processor,
 )
 
 
@@ -394,7 +397,7 @@ class TestConcurrency:
 
     @pytest.mark.asyncio
     async def test_process_batch_limits_concurrent(self, tmp_path):
-        """Test process_batch limits to MAX_CONCURRENT_PROCESSING."""
+        """Test process_batch processes every file with bounded concurrency."""
         raw_dir = tmp_path / "raw_images"
         display_dir = tmp_path / "display_images"
         raw_dir.mkdir()
@@ -408,13 +411,30 @@ class TestConcurrency:
             test_image.save(test_file, format='JPEG')
             image_files.append(test_file)
 
+        in_flight = 0
+        max_in_flight = 0
+        real_process = PhotoProcessor.process_single_image
+
+        async def tracking_process(image_path):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return await real_process(image_path)
+            finally:
+                in_flight -= 1
+
         with patch('core.processor.RAW_IMAGES_DIR', raw_dir):
             with patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
-                # Process batch should only handle first 5
-                results = await process_batch(image_files)
+                with patch('core.processor.MAX_CONCURRENT_PROCESSING', 3):
+                    with patch.object(PhotoProcessor, 'process_single_image', tracking_process):
+                        results = await process_batch(image_files)
 
-                # Should return 5 results (MAX_CONCURRENT_PROCESSING)
-                assert len(results) == 5
+                # Every file is processed, never more than the limit at once
+                assert results == [True] * 10
+                assert max_in_flight == 3
+                assert len(list(display_dir.glob("*.jpg"))) == 10
 
     @pytest.mark.asyncio
     async def test_process_batch_handles_exceptions(self, tmp_path):
@@ -444,3 +464,348 @@ class TestConcurrency:
                     # Valid should succeed, invalid should fail
                     assert results[0] is True
                     assert results[1] is False
+
+
+class TestWatcher:
+    """Test event-driven raw_images watching."""
+
+    def test_find_raw_images_skips_partial_uploads(self, tmp_path):
+        """Test directory scan ignores in-progress .part files and non-images."""
+        (tmp_path / "2_b.jpg").write_bytes(b"done")
+        (tmp_path / "1_a.PNG").write_bytes(b"done")
+        (tmp_path / "3_c.jpg.part").write_bytes(b"partial")
+        (tmp_path / "notes.txt").write_bytes(b"text")
+
+        with patch('core.processor.RAW_IMAGES_DIR', tmp_path):
+            found = find_raw_images()
+
+        assert [f.name for f in found] == ["1_a.PNG", "2_b.jpg"]
+
+    @pytest.mark.asyncio
+    async def test_watcher_processes_renamed_upload(self, tmp_path):
+        """Test a file renamed into raw_images is processed without waiting for a poll."""
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        raw_dir.mkdir()
+        display_dir.mkdir()
+
+        with patch('core.processor.RAW_IMAGES_DIR', raw_dir):
+            with patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
+                processor_task = asyncio.create_task(run_processor("watch"))
+                await asyncio.sleep(0.2)  # let the watcher register
+
+                # Upload the way upload_photo does: write .part, then rename
+                partial = raw_dir / "123_abc_watched.jpg.part"
+                Image.new('RGB', (50, 50), color='red').save(partial, format='JPEG')
+                partial.rename(raw_dir / "123_abc_watched.jpg")
+
+                for _ in range(100):
+                    if not list(raw_dir.iterdir()):
+                        break
+                    await asyncio.sleep(0.05)
+
+                processor_task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await processor_task
+
+        assert len(list(display_dir.glob("*.jpg"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_startup_reenqueues_existing_raw_images(self, tmp_path):
+        """Test files left in raw_images before startup are processed (crash recovery)."""
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        raw_dir.mkdir()
+        display_dir.mkdir()
+        for i in range(3):
+            Image.new('RGB', (50, 50), color='blue').save(raw_dir / f"{i}_leftover.jpg", format='JPEG')
+
+        with patch('core.processor.RAW_IMAGES_DIR', raw_dir):
+            with patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
+                processor_task = asyncio.create_task(run_processor("poll"))
+
+                for _ in range(100):
+                    if not list(raw_dir.iterdir()):
+                        break
+                    await asyncio.sleep(0.05)
+
+                processor_task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await processor_task
+
+        assert len(list(display_dir.glob("*.jpg"))) == 3
+        assert not pipeline.running
+
+    @pytest.mark.asyncio
+    async def test_reannounced_processed_file_is_skipped_not_failed(self, tmp_path):
+        """Test a file already processed and gone counts as skipped in the stats."""
+        from core.pipeline import ProcessingPipeline
+        from core.processor import _process_queued_image
+
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        raw_dir.mkdir()
+        display_dir.mkdir()
+        upload = raw_dir / "1_announced_twice.jpg"
+        Image.new('RGB', (50, 50), color='blue').save(upload, format='JPEG')
+        queue = ProcessingPipeline(_process_queued_image, workers=1, maxsize=5)
+
+        with patch('core.processor.RAW_IMAGES_DIR', raw_dir), \
+                patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
+            await queue.start()
+            queue.submit(upload)        # upload handoff
+            await queue.join()
+            queue.submit(upload)        # late watcher event for the same file
+            await queue.join()
+            (worker,) = queue.stats()["workers"]
+            await queue.stop()
+
+        assert (worker["processed"], worker["failed"], worker["skipped"]) == (1, 0, 1)
+
+
+def _jpeg_with_exif(path: Path, size=(80, 40), orientation=None, gps=False) -> None:
+    """Save a JPEG with optional orientation tag and GPS metadata."""
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[0x0112] = orientation
+    if gps:
+        exif[0x010F] = "TestCam"  # Make
+        exif.get_ifd(0x8825)[2] = (40.0, 26.0, 46.0)  # GPSLatitude
+    Image.new('RGB', size, color='red').save(path, format='JPEG', exif=exif.tobytes())
+
+
+class TestLosslessFastPath:
+    """Test the lossless JPEG fast path."""
+
+    def test_upright_jpeg_copied_without_reencode(self, tmp_path):
+        """Test upright JPEGs keep their compressed bytes and lose EXIF metadata."""
+        source = tmp_path / "upright.jpg"
+        output = tmp_path / "out.jpg"
+        _jpeg_with_exif(source, orientation=1, gps=True)
+
+        with patch.object(Image.Image, 'save', side_effect=AssertionError("re-encoded")):
+            result = PhotoProcessor.render_display_image(source, output)
+
+        assert result["method"] == "lossless"
+        assert (result["width"], result["height"]) == (80, 40)
+        # Same scan data (no re-compression), but EXIF/GPS is gone
+        assert output.read_bytes() == _strip_exif(source.read_bytes())
+        assert len(Image.open(output).getexif()) == 0
+
+    def test_rotated_jpeg_transposed_by_default(self, tmp_path):
+        """Test rotated JPEGs are still re-encoded with pixels rotated."""
+        source = tmp_path / "rotated.jpg"
+        output = tmp_path / "out.jpg"
+        _jpeg_with_exif(source, orientation=6)
+
+        result = PhotoProcessor.render_display_image(source, output)
+
+        assert result["method"] == "reencode"
+        assert Image.open(output).size == (40, 80)
+
+    def test_rotated_jpeg_exif_only_mode(self, tmp_path):
+        """Test exif orientation mode keeps pixels and only the orientation tag."""
+        source = tmp_path / "rotated.jpg"
+        output = tmp_path / "out.jpg"
+        _jpeg_with_exif(source, orientation=6, gps=True)
+
+        with patch('core.processor.ORIENTATION_MODE', "exif"):
+            result = PhotoProcessor.render_display_image(source, output)
+
+        assert result["method"] == "lossless"
+        assert (result["width"], result["height"]) == (40, 80)
+        with Image.open(output) as displayed:
+            assert displayed.size == (80, 40)
+            assert dict(displayed.getexif()) == {0x0112: 6}
+
+    def test_hard_link_when_metadata_kept(self, tmp_path):
+        """Test the original is hard-linked when metadata stripping is disabled."""
+        source = tmp_path / "upright.jpg"
+        output = tmp_path / "out.jpg"
+        _jpeg_with_exif(source)
+
+        with patch('core.processor.STRIP_DISPLAY_METADATA', False):
+            PhotoProcessor.render_display_image(source, output)
+
+        assert output.stat().st_ino == source.stat().st_ino
+
+    def test_png_is_not_fast_pathed(self, tmp_path):
+        """Test non-JPEG formats still go through decode and encode."""
+        source = tmp_path / "shot.png"
+        output = tmp_path / "out.png"
+        Image.new('RGB', (30, 30), color='blue').save(source, format='PNG')
+
+        result = PhotoProcessor.render_display_image(source, output)
+
+        assert result["method"] == "reencode"
+        assert result["format"] == "PNG"
+
+
+def _strip_exif(data: bytes) -> bytes:
+    """Remove the EXIF segment from JPEG bytes."""
+    import io
+    import piexif
+
+    stripped = io.BytesIO()
+    piexif.remove(data, stripped)
+    return stripped.getvalue()
+
+
+class TestRenditions:
+    """Test display rendition generation."""
+
+    def test_renditions_fit_configured_sizes(self, tmp_path):
+        """Test each rendition fits its longest edge and the manifest lists it."""
+        source = tmp_path / "big.jpg"
+        Image.new('RGB', (2400, 1600), color='red').save(source, format='JPEG')
+        rendition_dir = tmp_path / "renditions" / "big"
+
+        manifest = PhotoProcessor.generate_renditions(source, rendition_dir)
+        renditions = manifest["renditions"]
+
+        assert (renditions["screen"]["width"], renditions["screen"]["height"]) == (1920, 1280)
+        assert (renditions["thumb"]["width"], renditions["thumb"]["height"]) == (480, 320)
+        assert max(renditions["placeholder"]["width"], renditions["placeholder"]["height"]) == 32
+        for name, info in renditions.items():
+            with Image.open(rendition_dir / info["file"]) as rendition:
+                assert rendition.format == info["format"] == 'WEBP'
+                assert rendition.size == (info["width"], info["height"])
+
+        import json
+        assert json.loads((rendition_dir / "manifest.json").read_text()) == manifest
+        assert len(manifest["dhash"]) == 16
+
+    def test_renditions_apply_orientation(self, tmp_path):
+        """Test renditions of a rotated photo are upright."""
+        source = tmp_path / "rotated.jpg"
+        _jpeg_with_exif(source, size=(800, 400), orientation=6)
+
+        renditions = PhotoProcessor.generate_renditions(source, tmp_path / "r")["renditions"]
+
+        assert (renditions["thumb"]["width"], renditions["thumb"]["height"]) == (240, 480)
+
+    def test_small_images_are_not_upscaled(self, tmp_path):
+        """Test renditions never exceed the source size."""
+        source = tmp_path / "small.png"
+        Image.new('RGBA', (100, 60), color=(0, 0, 255, 128)).save(source, format='PNG')
+
+        renditions = PhotoProcessor.generate_renditions(source, tmp_path / "r")["renditions"]
+
+        assert (renditions["screen"]["width"], renditions["screen"]["height"]) == (100, 60)
+        assert (renditions["thumb"]["width"], renditions["thumb"]["height"]) == (100, 60)
+
+    @pytest.mark.asyncio
+    async def test_process_single_image_writes_renditions(self, tmp_path):
+        """Test processing stores renditions next to the display image."""
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        raw_dir.mkdir()
+        display_dir.mkdir()
+        test_image_path = raw_dir / "with_renditions.jpg"
+        Image.new('RGB', (600, 400), color='red').save(test_image_path, format='JPEG')
+
+        with patch('core.processor.RAW_IMAGES_DIR', raw_dir):
+            with patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
+                result = await PhotoProcessor.process_single_image(test_image_path)
+
+        assert result is True
+        display_file = next(display_dir.glob("*.jpg"))
+        rendition_dir = display_dir / "renditions" / display_file.stem
+        assert (rendition_dir / "manifest.json").exists()
+        assert (rendition_dir / "screen.webp").exists()
+
+    @pytest.mark.asyncio
+    async def test_failed_processing_removes_renditions(self, tmp_path):
+        """Test a failure after renditions were written leaves no orphans."""
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        failed_dir = tmp_path / "failed_images"
+        for directory in (raw_dir, display_dir, failed_dir):
+            directory.mkdir()
+        test_image_path = raw_dir / "fails_late.jpg"
+        Image.new('RGB', (60, 40), color='red').save(test_image_path, format='JPEG')
+
+        with patch('core.processor.RAW_IMAGES_DIR', raw_dir):
+            with patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
+                with patch('core.processor.FAILED_IMAGES_DIR', failed_dir):
+                    with patch.object(PhotoProcessor, 'render_display_image', side_effect=OSError("disk full")):
+                        result = await PhotoProcessor.process_single_image(test_image_path)
+
+        assert result is False
+        assert (failed_dir / "fails_late.jpg").exists()
+        assert list((display_dir / "renditions").iterdir()) == []
+
+
+class TestAtomicOutputs:
+    """Test display images are never visible while being written."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("filename, image_format", [("photo.png", "PNG"), ("photo.jpg", "JPEG")])
+    async def test_partial_output_never_listed(self, tmp_path, filename, image_format):
+        """Test the photo index never lists an output before it is complete."""
+        from core.photo_index import PhotoIndex
+
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        raw_dir.mkdir()
+        display_dir.mkdir()
+        source = raw_dir / filename
+        Image.new('RGB', (300, 200), color='green').save(source, format=image_format)
+        index = PhotoIndex()
+        listed = []
+        real_save, real_write_bytes = Image.Image.save, Path.write_bytes
+
+        def list_photos():
+            # What /api/photos would publish right after this write
+            index.load(display_dir)
+            listed.extend(record.filename for record in index.records())
+
+        def save_and_list(image, fp, *args, **kwargs):
+            real_save(image, fp, *args, **kwargs)
+            list_photos()
+
+        def write_bytes_and_list(path, data):
+            written = real_write_bytes(path, data)
+            list_photos()
+            return written
+
+        with patch('core.processor.RAW_IMAGES_DIR', raw_dir), \
+                patch('core.processor.DISPLAY_IMAGES_DIR', display_dir), \
+                patch('core.processor.STRIP_DISPLAY_METADATA', True), \
+                patch.object(Image.Image, 'save', save_and_list), \
+                patch.object(Path, 'write_bytes', write_bytes_and_list):
+            assert await PhotoProcessor.process_single_image(source) is True
+
+        assert listed == []
+        index.load(display_dir)
+        assert len(index) == 1
+        assert list(display_dir.rglob("*.tmp")) == []
+
+
+class TestPerceptualDedup:
+    """Test skipping re-encoded copies in perceptual dedup mode."""
+
+    @pytest.mark.asyncio
+    async def test_reencoded_copy_is_skipped(self, tmp_path):
+        """Test a recompressed copy of a processed photo is not processed again."""
+        from core.dedup import PerceptualIndex
+
+        raw_dir = tmp_path / "raw_images"
+        display_dir = tmp_path / "display_images"
+        raw_dir.mkdir()
+        display_dir.mkdir()
+        gradient = Image.linear_gradient('L').rotate(90).resize((600, 400)).convert('RGB')
+        original = raw_dir / "original.jpg"
+        gradient.save(original, format='JPEG', quality=95)
+        copy = raw_dir / "copy.jpg"
+        gradient.resize((300, 200)).save(copy, format='JPEG', quality=50)
+
+        with patch('core.processor.DEDUP_MODE', 'perceptual'), \
+                patch('core.processor.perceptual_index', PerceptualIndex(tmp_path / "p.bin")), \
+                patch('core.processor.RAW_IMAGES_DIR', raw_dir), \
+                patch('core.processor.DISPLAY_IMAGES_DIR', display_dir):
+            assert await PhotoProcessor.process_single_image(original) is True
+            assert await PhotoProcessor.process_single_image(copy) is True
+
+        assert len(list(display_dir.glob("*.jpg"))) == 1
+        assert not copy.exists()
@@ -0,0 +1,349 @@
+"""
+Tests for resumable chunked uploads.
+
+Tests cover:
+- Session creation and validation
+- Resuming an interrupted transfer from the offset reported by HEAD
+- Offset mismatches, oversized bodies and early completion
+- A resumed PATCH takes over from one stalled on a dead connection
+- Atomic handoff to the processor and idempotent completion, also after
+  a crash between moving the data and recording the result
+- De-duplication of completed sessions
+- Expiry of abandoned sessions
+- Invalid images end the session
+"""
+import asyncio
+import io
+import os
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from main import app
+from core.admission import admission
+from core.dedup import HashIndex
+from core.upload_sessions import UploadSessionStore
+
+client = TestClient(app)
+
+
+def jpeg_bytes(padding: int) -> bytes:
+    """A small real JPEG followed by random bytes."""
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 120, 40)).save(buffer, "JPEG")
+    return buffer.getvalue() + os.urandom(padding)
+
+
+PHOTO = jpeg_bytes(200_000)
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    """Keep sessions and uploads in a throwaway directory."""
+    raw_dir = tmp_path / "raw"
+    raw_dir.mkdir()
+    sessions = UploadSessionStore(raw_dir / ".sessions", ttl=3600)
+    monkeypatch.setattr("api.upload.RAW_IMAGES_DIR", raw_dir)
+    monkeypatch.setattr("api.resumable.upload_sessions", sessions)
+    monkeypatch.setattr("api.resumable.content_index", HashIndex(tmp_path / "content_hashes.bin"))
+    admission.reset()
+    yield sessions
+    admission.reset()
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    idle_pipeline = MagicMock(running=True)
+    idle_pipeline.is_full.return_value = False
+    monkeypatch.setattr("api.resumable.pipeline", idle_pipeline)
+    return idle_pipeline
+
+
+def create_session(filename: str = "photo.jpg", size: int = len(PHOTO)) -> str:
+    response = client.post("/api/upload/sessions", json={"filename": filename, "size": size})
+    assert response.status_code == 201
+    return response.json()["id"]
+
+
+def patch(session_id: str, offset: int, data: bytes):
+    return client.patch(
+        f"/api/upload/sessions/{session_id}",
+        content=data,
+        headers={"Upload-Offset": str(offset)},
+    )
+
+
+def patch_scope(session_id: str, offset: int, body_size: int) -> dict:
+    """ASGI scope of a PATCH, for driving the app message by message."""
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "PATCH",
+        "scheme": "http",
+        "path": f"/api/upload/sessions/{session_id}",
+        "raw_path": f"/api/upload/sessions/{session_id}".encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", b"testserver"),
+            (b"upload-offset", str(offset).encode()),
+            (b"content-length", str(body_size).encode()),
+        ],
+        "client": ("127.0.0.1", 5000),
+        "server": ("testserver", 80),
+    }
+
+
+def interrupted_patch(session_id: str, offset: int, chunks: list[bytes]) -> None:
+    """Send chunks of a PATCH body, then drop the connection."""
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks
+    ] + [{"type": "http.disconnect"}]
+    scope = patch_scope(session_id, offset, sum(len(chunk) for chunk in chunks) * 2)
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        pass
+
+    async def run():
+        try:
+            await app(scope, receive, send)
+        except Exception:
+            pass  # the app gives up on the disconnected client
+
+    asyncio.run(run())
+
+
+def test_create_session():
+    """Test a new session starts at offset 0 and reports where to send data."""
+    response = client.post("/api/upload/sessions", json={"filename": "photo.jpg", "size": 1000})
+
+    assert response.status_code == 201
+    data = response.json()
+    assert data["offset"] == 0
+    assert data["size"] == 1000
+    assert response.headers["location"] == f"/api/upload/sessions/{data['id']}"
+    assert response.headers["upload-offset"] == "0"
+
+
+def test_create_session_validates_format_and_size():
+    """Test sessions are rejected up front for bad formats and sizes."""
+    bad_format = client.post("/api/upload/sessions", json={"filename": "notes.pdf", "size": 1000})
+    too_large = client.post(
+        "/api/upload/sessions", json={"filename": "photo.jpg", "size": 25 * 1024 * 1024 + 1}
+    )
+
+    assert bad_format.status_code == 400
+    assert bad_format.json()["detail"]["error"] == "Invalid file format"
+    assert too_large.status_code == 413
+
+
+def test_interrupted_upload_resumes_from_head_offset(store, pipeline):
+    """Test bytes received before a dropped connection are kept and resumed from."""
+    session_id = create_session()
+    interrupted_patch(session_id, 0, [PHOTO[:50_000], PHOTO[50_000:120_000]])
+
+    head = client.head(f"/api/upload/sessions/{session_id}")
+    assert head.status_code == 200
+    assert head.headers["upload-offset"] == "120000"
+    assert head.headers["upload-length"] == str(len(PHOTO))
+
+    resumed = patch(session_id, 120_000, PHOTO[120_000:])
+    assert resumed.status_code == 204
+    assert resumed.headers["upload-offset"] == str(len(PHOTO))
+
+    completed = client.post(f"/api/upload/sessions/{session_id}/complete")
+    assert completed.status_code == 200
+    assert completed.json()["success"] is True
+
+    saved_path = pipeline.submit.call_args.args[0]
+    assert saved_path.read_bytes() == PHOTO
+
+
+@pytest.mark.asyncio
+async def test_resumed_patch_takes_over_stalled_patch(store, pipeline):
+    """Test a PATCH stuck on a dead connection does not lock the session."""
+    session_id = create_session()
+    url = f"/api/upload/sessions/{session_id}"
+    sent_early = PHOTO[:50_000]
+    messages = [{"type": "http.request", "body": sent_early, "more_body": True}]
+    connection_wakes = asyncio.Event()
+    stalled_responses = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await connection_wakes.wait()
+        # Whatever a stale request delivers late must not reach the file
+        return {"type": "http.request", "body": b"\0" * 1000, "more_body": False}
+
+    async def send(message):
+        stalled_responses.append(message)
+
+    stalled = asyncio.create_task(app(patch_scope(session_id, 0, len(PHOTO)), receive, send))
+    data_path = store.root / session_id / "data.part"
+    while data_path.stat().st_size < len(sent_early):
+        await asyncio.sleep(0.01)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http:
+        offset = int((await http.head(url)).headers["upload-offset"])
+        resumed = await http.patch(url, content=PHOTO[offset:], headers={"Upload-Offset": str(offset)})
+        assert resumed.status_code == 204
+        assert resumed.headers["upload-offset"] == str(len(PHOTO))
+
+        connection_wakes.set()
+        await stalled
+        assert stalled_responses[0]["status"] == 409
+        assert (b"upload-offset", str(len(PHOTO)).encode()) in stalled_responses[0]["headers"]
+
+        completed = await http.post(f"{url}/complete")
+
+    assert completed.status_code == 200
+    (raw_file,) = [path for path in store.root.parent.iterdir() if path.is_file()]
+    assert raw_file.read_bytes() == PHOTO
+
+
+def test_patch_at_wrong_offset_is_rejected():
+    """Test a PATCH must start exactly where the stored data ends."""
+    session_id = create_session()
+    patch(session_id, 0, PHOTO[:1000])
+
+    response = patch(session_id, 0, PHOTO[:1000])
+
+    assert response.status_code == 409
+    assert response.headers["upload-offset"] == "1000"
+    assert response.json()["detail"]["offset"] == 1000
+
+
+def test_patch_requires_offset_header():
+    """Test a PATCH without Upload-Offset is a client error."""
+    session_id = create_session()
+
+    response = client.patch(f"/api/upload/sessions/{session_id}", content=b"data")
+
+    assert response.status_code == 400
+
+
+def test_patch_beyond_declared_size_is_rejected():
+    """Test extra bytes are refused and not stored."""
+    session_id = create_session(size=100)
+
+    response = patch(session_id, 0, PHOTO[:150])
+
+    assert response.status_code == 413
+    assert response.headers["upload-offset"] == "100"
+
+
+def test_complete_before_all_bytes_is_rejected(store, pipeline):
+    """Test completion waits for every declared byte."""
+    session_id = create_session()
+    patch(session_id, 0, PHOTO[:1000])
+
+    response = client.post(f"/api/upload/sessions/{session_id}/complete")
+
+    assert response.status_code == 409
+    assert response.json()["detail"]["offset"] == 1000
+    pipeline.submit.assert_not_called()
+
+
+def test_raw_images_only_sees_completed_photo(store, pipeline):
+    """Test partial data never appears in raw_images, and completion retries are safe."""
+    raw_dir = store.root.parent
+    session_id = create_session()
+    patch(session_id, 0, PHOTO)
+    assert [p.name for p in raw_dir.iterdir()] == [".sessions"]
+
+    first = client.post(f"/api/upload/sessions/{session_id}/complete")
+    retry = client.post(f"/api/upload/sessions/{session_id}/complete")
+
+    assert first.status_code == retry.status_code == 200
+    assert first.json() == retry.json()
+    photos = [p for p in raw_dir.iterdir() if p.is_file()]
+    assert len(photos) == 1
+    assert photos[0].name.endswith("_photo.jpg")
+    pipeline.submit.assert_called_once_with(photos[0])
+
+
+def test_completion_retry_after_interrupted_handoff(store, pipeline, monkeypatch):
+    """Test a crash after the data was moved does not fail every retry."""
+    raw_dir = store.root.parent
+    session_id = create_session()
+    patch(session_id, 0, PHOTO)
+    calls = []
+
+    async def crash_after_move(path, policy):
+        calls.append(path)
+        if len(calls) == 1:
+            raise OSError("Input/output error")
+
+    monkeypatch.setattr("api.resumable.commit_upload", crash_after_move)
+
+    first = client.post(f"/api/upload/sessions/{session_id}/complete")
+    assert first.status_code == 500
+    (photo,) = [p for p in raw_dir.iterdir() if p.is_file()]
+    assert not store.data_path(store.get(session_id)).exists()
+
+    retry = client.post(f"/api/upload/sessions/{session_id}/complete")
+    again = client.post(f"/api/upload/sessions/{session_id}/complete")
+
+    assert retry.status_code == again.status_code == 200
+    assert retry.json() == again.json() == {
+        "success": True,
+        "message": "Photo uploaded successfully",
+        "filename": "photo.jpg",
+    }
+    assert calls == [photo, photo]
+    pipeline.submit.assert_called_once_with(photo)
+    assert [p for p in raw_dir.iterdir() if p.is_file()] == [photo]
+
+
+def test_duplicate_session_is_not_processed_twice(pipeline):
+    """Test a second session with the same bytes is reported as a duplicate."""
+    for _ in range(2):
+        session_id = create_session()
+        patch(session_id, 0, PHOTO)
+        response = client.post(f"/api/upload/sessions/{session_id}/complete")
+        assert response.status_code == 200
+
+    assert response.json()["duplicate"] is True
+    assert pipeline.submit.call_count == 1
+
+
+def test_unknown_session_is_not_found():
+    """Test malformed and unknown session IDs are 404s."""
+    assert client.head("/api/upload/sessions/../../etc").status_code == 404
+    assert client.get("/api/upload/sessions/" + "0" * 32).status_code == 404
+    assert patch("0" * 32, 0, b"data").status_code == 404
+
+
+def test_abandoned_session_expires(store):
+    """Test sessions idle past the TTL disappear and their bytes are removed."""
+    session_id = create_session()
+    patch(session_id, 0, PHOTO[:1000])
+    stale = time.time() - store.ttl - 60
+    session_dir = store.root / session_id
+    for path in [*session_dir.iterdir(), session_dir]:
+        os.utime(path, (stale, stale))
+
+    assert client.head(f"/api/upload/sessions/{session_id}").status_code == 404
+    assert store.expire() == 1
+    assert not session_dir.exists()
+
+
+def test_invalid_image_ends_session(store):
+    """Test a session whose first bytes are not the declared image is deleted."""
+    session_id = create_session(size=2000)
+
+    response = patch(session_id, 0, b"not an image at all" * 100)
+
+    assert response.status_code == 400
+    assert response.json()["detail"]["reason"] == "format"
+    assert client.head(f"/api/upload/sessions/{session_id}").status_code == 404
@@ -0,0 +1,90 @@
+"""
+Unit tests for the server-defined carousel rotation order.
+
+Tests cover:
+- Chronological order with one photo per near-duplicate cluster
+- Prefetch windows that wrap around and never repeat a photo
+- Burst members and deleted photos as the current photo
+- Rebuilding the order when the index changes
+"""
+import os
+
+import pytest
+
+from core.photo_index import PhotoIndex
+from core.rotation import Rotation
+
+
+@pytest.fixture
+def index(tmp_path):
+    """Index of photos p0..p4 (oldest first); p2 is a burst shot of p1."""
+    directory = tmp_path / "display_images"
+    directory.mkdir()
+    index = PhotoIndex()
+    index.load(directory)
+
+    hashes = [0x0, 0xFFFF0000, 0xFFFF0001, 0xFFFFFFFF00000000, 0x00000000FFFFFFFF]
+    for i, value in enumerate(hashes):
+        photo = directory / f"p{i}.jpg"
+        photo.write_bytes(b"x")
+        os.utime(photo, (1000 + i, 1000 + i))
+        index.add(photo, dhash=value)
+    return index
+
+
+def ids(records):
+    return [record.photo_id for record in records]
+
+
+def test_order_keeps_earliest_photo_per_cluster(index):
+    """Test the rotation is chronological and skips burst duplicates."""
+    assert ids(Rotation(index).order()) == ["p0", "p1", "p3", "p4"]
+
+
+def test_upcoming_follows_current_photo_and_wraps(index):
+    """Test the window starts after the photo on screen and wraps around."""
+    rotation = Rotation(index)
+
+    assert ids(rotation.upcoming("p1", 3)) == ["p3", "p4", "p0"]
+    assert ids(rotation.upcoming("p4", 2)) == ["p0", "p1"]
+
+
+def test_upcoming_never_repeats_within_window(index):
+    """Test a window larger than the rotation is capped at one lap."""
+    assert ids(Rotation(index).upcoming("p0", 10)) == ["p1", "p3", "p4", "p0"]
+
+
+def test_upcoming_from_burst_member_uses_its_cluster(index):
+    """Test a display showing a burst member continues after its cluster."""
+    assert ids(Rotation(index).upcoming("p2", 1)) == ["p3"]
+
+
+def test_unknown_or_missing_current_photo_starts_from_beginning(index):
+    """Test a deleted photo or a fresh display starts the rotation over."""
+    rotation = Rotation(index)
+
+    assert ids(rotation.upcoming(None, 2)) == ["p0", "p1"]
+    assert ids(rotation.upcoming("deleted", 2)) == ["p0", "p1"]
+
+
+def test_order_rebuilt_when_index_changes(index):
+    """Test additions and removals are reflected in the next window."""
+    rotation = Rotation(index)
+    assert ids(rotation.upcoming("p3", 1)) == ["p4"]
+
+    index.remove("p4.jpg")
+    assert ids(rotation.upcoming("p3", 1)) == ["p0"]
+
+    photo = index.directory / "p5.jpg"
+    photo.write_bytes(b"x")
+    os.utime(photo, (2000, 2000))
+    index.add(photo, dhash=0x0F0F0F0F0F0F0F0F)
+    assert ids(rotation.upcoming("p3", 1)) == ["p5"]
+
+
+def test_empty_index_has_no_upcoming_photos(tmp_path):
+    """Test an empty rotation returns an empty window."""
+    index = PhotoIndex()
+    index.load(tmp_path)
+
+    assert Rotation(index).upcoming(None, 3) == []
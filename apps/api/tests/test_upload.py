@@ -7,17 +7,85 @@ Tests cover:
 - File format validation
 - Missing file field handling
 - File collision prevention
+- Disk writes off the event loop and fsync policy
+- Content-hash de-duplication, released again for photos that fail processing
+- Batch uploads with per-file status and partial failure
+- Header validation: garbage, mislabeled, truncated and oversized-dimension
+  files are rejected before the rest of the body is stored
 """
+import asyncio
 import io
+import struct
+import threading
+import zlib
+from unittest.mock import MagicMock
+
 import pytest
 from fastapi.testclient import TestClient
+from PIL import Image
 
 from main import app
+from api.upload import stream_upload_to_disk
+from core.admission import admission
 from core.config import RAW_IMAGES_DIR
+from core.dedup import HashIndex, PerceptualIndex
+from core.processor import PhotoProcessor
+from core.validation import InvalidImageError, UploadValidator
 
 client = TestClient(app)
 
 
+def encoded_image(image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), (30, 90, 150)).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+JPEG_BYTES = encoded_image("JPEG")
+PNG_BYTES = encoded_image("PNG")
+
+
+def jpeg_bytes(size: int = 2000) -> bytes:
+    """A real JPEG header padded with filler to size bytes."""
+    return JPEG_BYTES + b"x" * (size - len(JPEG_BYTES))
+
+
+def box(box_type: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(body)) + box_type + body
+
+
+# ftyp plus the meta/iprp/ipco/ispe boxes that declare a HEIC's dimensions
+HEIC_BYTES = box(b"ftyp", b"heic\0\0\0\0mif1heic") + box(
+    b"meta",
+    b"\0\0\0\0" + box(b"iprp", box(b"ipco", box(b"ispe", b"\0\0\0\0" + struct.pack(">II", 4032, 3024)))),
+)
+
+
+def png_header(width: int, height: int) -> bytes:
+    """PNG signature and chunks declaring width x height, without the pixels."""
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    ihdr = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", ihdr) + chunk(b"IDAT", zlib.compress(b"\0" * 100))
+
+
+@pytest.fixture(autouse=True)
+def dedup_index(tmp_path, monkeypatch):
+    """Give each test an empty, throwaway content-hash index."""
+    index = HashIndex(tmp_path / "content_hashes.bin")
+    monkeypatch.setattr("api.upload.content_index", index)
+    return index
+
+
+@pytest.fixture(autouse=True)
+def fresh_admission():
+    """Start each test with a full per-client upload token bucket."""
+    admission.reset()
+    yield
+    admission.reset()
+
+
 @pytest.fixture(autouse=True)
 def setup_and_cleanup():
     """Setup test environment and cleanup after tests."""
@@ -41,8 +109,7 @@ def setup_and_cleanup():
 
 def test_upload_valid_jpeg():
     """Test successful upload of valid JPEG file."""
-    # Create fake JPEG file
-    file_content = b"\xff\xd8\xff\xe0" + b"fake jpeg content" * 100
+    file_content = jpeg_bytes()
     files = {"photo": ("test.jpg", io.BytesIO(file_content), "image/jpeg")}
 
     response = client.post("/api/upload", files=files)
@@ -60,7 +127,7 @@ def test_upload_valid_jpeg():
 
 def test_upload_valid_jpeg_alternate_extension():
     """Test successful upload of JPEG with .jpeg extension."""
-    file_content = b"\xff\xd8\xff\xe0" + b"fake jpeg content" * 100
+    file_content = jpeg_bytes()
     files = {"photo": ("photo.jpeg", io.BytesIO(file_content), "image/jpeg")}
 
     response = client.post("/api/upload", files=files)
@@ -73,8 +140,7 @@ def test_upload_valid_jpeg_alternate_extension():
 
 def test_upload_valid_png():
     """Test successful upload of valid PNG file."""
-    # PNG file signature
-    file_content = b"\x89PNG\r\n\x1a\n" + b"fake png content" * 100
+    file_content = PNG_BYTES
     files = {"photo": ("test.png", io.BytesIO(file_content), "image/png")}
 
     response = client.post("/api/upload", files=files)
@@ -88,7 +154,7 @@ def test_upload_valid_png():
 
 def test_upload_valid_heic():
     """Test successful upload of valid HEIC file."""
-    file_content = b"fake heic content" * 100
+    file_content = HEIC_BYTES + b"x" * 1000
     files = {"photo": ("test.heic", io.BytesIO(file_content), "image/heic")}
 
     response = client.post("/api/upload", files=files)
@@ -102,7 +168,7 @@ def test_upload_valid_heic():
 def test_upload_oversized_file():
     """Test rejection of file larger than 25MB."""
     # Create file larger than 25MB
-    large_content = b"x" * (26 * 1024 * 1024)  # 26MB
+    large_content = jpeg_bytes(26 * 1024 * 1024)  # 26MB
     files = {"photo": ("large.jpg", io.BytesIO(large_content), "image/jpeg")}
 
     response = client.post("/api/upload", files=files)
@@ -151,7 +217,8 @@ def test_upload_missing_photo_field():
 
 def test_upload_no_file_collisions():
     """Test that multiple uploads with same filename don't collide."""
-    file_content = b"fake content" * 100
+    # Different content: identical bytes would be de-duplicated
+    file_content = jpeg_bytes()
 
     # Upload first file
     files1 = {"photo": ("duplicate.jpg", io.BytesIO(file_content), "image/jpeg")}
@@ -159,7 +226,7 @@ def test_upload_no_file_collisions():
     assert response1.status_code == 200
 
     # Upload second file with same name
-    files2 = {"photo": ("duplicate.jpg", io.BytesIO(file_content), "image/jpeg")}
+    files2 = {"photo": ("duplicate.jpg", io.BytesIO(file_content + b"2"), "image/jpeg")}
     response2 = client.post("/api/upload", files=files2)
     assert response2.status_code == 200
 
@@ -171,7 +238,7 @@ def test_upload_no_file_collisions():
 def test_upload_case_insensitive_extension():
     """Test that file extension validation is case-insensitive."""
     # Test uppercase extension
-    file_content = b"fake content" * 100
+    file_content = jpeg_bytes()
     files = {"photo": ("test.JPG", io.BytesIO(file_content), "image/jpeg")}
 
     response = client.post("/api/upload", files=files)
@@ -184,7 +251,7 @@ def test_upload_case_insensitive_extension():
 def test_upload_maximum_allowed_size():
     """Test upload of file at exactly 25MB (boundary test)."""
     # Create file exactly 25MB
-    max_content = b"x" * (25 * 1024 * 1024)
+    max_content = jpeg_bytes(25 * 1024 * 1024)
     files = {"photo": ("max.jpg", io.BytesIO(max_content), "image/jpeg")}
 
     response = client.post("/api/upload", files=files)
@@ -198,7 +265,7 @@ def test_upload_maximum_allowed_size():
 def test_upload_just_over_size_limit():
     """Test upload of file just over 25MB (boundary test)."""
     # Create file 25MB + 1 byte
-    over_limit = b"x" * (25 * 1024 * 1024 + 1)
+    over_limit = jpeg_bytes(25 * 1024 * 1024 + 1)
     files = {"photo": ("over.jpg", io.BytesIO(over_limit), "image/jpeg")}
 
     response = client.post("/api/upload", files=files)
@@ -206,3 +273,335 @@ def test_upload_just_over_size_limit():
     assert response.status_code == 413
     data = response.json()
     assert data["detail"]["error"] == "File too large"
+
+
+def test_upload_streamed_content_matches_original(monkeypatch):
+    """Test that a file streamed in several chunks is saved byte-for-byte."""
+    monkeypatch.setattr("api.upload.UPLOAD_CHUNK_SIZE", 1000)
+    file_content = JPEG_BYTES + bytes(range(256)) * 50  # 13 chunks, header spans two
+    files = {"photo": ("stream_test.jpg", io.BytesIO(file_content), "image/jpeg")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 200
+    saved_files = list(RAW_IMAGES_DIR.glob("*stream_test.jpg"))
+    assert len(saved_files) == 1
+    assert saved_files[0].read_bytes() == file_content
+
+
+def test_upload_oversized_file_leaves_no_partial_file():
+    """Test that a rejected oversized upload does not leave data in raw_images."""
+    over_limit = jpeg_bytes(25 * 1024 * 1024 + 1)
+    files = {"photo": ("over_partial.jpg", io.BytesIO(over_limit), "image/jpeg")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 413
+    assert list(RAW_IMAGES_DIR.glob("*over_partial.jpg")) == []
+    assert list(RAW_IMAGES_DIR.glob("*over_partial.jpg.part")) == []
+
+
+def test_upload_rejected_when_processing_queue_full(monkeypatch):
+    """Test uploads get 503 with Retry-After while the processing queue is full."""
+    full_pipeline = MagicMock(running=True)
+    full_pipeline.is_full.return_value = True
+    monkeypatch.setattr("api.upload.pipeline", full_pipeline)
+
+    file_content = jpeg_bytes()
+    files = {"photo": ("busy_test.jpg", io.BytesIO(file_content), "image/jpeg")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    assert list(RAW_IMAGES_DIR.glob("*busy_test.jpg")) == []
+    full_pipeline.submit.assert_not_called()
+
+
+def test_upload_hands_saved_file_to_pipeline(monkeypatch):
+    """Test a successful upload enqueues its saved path for processing."""
+    idle_pipeline = MagicMock(running=True)
+    idle_pipeline.is_full.return_value = False
+    monkeypatch.setattr("api.upload.pipeline", idle_pipeline)
+
+    file_content = jpeg_bytes()
+    files = {"photo": ("handoff_test.jpg", io.BytesIO(file_content), "image/jpeg")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 200
+    saved_files = list(RAW_IMAGES_DIR.glob("*handoff_test.jpg"))
+    idle_pipeline.submit.assert_called_once_with(saved_files[0])
+
+
+def test_upload_writes_run_on_io_executor(monkeypatch):
+    """Test file writes happen on the I/O thread pool, not the event loop."""
+    write_threads = set()
+    real_open = open
+
+    class RecordingFile:
+        def __init__(self, *args):
+            self._file = real_open(*args)
+
+        def write(self, data):
+            write_threads.add(threading.current_thread().name)
+            return self._file.write(data)
+
+        def __getattr__(self, name):
+            return getattr(self._file, name)
+
+    monkeypatch.setattr("api.upload.open", RecordingFile, raising=False)
+    files = {"photo": ("io_test.jpg", io.BytesIO(jpeg_bytes(5000)), "image/jpeg")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 200
+    assert write_threads and all(name.startswith("photo-io") for name in write_threads)
+
+
+def test_upload_fsync_per_file_policy(monkeypatch):
+    """Test the "file" policy fsyncs the upload and its directory before replying."""
+    monkeypatch.setattr("api.upload.FSYNC_POLICY", "file")
+    fsync = MagicMock()
+    monkeypatch.setattr("os.fsync", fsync)
+
+    files = {"photo": ("fsync_test.jpg", io.BytesIO(jpeg_bytes(5000)), "image/jpeg")}
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 200
+    # Once for the file data, once for the raw_images directory entry
+    assert fsync.call_count == 2
+
+
+def test_upload_exact_duplicate_is_skipped(dedup_index):
+    """Test re-uploading identical bytes succeeds without a second file."""
+    file_content = JPEG_BYTES + b"same photo bytes" * 500
+    first = client.post("/api/upload", files={"photo": ("dedup_test.jpg", io.BytesIO(file_content), "image/jpeg")})
+    retry = client.post("/api/upload", files={"photo": ("dedup_test.jpg", io.BytesIO(file_content), "image/jpeg")})
+
+    assert first.status_code == 200
+    assert "duplicate" not in first.json()
+    assert retry.status_code == 200
+    assert retry.json()["success"] is True
+    assert retry.json()["duplicate"] is True
+
+    assert len(list(RAW_IMAGES_DIR.glob("*dedup_test.jpg"))) == 1
+    assert list(RAW_IMAGES_DIR.glob("*dedup_test.jpg.part")) == []
+
+    # The hash is persisted and survives a reload
+    reloaded = HashIndex(dedup_index.path)
+    reloaded.load()
+    assert len(reloaded) == 1
+
+
+def test_failed_photo_retry_is_not_duplicate(dedup_index, tmp_path, monkeypatch):
+    """Test a photo that failed processing can be uploaded again."""
+    perceptual = PerceptualIndex(tmp_path / "perceptual_hashes.bin")
+    monkeypatch.setattr("core.processor.DEDUP_MODE", "perceptual")
+    monkeypatch.setattr("core.processor.content_index", dedup_index)
+    monkeypatch.setattr("core.processor.perceptual_index", perceptual)
+    monkeypatch.setattr("core.processor.DISPLAY_IMAGES_DIR", tmp_path / "display")
+    monkeypatch.setattr("core.processor.FAILED_IMAGES_DIR", tmp_path / "failed")
+    for name in ("display", "failed"):
+        (tmp_path / name).mkdir()
+
+    def disk_full(image_path, output_path):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(PhotoProcessor, "render_display_image", staticmethod(disk_full))
+    file_content = JPEG_BYTES + b"failed photo bytes" * 500
+
+    first = client.post("/api/upload", files={"photo": ("failed_test.jpg", io.BytesIO(file_content), "image/jpeg")})
+    assert first.status_code == 200
+    (saved,) = RAW_IMAGES_DIR.glob("*failed_test.jpg")
+    assert asyncio.run(PhotoProcessor.process_single_image(saved)) is False
+    assert len(dedup_index) == 0 and len(perceptual) == 0
+
+    retry = client.post("/api/upload", files={"photo": ("failed_test.jpg", io.BytesIO(file_content), "image/jpeg")})
+
+    assert retry.status_code == 200
+    assert "duplicate" not in retry.json()
+    assert len(list(RAW_IMAGES_DIR.glob("*failed_test.jpg"))) == 1
+    # Only the retry's hash is left on disk
+    reloaded = HashIndex(dedup_index.path)
+    reloaded.load()
+    assert len(reloaded) == 1
+
+
+def test_upload_dedup_disabled(monkeypatch):
+    """Test DEDUP_MODE=off keeps every copy."""
+    monkeypatch.setattr("api.upload.DEDUP_MODE", "off")
+    file_content = JPEG_BYTES + b"same photo bytes" * 500
+    for _ in range(2):
+        response = client.post("/api/upload", files={"photo": ("nodedup_test.jpg", io.BytesIO(file_content), "image/jpeg")})
+        assert response.status_code == 200
+
+    assert len(list(RAW_IMAGES_DIR.glob("*nodedup_test.jpg"))) == 2
+
+
+def test_oversized_upload_does_not_claim_hash(dedup_index):
+    """Test a rejected upload leaves no hash behind."""
+    over_limit = jpeg_bytes(25 * 1024 * 1024 + 1)
+    client.post("/api/upload", files={"photo": ("over_dedup.jpg", io.BytesIO(over_limit), "image/jpeg")})
+    assert len(dedup_index) == 0
+
+
+def test_batch_upload_stores_every_file(monkeypatch):
+    """Test a batch request stores each photo and hands each to the pipeline."""
+    idle_pipeline = MagicMock(running=True)
+    idle_pipeline.is_full.return_value = False
+    monkeypatch.setattr("api.upload.pipeline", idle_pipeline)
+    files = [
+        ("photos", (f"batch{i}_test.jpg", io.BytesIO(JPEG_BYTES + bytes([i]) * 3000), "image/jpeg"))
+        for i in range(3)
+    ]
+
+    response = client.post("/api/upload/batch", files=files)
+
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["success"], data["uploaded"], data["failed"]) == (True, 3, 0)
+    assert [r["filename"] for r in data["results"]] == ["batch0_test.jpg", "batch1_test.jpg", "batch2_test.jpg"]
+    for i in range(3):
+        saved = list(RAW_IMAGES_DIR.glob(f"*batch{i}_test.jpg"))
+        assert saved[0].read_bytes() == JPEG_BYTES + bytes([i]) * 3000
+    assert idle_pipeline.submit.call_count == 3
+
+
+def test_batch_upload_partial_failure(monkeypatch):
+    """Test bad files get their own status without failing the others."""
+    monkeypatch.setattr("api.upload.MAX_FILE_SIZE", 1000)
+    files = [
+        ("photos", ("notes_test.pdf", io.BytesIO(b"%PDF"), "application/pdf")),
+        ("photos", ("huge_test.jpg", io.BytesIO(jpeg_bytes(5000)), "image/jpeg")),
+        ("photos", ("fine_test.jpg", io.BytesIO(JPEG_BYTES), "image/jpeg")),
+    ]
+
+    data = client.post("/api/upload/batch", files=files).json()
+
+    assert [(r["status"], r["success"]) for r in data["results"]] == [
+        (400, False), (413, False), (200, True)
+    ]
+    assert data["results"][1]["error"] == "File too large"
+    assert (data["success"], data["uploaded"], data["failed"]) == (False, 1, 2)
+    assert len(list(RAW_IMAGES_DIR.glob("*fine_test.jpg"))) == 1
+    assert list(RAW_IMAGES_DIR.glob("*huge_test.jpg*")) == []
+
+
+def test_batch_upload_marks_duplicates():
+    """Test a photo repeated within a batch is stored once."""
+    content = JPEG_BYTES + b"same burst frame" * 200
+    files = [("photos", (f"dup{i}_test.jpg", io.BytesIO(content), "image/jpeg")) for i in range(2)]
+
+    results = client.post("/api/upload/batch", files=files).json()["results"]
+
+    assert results[1] == {"filename": "dup1_test.jpg", "status": 200, "success": True, "duplicate": True}
+    assert len(list(RAW_IMAGES_DIR.glob("*dup*_test.jpg"))) == 1
+
+
+def test_batch_upload_truncated_body_keeps_completed_files():
+    """Test a connection cut mid-file keeps the files that arrived completely."""
+    boundary = "batchboundary"
+    body = (
+        f"--{boundary}\r\n"
+        'Content-Disposition: form-data; name="photos"; filename="whole_test.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + JPEG_BYTES + (
+        f"\r\n--{boundary}\r\n"
+        'Content-Disposition: form-data; name="photos"; filename="cut_test.jpg"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + JPEG_BYTES[:100]
+
+    response = client.post(
+        "/api/upload/batch",
+        content=body,
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+
+    results = response.json()["results"]
+    assert [(r["filename"], r["status"]) for r in results] == [("whole_test.jpg", 200), ("cut_test.jpg", 400)]
+    assert len(list(RAW_IMAGES_DIR.glob("*whole_test.jpg"))) == 1
+    assert list(RAW_IMAGES_DIR.glob("*cut_test.jpg*")) == []
+
+
+def test_batch_upload_rejects_bad_requests(monkeypatch):
+    """Test non-multipart bodies, empty batches and a full queue."""
+    assert client.post("/api/upload/batch", json={"photos": []}).status_code == 400
+    assert client.post("/api/upload/batch", data={"note": "no files"}).status_code == 400
+
+    full_pipeline = MagicMock(running=True)
+    full_pipeline.is_full.return_value = True
+    monkeypatch.setattr("api.upload.pipeline", full_pipeline)
+    files = [("photos", ("busy_test.jpg", io.BytesIO(b"\xff\xd8"), "image/jpeg"))]
+    response = client.post("/api/upload/batch", files=files)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+
+def test_batch_upload_file_limit(monkeypatch):
+    """Test files beyond MAX_BATCH_FILES are reported and not stored."""
+    monkeypatch.setattr("api.upload.MAX_BATCH_FILES", 1)
+    files = [("photos", (f"limit{i}_test.jpg", io.BytesIO(JPEG_BYTES + bytes([i])), "image/jpeg")) for i in range(2)]
+
+    results = client.post("/api/upload/batch", files=files).json()["results"]
+
+    assert [r["status"] for r in results] == [200, 400]
+    assert results[1]["error"] == "Too many files"
+    assert list(RAW_IMAGES_DIR.glob("*limit1_test.jpg")) == []
+
+
+@pytest.mark.parametrize("filename, content, reason", [
+    ("garbage_test.jpg", b"this is not an image at all" * 100, "format"),
+    ("mislabeled_test.png", jpeg_bytes(), "mismatch"),
+    ("truncated_test.jpg", JPEG_BYTES[:120], "truncated"),
+])
+def test_upload_invalid_image_rejected(filename, content, reason):
+    """Test files whose bytes are not the image their name claims are refused."""
+    files = {"photo": (filename, io.BytesIO(content), "image/jpeg")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == {"error": "Invalid image file", "reason": reason}
+    assert list(RAW_IMAGES_DIR.glob(f"*{filename}*")) == []
+
+
+def test_upload_decompression_bomb_rejected():
+    """Test a small file declaring a huge pixel count is refused without decoding."""
+    files = {"photo": ("bomb_test.png", io.BytesIO(png_header(20000, 20000)), "image/png")}
+
+    response = client.post("/api/upload", files=files)
+
+    assert response.status_code == 413
+    assert response.json()["detail"]["error"] == "Image dimensions too large"
+    assert list(RAW_IMAGES_DIR.glob("*bomb_test.png*")) == []
+
+
+def test_invalid_image_rejected_before_rest_of_body(tmp_path):
+    """Test streaming stops at the first chunk once the header is known bad."""
+    class Body:
+        reads = 0
+
+        async def read(self, size):
+            self.reads += 1
+            return b"GIF89a" + b"\0" * (size - 6)
+
+    body = Body()
+    with pytest.raises(InvalidImageError):
+        asyncio.run(stream_upload_to_disk(body, tmp_path / "gif_test.jpg", "none", None, UploadValidator("gif_test.jpg")))
+
+    assert body.reads == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_batch_upload_reports_invalid_images():
+    """Test invalid images in a batch get their own status and reason."""
+    files = [
+        ("photos", ("good_test.jpg", io.BytesIO(JPEG_BYTES), "image/jpeg")),
+        ("photos", ("renamed_test.jpg", io.BytesIO(PNG_BYTES), "image/jpeg")),
+        ("photos", ("bomb_test.png", io.BytesIO(png_header(20000, 20000)), "image/png")),
+    ]
+
+    results = client.post("/api/upload/batch", files=files).json()["results"]
+
+    assert [(r["status"], r.get("reason")) for r in results] == [(200, None), (400, "mismatch"), (413, "dimensions")]
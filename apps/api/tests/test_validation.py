@@ -0,0 +1,107 @@
+"""
+Unit tests for upload header validation.
+
+Tests cover:
+- Signature sniffing for JPEG, PNG and HEIC
+- Headers split across many chunks, including large EXIF segments
+- HEIC dimensions from the ispe box
+- Headers that never end within the byte limit
+- Validating a file already on disk
+"""
+import io
+import struct
+
+import pytest
+from PIL import Image
+
+from core.validation import InvalidImageError, UploadValidator, sniff_format, validate_file
+
+
+def _jpeg(size=(120, 80), exif_bytes: int = 0) -> bytes:
+    buffer = io.BytesIO()
+    options = {}
+    if exif_bytes:
+        exif = Image.Exif()
+        exif[0x010E] = "x" * exif_bytes  # ImageDescription
+        options["exif"] = exif.tobytes()
+    Image.new("RGB", size, (200, 10, 10)).save(buffer, "JPEG", **options)
+    return buffer.getvalue()
+
+
+def _box(box_type: bytes, body: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(body)) + box_type + body
+
+
+def _heic(*sizes: tuple[int, int]) -> bytes:
+    properties = b"".join(_box(b"ispe", b"\0\0\0\0" + struct.pack(">II", *size)) for size in sizes)
+    meta = _box(b"meta", b"\0\0\0\0" + _box(b"hdlr", b"\0" * 24) + _box(b"iprp", _box(b"ipco", properties)))
+    return _box(b"ftyp", b"heic\0\0\0\0mif1heic") + meta + _box(b"mdat", b"\0" * 64)
+
+
+def _feed(validator: UploadValidator, data: bytes, chunk_size: int) -> None:
+    for start in range(0, len(data), chunk_size):
+        validator.feed(data[start:start + chunk_size])
+
+
+def test_sniff_format():
+    """Test signatures are recognized regardless of extension."""
+    assert sniff_format(_jpeg()) == "JPEG"
+    assert sniff_format(b"\x89PNG\r\n\x1a\n" + b"\0" * 8) == "PNG"
+    assert sniff_format(_heic((10, 10))) == "HEIF"
+    assert sniff_format(b"GIF89a" + b"\0" * 10) is None
+
+
+def test_header_split_across_small_chunks():
+    """Test a header behind a large EXIF segment is found chunk by chunk."""
+    data = _jpeg(exif_bytes=50_000) + b"\0" * 10_000
+    validator = UploadValidator("photo.jpg")
+
+    _feed(validator, data, 4096)
+
+    assert validator.finish().width == 120
+    assert validator.info.height == 80
+
+
+def test_heic_dimensions_from_ispe():
+    """Test the largest ispe entry (the full image, not a tile) is used."""
+    validator = UploadValidator("photo.HEIC", max_pixels=20_000_000)
+    validator.feed(_heic((512, 512), (4032, 3024)))
+
+    assert validator.info.format == "HEIF"
+    assert (validator.info.width, validator.info.height) == (4032, 3024)
+
+    bomb = UploadValidator("photo.heic", max_pixels=10_000_000)
+    with pytest.raises(InvalidImageError) as excinfo:
+        bomb.feed(_heic((4032, 3024)))
+    assert excinfo.value.reason == "dimensions"
+
+
+def test_header_must_end_within_limit():
+    """Test a header that never completes is rejected once the limit is reached."""
+    data = _jpeg(exif_bytes=50_000)
+    validator = UploadValidator("photo.jpg", max_header_bytes=8192)
+
+    with pytest.raises(InvalidImageError) as excinfo:
+        _feed(validator, data, 4096)
+
+    assert excinfo.value.reason == "header"
+
+
+def test_unknown_extension_accepts_any_supported_format():
+    """Test the content decides when the extension names no format."""
+    validator = UploadValidator("upload")
+    validator.feed(_jpeg())
+
+    assert validator.finish().format == "JPEG"
+
+
+def test_validate_file(tmp_path):
+    """Test validation of a file already on disk reads its header only."""
+    good, truncated = tmp_path / "good.jpg", tmp_path / "cut.jpg"
+    good.write_bytes(_jpeg() + b"\0" * 2_000_000)
+    truncated.write_bytes(_jpeg()[:200])
+
+    assert validate_file(good, "good.jpg").format == "JPEG"
+    with pytest.raises(InvalidImageError) as excinfo:
+        validate_file(truncated, "cut.jpg")
+    assert excinfo.value.reason == "truncated"
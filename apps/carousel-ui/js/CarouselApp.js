@@ -2,15 +2,23 @@
  * Image Share Carousel Application
  *
  * Displays photos from the backend in a continuous auto-advancing loop
- * with smooth crossfade transitions.
+ * with smooth crossfade transitions. The server decides the rotation order;
+ * the next few images are downloaded and decoded ahead of their crossfade.
  */
 
 // State management
-let photos = [];
+let allPhotos = []; // every known photo, chronological
+let photos = []; // rotation: one representative per near-duplicate cluster
 let currentIndex = 0;
 let rotationInterval = null;
 let pollingInterval = null;
 let noPhotos = true;
+let photosCursor = ''; // Delta feed cursor ('' = full load)
+let eventSource = null;
+let fetchInFlight = null;
+let fetchQueued = false;
+let upcoming = []; // server's prefetch window: next photos in rotation order
+const prefetched = new Map(); // url -> Image being downloaded/decoded
 
 // DOM elements
 const primaryImage = document.getElementById('image-primary');
@@ -24,12 +32,18 @@ const config = {
     rotationIntervalMs: 7000, // 7 seconds
     pollingIntervalMs: 10000, // 10 seconds
     apiEndpoint: '/api/photos',
+    nextEndpoint: '/api/photos/next',
+    prefetchCount: 3, // upcoming photos to warm
+    prefetchBudgetBytes: 24 * 1024 * 1024, // stop warming beyond this many bytes
+    eventsEndpoint: '/api/events',
+    pageSize: 100, // photos per delta feed page
     uploadUrl: 'http://photoshare.local',
 };
 
 /**
  * Initialize the carousel application.
- * Fetches photos, starts display, and begins polling.
+ * Fetches photos, starts display, and subscribes to photo events
+ * (falling back to polling while the event stream is down).
  */
 async function init() {
     console.log('Initializing carousel...');
@@ -41,8 +55,9 @@ async function init() {
         // Initial fetch
         await fetchAndUpdatePhotos();
 
-        // Start polling for new photos
+        // Listen for new photos; poll until the event stream is open
         startPolling();
+        subscribeToEvents();
 
     } catch (error) {
         console.error('Error initializing carousel:', error);
@@ -51,53 +66,116 @@ async function init() {
 }
 
 /**
- * Fetch photos from API and update display.
+ * Fetch photo changes from the API delta feed and update display.
+ * Pages through the feed until the server reports no more changes.
  */
 async function fetchAndUpdatePhotos() {
     try {
-        const response = await fetch(config.apiEndpoint);
+        let hasMore = true;
 
-        if (!response.ok) {
-            throw new Error(`HTTP error! status: ${response.status}`);
+        while (hasMore) {
+            const params = new URLSearchParams({ since: photosCursor, limit: config.pageSize });
+            const response = await fetch(`${config.apiEndpoint}?${params}`, { cache: 'no-store' });
+
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+
+            const delta = await response.json();
+            applyDelta(delta);
+
+            photosCursor = delta.cursor;
+            hasMore = delta.hasMore;
         }
 
-        const fetchedPhotos = await response.json();
+        updateDisplayState();
+        if (!noPhotos) {
+            refreshUpcoming();
+        }
+
+    } catch (error) {
+        console.error('Error fetching photos:', error);
+        throw error;
+    }
+}
+
+/**
+ * Apply one page of the delta feed to the local photo list.
+ *
+ * @param {Object} delta - Delta response ({photos, removed, cursor, hasMore, reset})
+ */
+function applyDelta(delta) {
+    if (delta.reset && allPhotos.length > 0) {
+        // Server no longer knows our cursor (e.g. restarted): rebuild from scratch
+        console.log('Photo feed reset, reloading photo list');
+        allPhotos = [];
+    }
 
-        // Detect new photos
-        const newPhotos = detectNewPhotos(fetchedPhotos);
+    if (delta.removed.length > 0) {
+        const removedIds = new Set(delta.removed);
+        allPhotos = allPhotos.filter(photo => !removedIds.has(photo.id));
+        console.log(`Removed ${delta.removed.length} photos`);
+    }
 
-        if (newPhotos.length > 0) {
-            console.log(`Detected ${newPhotos.length} new photos:`, newPhotos.map(p => p.url));
+    // Detect new photos
+    const newPhotos = detectNewPhotos(delta.photos);
 
-            // Add new photos to array (sorted chronologically)
-            photos = [...photos, ...newPhotos].sort((a, b) =>
-                new Date(a.createdAt) - new Date(b.createdAt)
-            );
+    if (newPhotos.length > 0) {
+        console.log(`Detected ${newPhotos.length} new photos:`, newPhotos.map(p => p.url));
 
-            // Transition from no photos state if needed
-            if (noPhotos && photos.length > 0) {
-                transitionToCarousel();
-            } else if (photos.length > 1 && !rotationInterval) {
-                startRotation();
-            }
+        // Add new photos to array (sorted chronologically)
+        allPhotos = [...allPhotos, ...newPhotos].sort((a, b) =>
+            new Date(a.createdAt) - new Date(b.createdAt)
+        );
+    }
+
+    photos = clusterRepresentatives(allPhotos);
+    if (currentIndex >= photos.length) {
+        currentIndex = 0;
+    }
+}
+
+/**
+ * Keep the earliest photo of each near-duplicate cluster (burst shots),
+ * so a burst is shown once instead of once per frame.
+ *
+ * @param {Array} photoList - Chronologically sorted photos
+ * @returns {Array} - One photo per clusterId, in the same order
+ */
+function clusterRepresentatives(photoList) {
+    const seenClusters = new Set();
+    return photoList.filter(photo => {
+        const clusterId = photo.clusterId || photo.id;
+        if (seenClusters.has(clusterId)) {
+            return false;
         }
+        seenClusters.add(clusterId);
+        return true;
+    });
+}
 
-        // Check if all photos were deleted
-        if (fetchedPhotos.length === 0 && photos.length > 0) {
+/**
+ * Switch between the carousel and the instruction screen as needed.
+ */
+function updateDisplayState() {
+    if (photos.length === 0) {
+        if (!noPhotos) {
             console.log('All photos deleted, returning to instruction screen');
-            photos = [];
             transitionToNoPhotos();
-        }
-
-        // Initial state: no photos
-        if (fetchedPhotos.length === 0 && noPhotos) {
+        } else {
             console.log('No photos available');
             showNoPhotosScreen();
         }
+        return;
+    }
 
-    } catch (error) {
-        console.error('Error fetching photos:', error);
-        throw error;
+    // Transition from no photos state if needed
+    if (noPhotos) {
+        transitionToCarousel();
+    } else if (photos.length > 1 && !rotationInterval) {
+        startRotation();
+    } else if (photos.length < 2 && rotationInterval) {
+        stopRotation();
     }
 }
 
@@ -108,10 +186,154 @@ async function fetchAndUpdatePhotos() {
  * @returns {Array} - Array of new photos
  */
 function detectNewPhotos(fetchedPhotos) {
-    const existingIds = new Set(photos.map(p => p.id));
+    const existingIds = new Set(allPhotos.map(p => p.id));
     return fetchedPhotos.filter(photo => !existingIds.has(photo.id));
 }
 
+/**
+ * Get the URL to display for a photo.
+ * Prefers the largest rendition (the one the server sizes for displays,
+ * whatever RENDITIONS names it) over the full-size original.
+ *
+ * @param {Object} photo - Photo object from the API
+ * @returns {string} - Image URL
+ */
+function displayUrl(photo) {
+    let largest = null;
+    for (const rendition of Object.values(photo.renditions || {})) {
+        if (!largest || rendition.width * rendition.height > largest.width * largest.height) {
+            largest = rendition;
+        }
+    }
+    return (largest && largest.url) || photo.url;
+}
+
+/**
+ * Ask the server which photos play after the current one and warm them.
+ * On failure the carousel falls back to its local order.
+ */
+async function refreshUpcoming() {
+    const current = photos[currentIndex];
+    if (!current) return;
+
+    try {
+        const params = new URLSearchParams({ after: current.id, count: config.prefetchCount });
+        const response = await fetch(`${config.nextEndpoint}?${params}`, { cache: 'no-store' });
+
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        upcoming = (await response.json()).photos;
+        prefetchImages(upcoming);
+
+    } catch (error) {
+        console.warn('Could not fetch upcoming photos, using local order:', error);
+        upcoming = [];
+    }
+}
+
+/**
+ * Download and decode images ahead of time so the crossfade does not wait.
+ * Images that left the window are released.
+ *
+ * @param {Array} images - Prefetch window ({id, url, bytes, width, height})
+ */
+function prefetchImages(images) {
+    const wanted = new Set();
+    let budget = config.prefetchBudgetBytes;
+
+    for (const image of images) {
+        if (image.bytes > budget) break;
+        budget -= image.bytes;
+        wanted.add(image.url);
+
+        if (!prefetched.has(image.url)) {
+            const img = new Image();
+            img.src = image.url;
+            img.decode().catch(() => {}); // errors surface again when displayed
+            prefetched.set(image.url, img);
+        }
+    }
+
+    for (const url of [...prefetched.keys()]) {
+        if (!wanted.has(url)) {
+            prefetched.delete(url);
+        }
+    }
+}
+
+/**
+ * Pick the photo to show next: the head of the server's prefetch window,
+ * or the next photo in local order if the window is empty or stale.
+ *
+ * @returns {Object} - {index, url} of the next photo
+ */
+function nextPhoto() {
+    if (upcoming.length > 0) {
+        const index = photos.findIndex(photo => photo.id === upcoming[0].id);
+        if (index !== -1) {
+            return { index, url: upcoming[0].url };
+        }
+    }
+
+    const index = (currentIndex + 1) % photos.length;
+    return { index, url: displayUrl(photos[index]) };
+}
+
+/**
+ * Subscribe to server-sent photo events.
+ * Every event triggers a delta feed fetch, so missed or coalesced events
+ * are harmless; polling covers the time the stream is disconnected.
+ */
+function subscribeToEvents() {
+    if (!window.EventSource) {
+        console.log('EventSource not supported, relying on polling');
+        return;
+    }
+
+    eventSource = new EventSource(config.eventsEndpoint);
+
+    eventSource.onopen = () => {
+        console.log('Photo event stream connected');
+        stopPolling();
+        // Catch up on anything that happened while disconnected
+        requestPhotoUpdate();
+    };
+
+    eventSource.onerror = () => {
+        // EventSource reconnects by itself; poll in the meantime
+        if (!pollingInterval) {
+            console.warn('Photo event stream lost, falling back to polling');
+            startPolling();
+        }
+    };
+
+    ['photo_added', 'photo_removed', 'resync'].forEach(type => {
+        eventSource.addEventListener(type, requestPhotoUpdate);
+    });
+}
+
+/**
+ * Fetch photo changes, coalescing requests that arrive while a fetch is running.
+ */
+function requestPhotoUpdate() {
+    if (fetchInFlight) {
+        fetchQueued = true;
+        return;
+    }
+
+    fetchInFlight = fetchAndUpdatePhotos()
+        .catch(() => {})
+        .finally(() => {
+            fetchInFlight = null;
+            if (fetchQueued) {
+                fetchQueued = false;
+                requestPhotoUpdate();
+            }
+        });
+}
+
 /**
  * Start polling for new photos.
  */
@@ -122,7 +344,7 @@ function startPolling() {
         clearInterval(pollingInterval);
     }
 
-    pollingInterval = setInterval(fetchAndUpdatePhotos, config.pollingIntervalMs);
+    pollingInterval = setInterval(requestPhotoUpdate, config.pollingIntervalMs);
 }
 
 /**
@@ -151,7 +373,7 @@ function displayPhoto(index) {
     console.log(`Displaying photo ${index + 1}/${photos.length}: ${photo.url}`);
 
     // Set the primary image source (initial load)
-    primaryImage.src = photo.url;
+    primaryImage.src = displayUrl(photo);
     primaryImage.classList.add('visible');
     primaryImage.classList.remove('hidden');
 
@@ -168,18 +390,17 @@ function displayPhoto(index) {
 function transitionToNextPhoto() {
     if (photos.length < 2) return;
 
-    // Calculate next index
-    const nextIndex = (currentIndex + 1) % photos.length;
-    const nextPhoto = photos[nextIndex];
+    // Server-defined next photo (already prefetched) or local fallback
+    const next = nextPhoto();
 
-    console.log(`Transitioning to photo ${nextIndex + 1}/${photos.length}`);
+    console.log(`Transitioning to photo ${next.index + 1}/${photos.length}`);
 
     // Determine which image is active and which is inactive
     const activeImage = primaryImage.classList.contains('visible') ? primaryImage : secondaryImage;
     const inactiveImage = activeImage === primaryImage ? secondaryImage : primaryImage;
 
     // Load the next image into the inactive element
-    inactiveImage.src = nextPhoto.url;
+    inactiveImage.src = next.url;
 
     // Once the new image is loaded, perform the crossfade
     inactiveImage.onload = () => {
@@ -189,7 +410,8 @@ function transitionToNextPhoto() {
         activeImage.classList.add('hidden');
     };
 
-    currentIndex = nextIndex;
+    currentIndex = next.index;
+    refreshUpcoming();
 }
 
 
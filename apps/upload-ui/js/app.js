@@ -6,35 +6,108 @@
 // API Service - handles photo upload to backend
 const BASE_URL = ''; // Empty for relative URLs
 
+// Resumable upload retry policy (flaky guest Wi-Fi)
+const UPLOAD_MAX_ATTEMPTS = 6;
+const UPLOAD_RETRY_DELAY_MS = 2000;
+
+/**
+ * Build an Error from a failed API response
+ * @param {Response} response - Non-OK fetch response
+ * @returns {Promise<Error>} Error carrying the server's message
+ */
+async function responseError(response) {
+    // Parse error response from FastAPI
+    const errorData = await response.json().catch(() => ({
+        detail: 'Unknown error occurred'
+    }));
+
+    // Handle both FastAPI formats: {detail: ""} and custom {error: ""}
+    const detail = errorData.detail || errorData.error || 'Failed to upload photo';
+    const error = new Error(typeof detail === 'string' ? detail : (detail.error || 'Failed to upload photo'));
+    error.status = response.status;
+    return error;
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+/**
+ * Read the Upload-Offset header of a session response
+ * @param {Response} response - Session response
+ * @returns {?number} Offset, or null if the server did not send one
+ */
+function uploadOffset(response) {
+    const value = response.headers.get('Upload-Offset');
+    return value === null ? null : Number(value);
+}
+
+/**
+ * Delay requested by a Retry-After header
+ * @param {Response} response - Server response
+ * @returns {number} Milliseconds to wait (0 without the header)
+ */
+function retryAfterMs(response) {
+    const seconds = Number(response.headers.get('Retry-After'));
+    return Number.isFinite(seconds) && seconds > 0 ? seconds * 1000 : 0;
+}
+
 const ApiService = {
     /**
-     * Upload photo to backend API
+     * Upload photo to backend API as a resumable session
+     *
+     * The file is sent with PATCH requests at the offset the server reports,
+     * so if the connection drops only the remaining bytes are re-sent.
+     * Connection failures and 409 conflicts both count as attempts.
+     *
      * @param {File} photoFile - The photo file to upload
      * @returns {Promise<Object>} Upload response data
      * @throws {Error} If upload fails
      */
     async uploadPhoto(photoFile) {
-        const formData = new FormData();
-        formData.append('photo', photoFile);
-
         try {
-            const response = await fetch(`${BASE_URL}/api/upload`, {
+            const created = await fetch(`${BASE_URL}/api/upload/sessions`, {
                 method: 'POST',
-                body: formData,
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ filename: photoFile.name, size: photoFile.size }),
             });
-
-            if (!response.ok) {
-                // Parse error response from FastAPI
-                const errorData = await response.json().catch(() => ({
-                    detail: 'Unknown error occurred'
-                }));
-
-                // Handle both FastAPI formats: {detail: ""} and custom {error: ""}
-                const errorMessage = errorData.detail || errorData.error || 'Failed to upload photo';
-                throw new Error(errorMessage);
+            if (!created.ok) {
+                throw await responseError(created);
+            }
+            const session = await created.json();
+            const sessionUrl = `${BASE_URL}/api/upload/sessions/${session.id}`;
+
+            let offset = session.offset;
+            for (let attempt = 1; offset < photoFile.size; attempt++) {
+                try {
+                    const response = await fetch(sessionUrl, {
+                        method: 'PATCH',
+                        headers: { 'Upload-Offset': String(offset) },
+                        body: photoFile.slice(offset),
+                    });
+                    if (response.status === 409) {
+                        // Offset mismatch or session busy: resync, then retry
+                        if (attempt >= UPLOAD_MAX_ATTEMPTS) {
+                            throw await responseError(response);
+                        }
+                        await sleep(retryAfterMs(response));
+                    } else if (!response.ok) {
+                        throw await responseError(response);
+                    }
+                    offset = uploadOffset(response) ?? await this.resumeOffset(sessionUrl, offset);
+                } catch (error) {
+                    // Only connection failures are retried; server errors are final
+                    if (error.status || attempt >= UPLOAD_MAX_ATTEMPTS) {
+                        throw error;
+                    }
+                    await sleep(UPLOAD_RETRY_DELAY_MS * attempt);
+                    offset = await this.resumeOffset(sessionUrl, offset);
+                }
             }
 
-            return await response.json();
+            const completed = await fetch(`${sessionUrl}/complete`, { method: 'POST' });
+            if (!completed.ok) {
+                throw await responseError(completed);
+            }
+            return await completed.json();
         } catch (error) {
             // Network errors or fetch failures
             if (error.message.includes('Failed to fetch')) {
@@ -42,6 +115,27 @@ const ApiService = {
             }
             throw error;
         }
+    },
+
+    /**
+     * Ask the server how many bytes of an interrupted upload it kept
+     * @param {string} sessionUrl - Upload session URL
+     * @param {number} offset - Offset to fall back to if still offline
+     * @returns {Promise<number>} Offset to resume from
+     * @throws {Error} If the session has expired
+     */
+    async resumeOffset(sessionUrl, offset) {
+        let response;
+        try {
+            response = await fetch(sessionUrl, { method: 'HEAD' });
+        } catch {
+            // Still offline: the next PATCH is answered with the right offset
+            return offset;
+        }
+        if (!response.ok) {
+            throw await responseError(response);
+        }
+        return uploadOffset(response) ?? offset;
     }
 };
 